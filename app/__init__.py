@@ -45,6 +45,45 @@ def create_app(config_object=None):
 		app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(app.instance_path, 'database.sqlite')
 	app.config.setdefault('SQLALCHEMY_TRACK_MODIFICATIONS', False)
 
+	# SQLite storage profile applied to every connection (see app/storage.py)
+	app.config.setdefault('SQLITE_JOURNAL_MODE', os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'))
+	app.config.setdefault('SQLITE_SYNCHRONOUS', os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'))
+	app.config.setdefault('SQLITE_BUSY_TIMEOUT_MS', int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)))
+	# Off by default in SQLite; needed for ON DELETE CASCADE on session children
+	app.config.setdefault('SQLITE_FOREIGN_KEYS', os.environ.get('SQLITE_FOREIGN_KEYS', 'ON'))
+	# Negative values are KiB: -20000 keeps about 20 MB of pages per connection
+	app.config.setdefault('SQLITE_CACHE_SIZE', int(os.environ.get('SQLITE_CACHE_SIZE', -20000)))
+	app.config.setdefault('SQLITE_MMAP_SIZE', int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)))
+	app.config.setdefault('SQLITE_POOL_SIZE', int(os.environ.get('SQLITE_POOL_SIZE', 5)))
+	app.config.setdefault('SQLITE_MAX_OVERFLOW', int(os.environ.get('SQLITE_MAX_OVERFLOW', 10)))
+	app.config.setdefault('SQLITE_POOL_TIMEOUT', float(os.environ.get('SQLITE_POOL_TIMEOUT', 30)))
+	from .storage import init_storage, sqlite_engine_options
+	# Explicit SQLALCHEMY_ENGINE_OPTIONS take precedence over the profile
+	app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+		**sqlite_engine_options(app.config),
+		**app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+	}
+
+	# Keyset pagination for list endpoints
+	app.config.setdefault('API_PAGE_SIZE', 100)
+	app.config.setdefault('API_MAX_PAGE_SIZE', 1000)
+
+	# Chart downsampling: default and maximum points (or buckets) per aggregate response
+	app.config.setdefault('AGGREGATE_DEFAULT_POINTS', 2000)
+	app.config.setdefault('AGGREGATE_MAX_POINTS', 10000)
+
+	# Rows fetched per round-trip when streaming NDJSON/CSV exports
+	app.config.setdefault('EXPORT_YIELD_PER', 1000)
+
+	# Seconds between full re-counts of stress_history for /api/system/status
+	app.config.setdefault('STATUS_COUNTS_TTL', 300)
+
+	# Offline sync writes this many records per transaction
+	app.config.setdefault('OFFLINE_SYNC_CHUNK_SIZE', int(os.environ.get('OFFLINE_SYNC_CHUNK_SIZE', 500)))
+
+	# Bursts of connects/disconnects produce one client_stats emit per window (0 emits every change)
+	app.config.setdefault('CLIENT_STATS_DEBOUNCE_MS', float(os.environ.get('CLIENT_STATS_DEBOUNCE_MS', 250)))
+
 	# JWT Configuration
 	app.config.setdefault('JWT_SECRET_KEY', os.environ.get('JWT_SECRET_KEY', app.config['SECRET_KEY']))
 	app.config.setdefault('JWT_ACCESS_TOKEN_EXPIRES', 3600)  # 1 hour
@@ -52,6 +91,7 @@ def create_app(config_object=None):
 
 	# Initialize extensions
 	db.init_app(app)
+	init_storage(app, db)
 	migrate.init_app(app, db)
 	jwt.init_app(app)
 	bcrypt.init_app(app)
@@ -59,24 +99,98 @@ def create_app(config_object=None):
 	# Initialize CORS for cross-origin requests (React frontend)
 	CORS(app, origins="*")
 	
+	# Import events to register SocketIO event handlers. This must happen before
+	# init_app so the handlers are re-attached to the server of every app created.
+	try:
+		from . import events  # noqa: F401
+	except Exception:
+		pass
+
+	# Multi-process scale-out: workers share rooms and emits through a message queue
+	# (redis://..., kafka://..., unix:///path/broker.sock); unset runs a single process
+	app.config.setdefault('SOCKETIO_MESSAGE_QUEUE', os.environ.get('SOCKETIO_MESSAGE_QUEUE'))
+	app.config.setdefault('SOCKETIO_CHANNEL', os.environ.get('SOCKETIO_CHANNEL', 'flask-socketio'))
+	app.config.setdefault('SOCKETIO_STATS_PATH', os.environ.get('SOCKETIO_STATS_PATH'))
+	app.config.setdefault('SOCKETIO_STATS_STALE_SECONDS', 30)
+	app.config.setdefault('SOCKETIO_STATS_INTERVAL_SECONDS', float(os.environ.get('SOCKETIO_STATS_INTERVAL_SECONDS', 2)))
+
+	from .broker import create_client_manager, init_shared_registry
+
 	# Initialize SocketIO with CORS support
-	socketio.init_app(app, cors_allowed_origins="*", async_mode='eventlet')
+	socketio.init_app(
+		app,
+		cors_allowed_origins="*",
+		async_mode='eventlet',
+		client_manager=create_client_manager(app.config['SOCKETIO_MESSAGE_QUEUE'], app.config['SOCKETIO_CHANNEL']),
+	)
+	init_shared_registry(app, socketio)
+
+	# Micro-batch concurrent predict() calls (window in ms; 0 disables batching)
+	app.config.setdefault('INFERENCE_BATCH_WINDOW_MS', float(os.environ.get('INFERENCE_BATCH_WINDOW_MS', 0)))
+	app.config.setdefault('INFERENCE_MAX_BATCH_SIZE', int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 64)))
+
+	from .service import StressHistoryStats, StressModelService
+	StressHistoryStats.configure(app.config['STATUS_COUNTS_TTL'])
+	StressModelService.configure_batching(
+		app.config['INFERENCE_BATCH_WINDOW_MS'],
+		app.config['INFERENCE_MAX_BATCH_SIZE'],
+		create_event=socketio.server.eio.create_event,
+	)
+
+	# Cache predictions keyed on inputs snapped to sensor resolution (0 entries disables it)
+	app.config.setdefault('PREDICTION_CACHE_SIZE', int(os.environ.get('PREDICTION_CACHE_SIZE', 0)))
+	app.config.setdefault('PREDICTION_CACHE_TTL', float(os.environ.get('PREDICTION_CACHE_TTL', 300)))
+	app.config.setdefault('PREDICTION_CACHE_HR_STEP', float(os.environ.get('PREDICTION_CACHE_HR_STEP', 0.5)))
+	app.config.setdefault('PREDICTION_CACHE_TEMP_STEP', float(os.environ.get('PREDICTION_CACHE_TEMP_STEP', 0.05)))
+	app.config.setdefault('PREDICTION_CACHE_EDA_STEP', float(os.environ.get('PREDICTION_CACHE_EDA_STEP', 0.01)))
+	StressModelService.configure_cache(
+		app.config['PREDICTION_CACHE_SIZE'],
+		ttl=app.config['PREDICTION_CACHE_TTL'],
+		steps=(
+			app.config['PREDICTION_CACHE_HR_STEP'],
+			app.config['PREDICTION_CACHE_TEMP_STEP'],
+			app.config['PREDICTION_CACHE_EDA_STEP'],
+		),
+	)
+
+	# Load, validate and warm up the model artifacts before serving requests
+	app.config.setdefault('MODEL_DIR', os.environ.get('MODEL_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')))
+	app.config.setdefault('MODEL_EAGER_LOAD', os.environ.get('MODEL_EAGER_LOAD', '1').lower() in ('1', 'true', 'yes', 'on'))
+	app.config.setdefault('MODEL_WARMUP_BATCH_SIZE', 64)
+	# Serve tree ensembles from memory-mapped flat arrays shared by all worker processes
+	app.config.setdefault('MODEL_MMAP', os.environ.get('MODEL_MMAP', '1').lower() in ('1', 'true', 'yes', 'on'))
+	# Fold the scaler into a flat copy of the forest and predict without scikit-learn
+	app.config.setdefault('MODEL_FAST_PATH', os.environ.get('MODEL_FAST_PATH', '1').lower() in ('1', 'true', 'yes', 'on'))
+	# Seconds between checks of the artifact files for a hot reload; 0 disables the watcher
+	app.config.setdefault('MODEL_WATCH_INTERVAL', float(os.environ.get('MODEL_WATCH_INTERVAL', 0)))
+
+	from .model_registry import init_model_registry
+	init_model_registry(app, socketio)
+
+	# Opt-in: run model inference and password hashing off the event loop (thread or process; inline runs on the caller)
+	app.config.setdefault('CPU_POOL', os.environ.get('CPU_POOL', 'inline'))
+	# Workers in the pool; 0 picks min(4, CPU count)
+	app.config.setdefault('CPU_POOL_SIZE', int(os.environ.get('CPU_POOL_SIZE', 0)))
+	from .offload import init_cpu_pool
+	init_cpu_pool(app)
+
+	# Optional live WebSocket pipeline stages (write-behind persistence, ...)
+	from .live import init_live_pipeline
+	init_live_pipeline(app, socketio)
 
 	from .routes import main as main_bp
 	app.register_blueprint(main_bp)
 
+	# `flask rollups backfill` builds the chart rollups from existing data
+	from .rollups import rollups_cli
+	app.cli.add_command(rollups_cli)
+
 	# Import models so they are registered on the SQLAlchemy metadata
 	# This ensures `flask db migrate --autogenerate` sees the models.
 	try:
 		from . import models  # noqa: F401
 	except Exception:
 		pass
-		
-	# Import events to register SocketIO event handlers
-	try:
-		from . import events  # noqa: F401
-	except Exception:
-		pass
 
 	return app
 
@@ -0,0 +1,172 @@
+"""
+Micro-batching scheduler for concurrent inference requests.
+
+Callers submit one item at a time. The first caller of a batch becomes its
+leader: it waits for a short window (or until the batch is full), runs every
+queued item through the handler in a single call and hands each waiting
+caller its own result. No background worker is needed, so the scheduler
+works the same under plain threads and eventlet greenlets.
+"""
+
+import bisect
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+
+class _PendingRequest:
+    __slots__ = ('item', 'event', 'result', 'error', 'submitted_at')
+
+    def __init__(self, item, event):
+        self.item = item
+        self.event = event
+        self.result = None
+        self.error = None
+        self.submitted_at = time.perf_counter()
+
+
+class BatchMetrics:
+    """Queue depth, batch size histogram and added latency of a MicroBatcher."""
+
+    # Upper bounds (inclusive) of the histogram buckets; values above the last go to '+Inf'
+    BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+    LATENCY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 20, 50, 100]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.queue_depth = 0
+            self.max_queue_depth = 0
+            self.batches = 0
+            self.items = 0
+            self.batch_size_counts = [0] * (len(self.BATCH_SIZE_BUCKETS) + 1)
+            self.latency_counts = [0] * (len(self.LATENCY_BUCKETS_MS) + 1)
+            self.latency_sum_ms = 0.0
+            self.latency_max_ms = 0.0
+
+    def record_depth(self, depth: int) -> None:
+        with self._lock:
+            self.queue_depth = depth
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def record_batch(self, size: int, waits_ms: List[float], depth: int) -> None:
+        with self._lock:
+            self.queue_depth = depth
+            self.batches += 1
+            self.items += size
+            self.batch_size_counts[bisect.bisect_left(self.BATCH_SIZE_BUCKETS, size)] += 1
+            for wait in waits_ms:
+                self.latency_counts[bisect.bisect_left(self.LATENCY_BUCKETS_MS, wait)] += 1
+                self.latency_sum_ms += wait
+                self.latency_max_ms = max(self.latency_max_ms, wait)
+
+    @staticmethod
+    def _histogram(bounds, counts) -> Dict[str, int]:
+        labels = [str(b) for b in bounds] + ['+Inf']
+        return dict(zip(labels, counts))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'queue_depth': self.queue_depth,
+                'max_queue_depth': self.max_queue_depth,
+                'batches': self.batches,
+                'items': self.items,
+                'mean_batch_size': (self.items / self.batches) if self.batches else 0.0,
+                'batch_size_histogram': self._histogram(self.BATCH_SIZE_BUCKETS, self.batch_size_counts),
+                'added_latency_ms': {
+                    'mean': (self.latency_sum_ms / self.items) if self.items else 0.0,
+                    'max': self.latency_max_ms,
+                    'histogram': self._histogram(self.LATENCY_BUCKETS_MS, self.latency_counts),
+                },
+            }
+
+
+class MicroBatcher:
+    """Collect concurrent submissions for a short window and process them together.
+
+    `handler` receives a list of items and must return a list of results in the
+    same order. `create_event` can be swapped for the async framework's event
+    (e.g. eventlet's) so waiting callers do not block the hub.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], List[Any]],
+        window_ms: float = 3.0,
+        max_batch_size: int = 64,
+        create_event: Callable[[], Any] = threading.Event,
+    ):
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1')
+        self._handler = handler
+        self.window = max(window_ms, 0.0) / 1000.0
+        self.max_batch_size = max_batch_size
+        self._create_event = create_event
+        self._lock = threading.Lock()
+        self._pending: List[_PendingRequest] = []
+        self._leader_active = False
+        self._batch_full = None
+        self.metrics = BatchMetrics()
+
+    def submit(self, item: Any) -> Any:
+        """Queue one item, wait for its batch to run and return its result."""
+        request = _PendingRequest(item, self._create_event())
+
+        with self._lock:
+            self._pending.append(request)
+            depth = len(self._pending)
+            is_leader = not self._leader_active
+            if is_leader:
+                self._leader_active = True
+                self._batch_full = self._create_event()
+            elif depth >= self.max_batch_size:
+                self._batch_full.set()
+        self.metrics.record_depth(depth)
+
+        if is_leader:
+            self._lead()
+        else:
+            request.event.wait()
+
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _lead(self) -> None:
+        if self.window > 0 and len(self._pending) < self.max_batch_size:
+            self._batch_full.wait(self.window)
+
+        while True:
+            with self._lock:
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+                remaining = len(self._pending)
+                if not batch:
+                    self._leader_active = False
+                    return
+            self._run(batch, remaining)
+
+    def _run(self, batch: List[_PendingRequest], remaining: int) -> None:
+        started = time.perf_counter()
+        waits_ms = [(started - r.submitted_at) * 1000.0 for r in batch]
+        self.metrics.record_batch(len(batch), waits_ms, remaining)
+
+        try:
+            results = self._handler([r.item for r in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f'Batch handler returned {len(results)} results for {len(batch)} items')
+            for request, result in zip(batch, results):
+                request.result = result
+        except Exception as e:
+            for request in batch:
+                request.error = e
+
+        for request in batch:
+            request.event.set()
+
+
+__all__ = ['MicroBatcher', 'BatchMetrics']
@@ -0,0 +1,205 @@
+"""
+Multi-process Socket.IO support.
+
+Several worker processes (behind a sticky load balancer) share rooms and
+emits through a message queue chosen by SOCKETIO_MESSAGE_QUEUE:
+
+- redis://, rediss://, kafka://, zmq+..., or any Kombu URL: the python-socketio backends
+- unix:///path/to/broker.sock: UnixSocketBroker, a local stand-in for one host and for tests
+
+Run the local broker with `python -m app.broker /tmp/stress-socketio.sock`.
+"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import socketio as socketio_lib
+
+logger = logging.getLogger(__name__)
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        broker = self.server.broker
+        broker._join(self.wfile)
+        try:
+            for line in self.rfile:
+                broker._fan_out(line)
+        except OSError:
+            pass
+        finally:
+            broker._leave(self.wfile)
+
+
+class UnixSocketBroker:
+    """Line-based pub/sub hub on a Unix socket: every line received from one
+    connection is written to all connections, including the sender."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._server = None
+
+    def _join(self, wfile) -> None:
+        with self._lock:
+            self._subscribers.add(wfile)
+
+    def _leave(self, wfile) -> None:
+        with self._lock:
+            self._subscribers.discard(wfile)
+
+    def _fan_out(self, line: bytes) -> None:
+        with self._lock:
+            for wfile in list(self._subscribers):
+                try:
+                    wfile.write(line)
+                    wfile.flush()
+                except OSError:
+                    self._subscribers.discard(wfile)
+
+    def start(self) -> 'UnixSocketBroker':
+        """Listen in a background thread."""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = socketserver.ThreadingUnixStreamServer(self.path, _BrokerHandler)
+        self._server.daemon_threads = True
+        self._server.broker = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class UnixSocketManager(socketio_lib.PubSubManager):
+    """python-socketio client manager that publishes through a UnixSocketBroker."""
+
+    name = 'unix'
+
+    def __init__(self, url: str, channel: str = 'socketio', write_only: bool = False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.path = url[len('unix://'):] if url.startswith('unix://') else url
+        self._publish_lock = threading.Lock()
+        self._publisher = None
+
+    def _socket_module(self):
+        # Blocking stdlib sockets would stall the eventlet hub
+        if self.server is not None and self.server.async_mode == 'eventlet':
+            from eventlet.green import socket as green_socket
+            return green_socket
+        return socket
+
+    def _connect(self):
+        sock = self._socket_module().socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.path)
+        return sock
+
+    def _publish(self, data: Dict[str, Any]) -> None:
+        line = (json.dumps([self.channel, data]) + '\n').encode()
+        with self._publish_lock:
+            for attempt in (1, 2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = self._connect()
+                    self._publisher.sendall(line)
+                    return
+                except OSError:
+                    self._publisher = None
+                    if attempt == 2:
+                        raise
+
+    def _listen(self):
+        retry_sleep = 1
+        while True:
+            try:
+                with self._connect() as sock, sock.makefile('rb') as rfile:
+                    retry_sleep = 1
+                    for line in rfile:
+                        channel, data = json.loads(line)
+                        if channel == self.channel:
+                            yield data
+            except (OSError, ValueError) as e:
+                logger.error(f"Unix socket broker connection lost ({e}); retrying in {retry_sleep}s")
+            if self.server is not None:
+                self.server.sleep(retry_sleep)
+            else:
+                time.sleep(retry_sleep)
+            retry_sleep = min(retry_sleep * 2, 60)
+
+
+def create_client_manager(url: Optional[str], channel: str = 'flask-socketio'):
+    """Client manager for a SOCKETIO_MESSAGE_QUEUE URL, or None for a single process."""
+    if not url:
+        return None
+    if url.startswith('unix://'):
+        return UnixSocketManager(url, channel=channel)
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio_lib.RedisManager(url, channel=channel)
+    if url.startswith('kafka://'):
+        return socketio_lib.KafkaManager(url, channel=channel)
+    if url.startswith('zmq'):
+        return socketio_lib.ZmqManager(url, channel=channel)
+    return socketio_lib.KombuManager(url, channel=channel)
+
+
+def init_shared_registry(app, socketio) -> None:
+    """Publish this worker's connection counts to a store shared by the workers of this host."""
+    from .events import registry
+    from .registry import SharedConnectionStats
+
+    path = app.config.get('SOCKETIO_STATS_PATH')
+    if not path:
+        if not app.config.get('SOCKETIO_MESSAGE_QUEUE'):
+            registry.shared = None
+            return
+        path = os.path.join(app.instance_path, 'socketio_stats.sqlite')
+
+    stale_after = float(app.config['SOCKETIO_STATS_STALE_SECONDS'])
+    interval = min(float(app.config['SOCKETIO_STATS_INTERVAL_SECONDS']), stale_after / 3.0)
+    shared = SharedConnectionStats(path, stale_after=stale_after)
+    registry.shared = shared
+
+    def heartbeat():
+        # The only place the stats file is read or written; the sqlite work runs
+        # on a tpool thread so the hub keeps serving sockets
+        from .offload import run_io
+
+        while registry.shared is shared:
+            try:
+                run_io(shared.sync, registry.stats())
+            except Exception as e:
+                logger.error(f"Publishing connection stats failed: {e}")
+            socketio.sleep(interval)
+
+    import atexit
+    socketio.start_background_task(heartbeat)
+    atexit.register(shared.remove)
+
+
+__all__ = ['UnixSocketBroker', 'UnixSocketManager', 'create_client_manager', 'init_shared_registry']
+
+
+if __name__ == '__main__':
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    broker_path = sys.argv[1] if len(sys.argv) > 1 else '/tmp/stress-socketio.sock'
+    broker = UnixSocketBroker(broker_path).start()
+    logger.info(f"Socket.IO broker listening on unix://{broker_path}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        broker.stop()
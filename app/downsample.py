@@ -0,0 +1,121 @@
+"""
+Time-bucketed aggregation and visual downsampling of sensor series.
+
+Both work on columns fetched in one query (epoch seconds plus one array per
+sensor, sorted by time), so a long session is reduced on the server instead
+of being shipped reading by reading to the browser:
+
+- aggregate(): min, max, sum, mean and count per fixed-width time bucket
+- lttb(): Largest-Triangle-Three-Buckets, keeps the points that preserve
+  the visual shape of a line chart (peaks and dips survive)
+"""
+
+import re
+from typing import Dict, Optional
+
+import numpy as np
+
+# Resolutions offered by the API, finest first; 'auto' picks from this ladder
+RESOLUTIONS = {
+    '1s': 1, '5s': 5, '10s': 10, '30s': 30,
+    '1m': 60, '5m': 300, '10m': 600, '30m': 1800,
+    '1h': 3600, '6h': 21600, '1d': 86400,
+}
+
+_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_resolution(value: str) -> int:
+    """Bucket width in seconds from '10s', '1m', '1h', '1d' or a plain number of seconds."""
+    match = re.fullmatch(r'\s*(\d+)\s*([smhd]?)\s*', str(value).lower())
+    if not match or int(match.group(1)) < 1:
+        raise ValueError(f"Invalid resolution {value!r}, expected e.g. 1s, 10s, 1m or 1h")
+    return int(match.group(1)) * _UNITS[match.group(2) or 's']
+
+
+def auto_resolution(span_seconds: float, max_buckets: int) -> int:
+    """Finest resolution of the ladder that covers `span_seconds` in at most `max_buckets` buckets."""
+    for seconds in RESOLUTIONS.values():
+        if span_seconds / seconds < max_buckets:
+            return seconds
+    return int(np.ceil(span_seconds / max_buckets))
+
+
+def aggregate(epoch: np.ndarray, columns: Dict[str, np.ndarray], resolution: int) -> Dict[str, np.ndarray]:
+    """Per-bucket statistics of `columns` over time-sorted `epoch` seconds.
+
+    Buckets are aligned to multiples of `resolution` and only non-empty ones
+    are returned: ``{'start': bucket start (epoch s), 'count': ...,
+    '<column>': {'min', 'max', 'sum', 'mean'}}``.
+    """
+    if len(epoch) == 0:
+        return {'start': np.empty(0), 'count': np.empty(0, dtype=np.int64),
+                **{name: {stat: np.empty(0) for stat in ('min', 'max', 'sum', 'mean')} for name in columns}}
+
+    bucket = np.floor_divide(epoch, resolution).astype(np.int64)
+    # epoch is sorted, so each bucket is a contiguous run
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+    counts = np.diff(np.append(starts, len(epoch)))
+
+    result = {'start': bucket[starts].astype(np.float64) * resolution, 'count': counts}
+    for name, values in columns.items():
+        sums = np.add.reduceat(values, starts)
+        result[name] = {
+            'min': np.minimum.reduceat(values, starts),
+            'max': np.maximum.reduceat(values, starts),
+            'sum': sums,
+            'mean': sums / counts,
+        }
+    return result
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the `threshold` points LTTB keeps from the series (x sorted ascending).
+
+    The first and last points are always kept. Series with no more than
+    `threshold` points come back whole.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # n - 2 inner points split into threshold - 2 buckets; edges[i]:edges[i + 1] is bucket i
+    edges = (np.floor(np.arange(threshold - 1) * ((n - 2) / (threshold - 2))) + 1).astype(np.int64)
+    edges[-1] = n - 1
+    counts = np.diff(edges)
+    # the next bucket's centroid is the third triangle vertex; the last bucket uses the final point
+    avg_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / counts, x[-1])
+    avg_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / counts, y[-1])
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(epoch: np.ndarray, columns: Dict[str, np.ndarray], points: int,
+               resolution: Optional[int] = None) -> Dict[str, Dict[str, np.ndarray]]:
+    """LTTB each column on its own: ``{'<column>': {'time': epoch s, 'value': ...}}``.
+
+    Passing `resolution` averages into buckets first, which bounds the LTTB
+    input for very long ranges.
+    """
+    if resolution:
+        buckets = aggregate(epoch, columns, resolution)
+        epoch = buckets['start']
+        columns = {name: buckets[name]['mean'] for name in columns}
+
+    series = {}
+    for name, values in columns.items():
+        keep = lttb(epoch, values, points)
+        series[name] = {'time': epoch[keep], 'value': values[keep]}
+    return series
+
+
+__all__ = ['RESOLUTIONS', 'parse_resolution', 'auto_resolution', 'aggregate', 'lttb', 'downsample']
@@ -3,15 +3,30 @@ WebSocket Event Handlers for ESP32 and React Frontend Communication
 
 This module handles:
 - Real-time data relay from ESP32 to React frontend
-- No database persistence or ML predictions
+- Binary esp32_live_packed frames carrying many samples at once
+- Opt-in write-behind persistence of live readings (LIVE_PERSIST_ENABLED)
+- Opt-in streaming stress prediction on the live feed (LIVE_INFERENCE_ENABLED)
+- Opt-in frame-rate limited relay as live_sensor_batch (LIVE_BROADCAST_MAX_FPS)
+- Subscription rooms so each frontend only receives the streams it watches
+- Connection registry with O(1) client counts and debounced client_stats
+
+Rooms:
+- frontend_clients: every frontend; control events such as client_stats
+- device:<device_id> / session:<session_id>: live data of one device or session
+- firehose: live data of every device (opt-in, the old broadcast behaviour)
 """
 
-from flask import request
+from flask import request, current_app
 from flask_socketio import emit, join_room, leave_room, disconnect
 from datetime import datetime, timezone, timedelta
 import logging
+import time
+
+import numpy as np
 
 from . import socketio
+from .live import batch_payload, decode_packed_samples
+from .registry import ConnectionRegistry, Debouncer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,8 +35,48 @@ logger = logging.getLogger(__name__)
 # Jakarta timezone (UTC+7)
 JAKARTA_TZ = timezone(timedelta(hours=7))
 
-# Store connected clients info
-connected_clients = {}
+# Connected clients with O(1) per-type counters and a device_id index
+registry = ConnectionRegistry()
+connected_clients = registry
+
+FRONTEND_ROOM = 'frontend_clients'
+FIREHOSE_ROOM = 'firehose'
+
+
+def device_room(device_id: str) -> str:
+    return f'device:{device_id}'
+
+
+def session_room(session_id: str) -> str:
+    return f'session:{session_id}'
+
+
+def live_rooms(device_id, session_id=None) -> list:
+    """Rooms that receive live data from a device (recipients are de-duplicated by Socket.IO)."""
+    rooms = [FIREHOSE_ROOM, device_room(device_id)]
+    if session_id:
+        rooms.append(session_room(session_id))
+    return rooms
+
+
+def _truthy(value) -> bool:
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _emit_client_stats():
+    socketio.emit('client_stats', registry.global_stats(), room=FRONTEND_ROOM)
+
+
+_client_stats = Debouncer(_emit_client_stats, socketio.start_background_task, socketio.sleep)
+
+
+def broadcast_client_stats():
+    """Send client_stats to frontends, folding connection bursts into one emit per debounce window."""
+    delay = current_app.config.get('CLIENT_STATS_DEBOUNCE_MS', 0) / 1000.0
+    if delay > 0:
+        _client_stats.trigger(delay)
+    else:
+        _emit_client_stats()
 
 
 @socketio.on('connect')
@@ -30,31 +85,24 @@ def handle_connect(auth=None):
     client_id = request.sid
     client_type = request.args.get('type', 'unknown')  # 'esp32', 'frontend', or 'unknown'
     
-    connected_clients[client_id] = {
-        'type': client_type,
-        'connected_at': datetime.now(JAKARTA_TZ),
-        'last_seen': datetime.now(JAKARTA_TZ)
-    }
+    client = registry.add(client_id, client_type, device_id=request.args.get('device_id'))
     
     logger.info(f"Client connected: {client_id} (type: {client_type})")
     
     # Join appropriate room based on client type
     if client_type == 'frontend':
-        join_room('frontend_clients')
+        join_room(FRONTEND_ROOM)
+        client['subscriptions'] = set()
+        if _truthy(request.args.get('firehose', False)):
+            join_room(FIREHOSE_ROOM)
+            client['subscriptions'].add(FIREHOSE_ROOM)
         emit('connection_status', {'status': 'connected', 'message': 'Connected to stress monitoring server'})
     elif client_type == 'esp32':
         join_room('esp32_clients')
         emit('connection_status', {'status': 'connected', 'message': 'ESP32 connected successfully'})
     
     # Broadcast client count to frontend
-    frontend_count = sum(1 for c in connected_clients.values() if c['type'] == 'frontend')
-    esp32_count = sum(1 for c in connected_clients.values() if c['type'] == 'esp32')
-    
-    socketio.emit('client_stats', {
-        'frontend_clients': frontend_count,
-        'esp32_clients': esp32_count,
-        'total_clients': len(connected_clients)
-    }, room='frontend_clients')
+    broadcast_client_stats()
 
 
 @socketio.on('disconnect')
@@ -62,26 +110,18 @@ def handle_disconnect():
     """Handle client disconnection."""
     client_id = request.sid
     
-    if client_id in connected_clients:
-        client_info = connected_clients[client_id]
+    client_info = registry.remove(client_id)
+    if client_info is not None:
         logger.info(f"Client disconnected: {client_id} (type: {client_info['type']})")
-        del connected_clients[client_id]
         
         # Update client count for frontend
-        frontend_count = sum(1 for c in connected_clients.values() if c['type'] == 'frontend')
-        esp32_count = sum(1 for c in connected_clients.values() if c['type'] == 'esp32')
-        
-        socketio.emit('client_stats', {
-            'frontend_clients': frontend_count,
-            'esp32_clients': esp32_count,
-            'total_clients': len(connected_clients)
-        }, room='frontend_clients')
+        broadcast_client_stats()
 
 
 @socketio.on('esp32_live_data')
 def handle_esp32_live_data(data):
     """
-    Handle real-time ESP32 data relay without database or ML processing.
+    Handle real-time ESP32 data relay, optionally persisting and scoring it.
     
     Expected data format:
     {
@@ -96,13 +136,14 @@ def handle_esp32_live_data(data):
         client_id = request.sid
 
         # Validate client type
-        if client_id not in connected_clients or connected_clients[client_id]['type'] != 'esp32':
+        client = registry.get(client_id)
+        if client is None or client['type'] != 'esp32':
             logger.warning(f"Unauthorized live data from {client_id}")
             emit('error', {'message': 'Unauthorized: Only ESP32 clients can send live data'})
             return
 
         # Update last seen
-        connected_clients[client_id]['last_seen'] = datetime.now(JAKARTA_TZ)
+        registry.touch(client_id)
 
         # Validate required fields
         required_fields = ['hr', 'temp', 'eda']
@@ -130,8 +171,12 @@ def handle_esp32_live_data(data):
         temp = float(data['temp'])
         eda = float(data['eda'])
         device_id = data.get('device_id', 'ESP32_Unknown')
+        registry.bind_device(client_id, device_id)
+
+        # Persist and score through the optional live pipeline stages
+        buffered = _ingest(device_id, data.get('session_id'), [timestamp.timestamp()], [hr], [temp], [eda]) == 1
 
-        # Prepare relay payload (no ML, no DB)
+        # Prepare relay payload
         relay_payload = {
             'timestamp': timestamp.isoformat(),
             'hr': hr,
@@ -141,13 +186,25 @@ def handle_esp32_live_data(data):
         }
 
         # Send confirmation to ESP32
-        emit('live_data_received', {
-            'status': 'success',
-            'message': 'Live data relayed successfully'
-        })
+        if buffered:
+            emit('live_data_received', {
+                'status': 'success',
+                'message': 'Live data relayed successfully'
+            })
+        else:
+            logger.warning(f"Live buffer full, reading from {device_id} not persisted")
+            emit('live_data_received', {
+                'status': 'backpressure',
+                'message': 'Server buffer is full; live data relayed but not persisted'
+            })
 
-        # Broadcast to all frontend clients
-        socketio.emit('live_sensor_data', relay_payload, room='frontend_clients')
+        # Fan out to subscribers of this device/session and to the firehose,
+        # coalesced into live_sensor_batch frames when a frame rate is configured
+        live_broadcast = current_app.extensions.get('live_broadcast')
+        if live_broadcast is not None:
+            live_broadcast.add(device_id, data.get('session_id'), timestamp.timestamp(), hr, temp, eda)
+        else:
+            socketio.emit('live_sensor_data', relay_payload, to=live_rooms(device_id, data.get('session_id')))
         
         logger.info(f"Relayed live data from {device_id}: HR={hr}, Temp={temp}, EDA={eda}")
 
@@ -156,12 +213,157 @@ def handle_esp32_live_data(data):
         emit('error', {'message': f'Live data relay error: {str(e)}'})
 
 
+def _ingest(device_id, session_id, timestamps, hr, temp, eda) -> int:
+    """Hand samples (timestamps in Unix epoch seconds) to the optional persistence and inference stages.
+
+    Returns how many samples the write-behind buffer accepted (all of them
+    when persistence is disabled).
+    """
+    # Hand the readings to the write-behind buffer when persistence is enabled
+    live_buffer = current_app.extensions.get('live_buffer')
+    accepted = len(timestamps) if live_buffer is None else live_buffer.add_many(
+        device_id, session_id, timestamps, hr, temp, eda)
+
+    # Feed the per-device window scored by the live inference stage
+    live_inference = current_app.extensions.get('live_inference')
+    if live_inference is not None:
+        live_inference.add_many(device_id, session_id, timestamps, hr, temp, eda)
+    return accepted
+
+
+# Latest timestamp accepted in packed frames (year 9999)
+MAX_PACKED_TS = 253402300800.0
+
+
+@socketio.on('esp32_live_packed')
+def handle_esp32_live_packed(data):
+    """
+    Handle a binary frame of many live samples (see PACKED_SAMPLE_DTYPE).
+
+    Expected data: the raw frame bytes, or
+    {
+        'device_id': 'ESP32_001',   # optional, defaults to the device bound to the connection
+        'session_id': '<uuid>',     # optional
+        'samples': <bytes>          # N x 20 bytes: <f8 ts, <f4 hr, <f4 temp, <f4 eda
+    }
+
+    Samples go through the same persistence/inference path as esp32_live_data
+    and are relayed to subscribers as one live_sensor_batch frame.
+    """
+    try:
+        client_id = request.sid
+        client = registry.get(client_id)
+        if client is None or client['type'] != 'esp32':
+            logger.warning(f"Unauthorized packed live data from {client_id}")
+            emit('error', {'message': 'Unauthorized: Only ESP32 clients can send live data'})
+            return
+        registry.touch(client_id)
+
+        meta = data if isinstance(data, dict) else {'samples': data}
+        try:
+            samples = decode_packed_samples(meta.get('samples') or b'')
+        except (TypeError, ValueError) as e:
+            emit('error', {'message': f'Invalid packed frame: {e}'})
+            return
+
+        device_id = meta.get('device_id') or client['device_id'] or 'ESP32_Unknown'
+        session_id = meta.get('session_id')
+        registry.bind_device(client_id, device_id)
+
+        # Drop samples with NaN/inf readings or an impossible timestamp;
+        # float32 values are rounded for the relay. Rows are (epoch seconds, hr, temp, eda)
+        # and stay numpy arrays until the DB write or the relay payload.
+        table = np.column_stack([samples['ts'], samples['hr'], samples['temp'], samples['eda']]).astype(np.float64)
+        table[:, 1:] = table[:, 1:].round(4)
+        valid = np.isfinite(table).all(axis=1) & (table[:, 0] >= 0) & (table[:, 0] < MAX_PACKED_TS)
+        table = table[valid]
+        table[table[:, 0] == 0, 0] = time.time()
+        epoch, hr, temp, eda = table.T
+
+        accepted = _ingest(device_id, session_id, epoch, hr, temp, eda)
+        emit('live_data_received', {
+            'status': 'success' if accepted == len(table) else 'backpressure',
+            'received': len(samples),
+            'rejected': int(len(samples) - len(table)),
+            'persisted': accepted
+        })
+
+        if len(table):
+            live_broadcast = current_app.extensions.get('live_broadcast')
+            if live_broadcast is not None:
+                live_broadcast.add_many(device_id, session_id, epoch, hr, temp, eda)
+            else:
+                socketio.emit('live_sensor_batch', batch_payload(device_id, session_id, table),
+                              to=live_rooms(device_id, session_id))
+
+    except Exception as e:
+        logger.error(f"Error relaying packed ESP32 live data: {e}")
+        emit('error', {'message': f'Live data relay error: {str(e)}'})
+
+
+def _subscription_rooms(data) -> list:
+    """Rooms named by a subscribe/unsubscribe payload: device_id(s), session_id(s), firehose."""
+    data = data or {}
+    rooms = []
+    for key, room_name in (('device_id', device_room), ('session_id', session_room)):
+        values = data.get(key) or []
+        if isinstance(values, str):
+            values = [values]
+        rooms.extend(room_name(str(v)) for v in values)
+    if _truthy(data.get('firehose', False)):
+        rooms.append(FIREHOSE_ROOM)
+    return rooms
+
+
+@socketio.on('subscribe')
+def handle_subscribe(data=None):
+    """
+    Subscribe a frontend to live streams.
+
+    Expected data format:
+    {
+        'device_id': 'ESP32_001',       # or a list of device ids (optional)
+        'session_id': '<uuid>',         # or a list of session ids (optional)
+        'firehose': false               # every device's data (optional)
+    }
+    """
+    client_id = request.sid
+    client = registry.get(client_id)
+    if not client or client['type'] != 'frontend':
+        emit('error', {'message': 'Unauthorized: Only frontend clients can subscribe'})
+        return
+
+    rooms = _subscription_rooms(data)
+    if not rooms:
+        emit('error', {'message': 'Nothing to subscribe to: provide device_id, session_id or firehose'})
+        return
+
+    for room in rooms:
+        join_room(room)
+    client.setdefault('subscriptions', set()).update(rooms)
+    emit('subscribed', {'rooms': rooms, 'subscriptions': sorted(client['subscriptions'])})
+
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(data=None):
+    """Leave live stream rooms; accepts the same payload as `subscribe`."""
+    client_id = request.sid
+    client = registry.get(client_id)
+    if not client or client['type'] != 'frontend':
+        emit('error', {'message': 'Unauthorized: Only frontend clients can unsubscribe'})
+        return
+
+    rooms = _subscription_rooms(data)
+    for room in rooms:
+        leave_room(room)
+    client.setdefault('subscriptions', set()).difference_update(rooms)
+    emit('unsubscribed', {'rooms': rooms, 'subscriptions': sorted(client['subscriptions'])})
+
+
 @socketio.on('ping')
 def handle_ping():
     """Handle ping from clients for connection testing."""
-    client_id = request.sid
-    if client_id in connected_clients:
-        connected_clients[client_id]['last_seen'] = datetime.now(JAKARTA_TZ)
+    registry.touch(request.sid)
     
     emit('pong', {'timestamp': datetime.now(JAKARTA_TZ).isoformat()})
 
@@ -173,6 +375,7 @@ def handle_health_check():
     emit('health_status', {
         'status': 'healthy',
         'timestamp': datetime.now(JAKARTA_TZ).isoformat(),
-        'connected_clients': len(connected_clients),
+        'connected_clients': len(registry),
+        'client_stats': registry.global_stats(),
         'server_info': 'Flask-SocketIO Real-time Relay Server'
     })
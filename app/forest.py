@@ -0,0 +1,347 @@
+"""
+Flat, memory-mappable representation of a fitted tree ensemble.
+
+A pickled scikit-learn forest cannot be shared between worker processes:
+unpickling copies every tree's node arrays into private memory. FlatForest
+stores the nodes of all trees in a handful of plain ``.npy`` arrays, which
+each worker opens with ``numpy.load(mmap_mode='r')`` so they all read the
+same page-cache copy.
+
+``FlatForest.fold_scaler`` moves a StandardScaler into the split thresholds,
+so the prediction fast path compares unscaled input rows directly and skips
+the DataFrame/transform step.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+FORMAT_VERSION = 1
+ARRAYS = ('children_left', 'children_right', 'feature', 'threshold', 'value', 'roots')
+
+
+def file_digest(path) -> str:
+    """sha256 of a file, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FlatForest:
+    """Tree ensemble as flat node arrays with the predict_proba/predict/classes_ API of the source model.
+
+    Nodes of all trees are concatenated; child indexes are global and -1
+    marks a leaf. ``value`` holds the class probabilities of each node and
+    ``roots`` the index of each tree's root.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+        self.children_left = arrays['children_left']
+        self.children_right = arrays['children_right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.meta = meta
+        self.classes_ = np.asarray(meta['classes'])
+        self.n_features_in_ = int(meta['n_features'])
+        self.max_depth = int(meta['max_depth'])
+        # Set by fold_scaler(): [left | right] children with leaves pointing at themselves
+        self._next: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_sklearn(cls, model, source_digest: Optional[str] = None) -> 'FlatForest':
+        """Flatten a fitted forest (RandomForestClassifier, ExtraTreesClassifier, ...)."""
+        estimators = getattr(model, 'estimators_', None)
+        if not estimators or not all(hasattr(est, 'tree_') for est in estimators):
+            raise TypeError(f"{type(model).__name__} is not a fitted tree ensemble")
+        if getattr(model, 'n_outputs_', 1) != 1:
+            raise TypeError('Multi-output forests are not supported')
+
+        parts = {name: [] for name in ARRAYS if name != 'roots'}
+        roots, offset, max_depth = [], 0, 0
+        for est in estimators:
+            tree = est.tree_
+            left, right = tree.children_left, tree.children_right
+            parts['children_left'].append(np.where(left == -1, -1, left + offset))
+            parts['children_right'].append(np.where(right == -1, -1, right + offset))
+            parts['feature'].append(np.where(left == -1, 0, tree.feature))
+            parts['threshold'].append(tree.threshold)
+            value = tree.value[:, 0, :].astype(np.float64)
+            parts['value'].append(value / value.sum(axis=1, keepdims=True))
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        arrays = {
+            'children_left': np.concatenate(parts['children_left']).astype(np.int32),
+            'children_right': np.concatenate(parts['children_right']).astype(np.int32),
+            'feature': np.concatenate(parts['feature']).astype(np.int32),
+            'threshold': np.concatenate(parts['threshold']).astype(np.float64),
+            'value': np.concatenate(parts['value']),
+            'roots': np.asarray(roots, dtype=np.int32),
+        }
+        meta = {
+            'format': FORMAT_VERSION,
+            'model_class': type(model).__name__,
+            'classes': model.classes_.tolist(),
+            'n_features': int(model.n_features_in_),
+            'n_trees': len(estimators),
+            'n_nodes': int(offset),
+            'max_depth': int(max_depth),
+            'source_digest': source_digest,
+        }
+        return cls(arrays, meta)
+
+    def fold_scaler(self, scaler, input_order=None) -> 'FlatForest':
+        """Forest taking unscaled rows, equivalent to ``predict_proba(scaler.transform(X[:, input_order]))``.
+
+        Every threshold is replaced by the largest float64 input value whose
+        scaled, float32-cast value is still <= the original threshold, so the
+        raw comparison takes the same branch as scikit-learn for every input.
+        `input_order[j]` is the input column holding model feature j. Children
+        and values stay shared with this forest.
+        """
+        from sklearn.preprocessing import StandardScaler
+
+        if not isinstance(scaler, StandardScaler):
+            raise TypeError(f"Cannot fold {type(scaler).__name__} into the forest")
+        if self.meta.get('folded'):
+            raise ValueError('Forest already has a scaler folded in')
+
+        n = self.n_features_in_
+        mean = np.zeros(n) if scaler.mean_ is None else np.asarray(scaler.mean_, dtype=np.float64)
+        scale = np.ones(n) if scaler.scale_ is None else np.asarray(scaler.scale_, dtype=np.float64)
+        order = np.arange(n) if input_order is None else np.asarray(input_order)
+        if sorted(order.tolist()) != list(range(n)):
+            raise ValueError(f"input_order must be a permutation of 0..{n - 1}")
+
+        feature = np.asarray(self.feature)
+        arrays = {name: getattr(self, name) for name in ARRAYS}
+        arrays['threshold'] = _raw_thresholds(np.asarray(self.threshold), mean[feature], scale[feature])
+        arrays['feature'] = order[feature].astype(np.int32)
+        meta = dict(self.meta, folded=True, input_order=order.tolist())
+        folded = FlatForest(arrays, meta)
+
+        nodes = np.arange(len(feature), dtype=np.int32)
+        left, right = np.asarray(self.children_left), np.asarray(self.children_right)
+        folded._next = np.concatenate([np.where(left == -1, nodes, left), np.where(right == -1, nodes, right)]).astype(np.int32)
+        return folded
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(getattr(self, name).nbytes for name in ARRAYS))
+
+    @property
+    def is_mapped(self) -> bool:
+        return isinstance(self.value, np.memmap)
+
+    def save(self, directory) -> Path:
+        """Write the arrays and metadata to `directory`, replacing it atomically."""
+        if self._next is not None:
+            raise ValueError('A forest with a folded scaler is rebuilt from its source, not saved')
+        directory = Path(directory)
+        tmp = directory.with_name(f'{directory.name}.tmp-{uuid.uuid4().hex[:8]}')
+        tmp.mkdir(parents=True)
+        try:
+            for name in ARRAYS:
+                np.save(tmp / f'{name}.npy', np.ascontiguousarray(getattr(self, name)))
+            (tmp / 'meta.json').write_text(json.dumps(self.meta, indent=2))
+            if directory.exists():
+                shutil.rmtree(directory)
+            os.replace(tmp, directory)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            # Another worker may have written the same forest first
+            if not (directory / 'meta.json').exists():
+                raise
+        return directory
+
+    @classmethod
+    def load(cls, directory, mmap: bool = True) -> 'FlatForest':
+        directory = Path(directory)
+        meta = json.loads((directory / 'meta.json').read_text())
+        if meta.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported forest format {meta.get('format')} in {directory}")
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(directory / f'{name}.npy', mmap_mode=mode) for name in ARRAYS}
+        return cls(arrays, meta)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Average of the per-tree leaf probabilities, like the scikit-learn forest.
+
+        Every (tree, sample) pair advances one level per step and pairs that
+        reached a leaf drop out, so the Python loop runs at most `max_depth`
+        times whatever the forest or batch size.
+        """
+        if self._next is not None:
+            # thresholds are already in input units, see fold_scaler()
+            X = np.asarray(X, dtype=np.float64)
+        else:
+            # scikit-learn compares float32 features against float64 thresholds
+            X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got shape {X.shape}")
+        n_samples, n_trees = X.shape[0], len(self.roots)
+        if self._next is not None:
+            return self._predict_fixed_depth(X)
+
+        node = np.repeat(np.asarray(self.roots), n_samples)
+        sample = np.tile(np.arange(n_samples), n_trees)
+        active = np.arange(node.size)
+        for _ in range(self.max_depth + 1):
+            current = node[active]
+            left = self.children_left[current]
+            internal = left != -1
+            if not internal.all():
+                active, current, left = active[internal], current[internal], left[internal]
+            if not active.size:
+                break
+            go_left = X[sample[active], self.feature[current]] <= self.threshold[current]
+            node[active] = np.where(go_left, left, self.children_right[current])
+
+        return self.value[node].reshape(n_trees, n_samples, self.value.shape[1]).mean(axis=0)
+
+    def _predict_fixed_depth(self, X: np.ndarray) -> np.ndarray:
+        # Leaves loop back to themselves, so every pair takes exactly max_depth
+        # steps with no masking; a step is four gathers and a compare, which is
+        # what makes single-row calls cheap.
+        n_samples, n_trees, n_nodes = X.shape[0], len(self.roots), len(self.feature)
+        flat = np.ascontiguousarray(X).ravel()
+        row_start = np.tile(np.arange(n_samples) * X.shape[1], n_trees)
+        node = np.repeat(np.asarray(self.roots), n_samples)
+        for _ in range(self.max_depth):
+            right = flat.take(row_start + self.feature.take(node)) > self.threshold.take(node)
+            node = self._next.take(node + n_nodes * right)
+        return self.value.take(node, axis=0).reshape(n_trees, n_samples, self.value.shape[1]).mean(axis=0)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+_SIGN = np.int64(np.iinfo(np.int64).min)
+
+
+def _ordered(x: np.ndarray) -> np.ndarray:
+    """Map float64 values to int64 keys with the same ordering."""
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return np.where(bits < 0, -(bits & ~_SIGN), bits)
+
+
+def _unordered(keys: np.ndarray) -> np.ndarray:
+    return np.where(keys < 0, -keys | _SIGN, keys).view(np.float64)
+
+
+def _raw_thresholds(threshold: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """Largest float64 x with ``float32((x - mean) / scale) <= threshold``, elementwise.
+
+    The scaled value is monotonic in x, so bisection over the ordered bit
+    patterns of float64 finds the exact boundary in 64 vectorised steps.
+    """
+    def passes(keys):
+        with np.errstate(over='ignore', invalid='ignore'):
+            return ((_unordered(keys) - mean) / scale).astype(np.float32) <= threshold
+
+    largest = np.finfo(np.float64).max
+    lo = np.full(threshold.shape, _ordered(-largest))  # scales to -inf: always passes
+    hi = np.full(threshold.shape, _ordered(largest))   # scales to +inf: never passes
+    one = np.uint64(1)
+    for _ in range(64):
+        ulo = lo.view(np.uint64)
+        mid = (ulo + ((hi.view(np.uint64) - ulo) >> one)).view(np.int64)
+        ok = passes(mid)
+        lo, hi = np.where(ok, mid, lo), np.where(ok, hi, mid)
+    return _unordered(lo)
+
+
+def load_or_build(model_path, directory=None, mmap: bool = True, loader=None) -> FlatForest:
+    """Open the flat copy of the pickled forest at `model_path`, (re)building it when missing or stale.
+
+    The copy lives next to the pickle in ``<name>.forest/`` and is tied to
+    the pickle's sha256, so replacing the pickle rebuilds it on next start.
+    """
+    import joblib
+
+    model_path = Path(model_path)
+    directory = Path(directory) if directory else model_path.with_suffix('.forest')
+    digest = file_digest(model_path)
+
+    meta_path = directory / 'meta.json'
+    if meta_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text())
+        except ValueError:
+            meta = {}
+        if meta.get('source_digest') == digest and meta.get('format') == FORMAT_VERSION:
+            return FlatForest.load(directory, mmap=mmap)
+
+    model = (loader or joblib.load)(str(model_path))
+    forest = FlatForest.from_sklearn(model, source_digest=digest)
+    verify(forest, model)
+    forest.save(directory)
+    return FlatForest.load(directory, mmap=mmap)
+
+
+def verify(forest: FlatForest, model, n_samples: int = 512, seed: int = 0) -> None:
+    """Raise ValueError unless `forest` reproduces `model.predict_proba`.
+
+    Probes random points plus points lying exactly on split thresholds,
+    where a wrong comparison or dtype would show first.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.normal(scale=2.0, size=(n_samples, forest.n_features_in_))
+    internal = forest.children_left != -1
+    for f in range(forest.n_features_in_):
+        thresholds = forest.threshold[internal & (forest.feature == f)]
+        if len(thresholds):
+            X[:, f] = np.where(rng.random(n_samples) < 0.5, rng.choice(thresholds, n_samples), X[:, f])
+
+    expected = model.predict_proba(X)
+    if not np.allclose(forest.predict_proba(X), expected, rtol=0, atol=1e-9):
+        raise ValueError('Flattened forest does not reproduce the source model predictions')
+
+
+def verify_folded(folded: FlatForest, scaler, model, n_samples: int = 512, seed: int = 0) -> int:
+    """Raise ValueError unless `folded` reproduces scaler + `model` on unscaled rows. Returns the rows probed.
+
+    Probes random rows around the scaler's mean plus rows lying on, and one
+    float64 step above, every folded threshold.
+    """
+    order = np.asarray(folded.meta['input_order'])
+    n = folded.n_features_in_
+    rng = np.random.default_rng(seed)
+
+    mean = np.zeros(n) if scaler.mean_ is None else scaler.mean_
+    scale = np.ones(n) if scaler.scale_ is None else scaler.scale_
+    X = np.empty((n_samples, n))
+    X[:, order] = mean + scale * rng.normal(scale=2.0, size=(n_samples, n))
+    internal = folded.children_left != -1
+    for col in range(n):
+        thresholds = folded.threshold[internal & (folded.feature == col)]
+        if len(thresholds):
+            picked = rng.choice(thresholds, n_samples)
+            picked = np.where(rng.random(n_samples) < 0.5, picked, np.nextafter(picked, np.inf))
+            X[:, col] = np.where(rng.random(n_samples) < 0.5, picked, X[:, col])
+
+    # Feed the scaler the way it was fitted, with column names when it has them
+    model_X = X[:, order]
+    names = getattr(scaler, 'feature_names_in_', None)
+    if names is not None:
+        import pandas as pd
+        model_X = pd.DataFrame(model_X, columns=list(names))
+
+    expected = model.predict_proba(scaler.transform(model_X))
+    if not np.allclose(folded.predict_proba(X), expected, rtol=0, atol=1e-9):
+        raise ValueError('Forest with the folded scaler does not reproduce the scaler + model predictions')
+    return n_samples
+
+
+__all__ = ['FlatForest', 'file_digest', 'load_or_build', 'verify', 'verify_folded']
@@ -0,0 +1,607 @@
+"""
+Live data pipeline stages for the ESP32 WebSocket feed.
+
+- LiveReadingBuffer: opt-in write-behind persistence of live readings
+- LiveInferenceStage: opt-in streaming stress prediction over per-device windows
+- LiveBroadcastCoalescer: opt-in frame-rate limited relay of live readings to frontends
+- decode_packed_samples: zero-copy view over the binary `esp32_live_packed` frames
+"""
+
+import logging
+import threading
+from abc import ABC, abstractmethod
+import time
+from collections import deque
+from datetime import datetime, timezone, timedelta
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .offload import run_io
+
+logger = logging.getLogger(__name__)
+
+# Jakarta timezone (UTC+7)
+JAKARTA_TZ = timezone(timedelta(hours=7))
+
+
+# One sample of an `esp32_live_packed` frame: 20 bytes, little-endian, no padding.
+# ts is Unix time in seconds; 0 means "use the server receive time".
+PACKED_SAMPLE_DTYPE = np.dtype([('ts', '<f8'), ('hr', '<f4'), ('temp', '<f4'), ('eda', '<f4')])
+
+
+def decode_packed_samples(frame) -> np.ndarray:
+    """View a packed frame as a structured array without copying it.
+
+    Raises ValueError when the frame is empty or not a whole number of samples.
+    """
+    frame = memoryview(frame)
+    if not frame.nbytes or frame.nbytes % PACKED_SAMPLE_DTYPE.itemsize:
+        raise ValueError(
+            f'Packed frame must be a non-empty multiple of {PACKED_SAMPLE_DTYPE.itemsize} bytes, '
+            f'got {frame.nbytes}'
+        )
+    return np.frombuffer(frame, dtype=PACKED_SAMPLE_DTYPE)
+
+
+def _wall_clock(epoch: np.ndarray, unit: str) -> np.ndarray:
+    """Jakarta wall-clock datetime64 values for Unix epoch seconds."""
+    scale = {'ms': 1e3, 'us': 1e6}[unit]
+    ticks = np.round(np.asarray(epoch, dtype=np.float64) * scale).astype(np.int64)
+    return ticks.astype(f'datetime64[{unit}]') + np.timedelta64(7, 'h')
+
+
+def epoch_to_datetimes(epoch: np.ndarray) -> List[datetime]:
+    """Naive Jakarta wall-clock datetimes (how timestamps are stored) for Unix epoch seconds."""
+    return _wall_clock(epoch, 'us').tolist()
+
+
+def epoch_to_iso(epoch: np.ndarray) -> List[str]:
+    """ISO strings with the Jakarta offset, millisecond precision, for Unix epoch seconds."""
+    return np.char.add(np.datetime_as_string(_wall_clock(epoch, 'ms'), unit='ms'), '+07:00').tolist()
+
+
+def _columns(timestamps, hr, temp, eda) -> np.ndarray:
+    """One float64 row per sample: epoch seconds, hr, temp, eda."""
+    return np.column_stack([timestamps, hr, temp, eda]).astype(np.float64, copy=False)
+
+
+def _thread_task(target, *args, **kwargs):
+    """Default background task starter when no Socket.IO server is wired in."""
+    thread = threading.Thread(target=target, args=args, kwargs=kwargs, daemon=True)
+    thread.start()
+    return thread
+
+
+class _BackgroundLoop(ABC):
+    """Start-once background task that calls `_work()` every `interval` seconds until stopped.
+
+    Subclasses implement `_work()` and keep a `stats` dict with an 'errors' counter;
+    a failing pass is counted and logged, and the loop carries on.
+    """
+
+    _task_name = 'Background task'
+
+    def __init__(self, interval: float, start_task: Callable = _thread_task,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.interval = float(interval)
+        self._start_task = start_task
+        self._sleep = sleep
+        self._loop_lock = threading.Lock()
+        self._running = False
+
+    def _ensure_started(self) -> None:
+        if self._running:
+            return
+        with self._loop_lock:
+            if self._running:
+                return
+            self._running = True
+            self._on_start()
+        self._start_task(self._run)
+
+    def _on_start(self) -> None:
+        pass
+
+    def _wait(self) -> None:
+        self._sleep(self.interval)
+
+    def _run(self) -> None:
+        while self._running:
+            self._wait()
+            try:
+                self._work()
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"{self._task_name} failed: {e}")
+
+    @abstractmethod
+    def _work(self) -> None:
+        """One pass of the loop: flush, tick, ..."""
+
+    def stop(self) -> None:
+        self._running = False
+
+
+class LiveReadingBuffer(_BackgroundLoop):
+    """Write-behind buffer that persists live readings to `sensor_readings` in bulk.
+
+    Readings are grouped per (device_id, session_id) in memory and flushed by a
+    background task when `batch_size` readings are waiting or every
+    `flush_interval` seconds. When `max_pending` readings are queued or being
+    written, add() refuses new ones (backpressure) instead of growing without bound.
+    Samples stay in numpy column chunks until flush() turns them into rows.
+    Readings without a session_id go to one live session per device,
+    created on first flush. The background flush only swaps the buffers on
+    the calling (hub) thread and hands the database work to `run_io`.
+    """
+
+    _task_name = 'Live reading flush'
+
+    def __init__(
+        self,
+        app,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 100000,
+        start_task: Callable = _thread_task,
+        create_event: Callable[[], Any] = threading.Event,
+        run_io: Callable = run_io,
+    ):
+        super().__init__(flush_interval, start_task)
+        self._app = app
+        self._run_io = run_io
+        self.batch_size = max(int(batch_size), 1)
+        self.max_pending = max(int(max_pending), 1)
+        self._create_event = create_event
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffers: Dict[Tuple[str, Optional[str]], List[np.ndarray]] = {}
+        self._sizes: Dict[Tuple[str, Optional[str]], int] = {}
+        self._pending = 0
+        self._device_sessions: Dict[str, str] = {}
+        self._wake = None
+
+        self.stats = {
+            'accepted': 0,
+            'rejected': 0,
+            'persisted': 0,
+            'failed': 0,
+            'flushes': 0,
+            'errors': 0,
+            'last_flush_ms': 0.0
+        }
+
+    @property
+    def flush_interval(self) -> float:
+        return self.interval
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def add(self, device_id: str, session_id: Optional[str], timestamp: datetime,
+            hr: float, temp: float, eda: float) -> bool:
+        """Queue one reading. Returns False when the buffer is full and the reading was refused."""
+        return self.add_many(device_id, session_id, [timestamp.timestamp()], [hr], [temp], [eda]) == 1
+
+    def add_many(self, device_id: str, session_id: Optional[str], timestamps: Sequence[float],
+                 hr: Sequence[float], temp: Sequence[float], eda: Sequence[float]) -> int:
+        """Queue readings (timestamps in Unix epoch seconds) in order until the buffer is full.
+
+        Returns how many were accepted.
+        """
+        count = len(timestamps)
+        with self._lock:
+            accepted = min(count, max(self.max_pending - self._pending, 0))
+            self.stats['rejected'] += count - accepted
+            if not accepted:
+                return 0
+
+            key = (device_id, session_id)
+            chunk = _columns(timestamps[:accepted], hr[:accepted], temp[:accepted], eda[:accepted])
+            self._buffers.setdefault(key, []).append(chunk)
+            self._sizes[key] = self._sizes.get(key, 0) + accepted
+            self._pending += accepted
+            self.stats['accepted'] += accepted
+            size_trigger = self._sizes[key] >= self.batch_size
+
+        self._ensure_started()
+        if size_trigger and self._wake is not None:
+            self._wake.set()
+        return accepted
+
+    def _on_start(self) -> None:
+        self._wake = self._create_event()
+
+    def _wait(self) -> None:
+        # a full batch wakes the loop early
+        self._wake.wait(self.interval)
+        self._wake.clear()
+
+    def _work(self) -> None:
+        buffers = self._take_all()
+        if buffers:
+            self._run_io(self._write, buffers)
+
+    def _take_all(self) -> Dict[Tuple[str, Optional[str]], List[np.ndarray]]:
+        # _pending keeps counting the taken readings until _write() has written them
+        with self._lock:
+            buffers, self._buffers, self._sizes = self._buffers, {}, {}
+        return buffers
+
+    @staticmethod
+    def _rows(session_id: str, table: np.ndarray, created_at: datetime) -> List[Dict[str, Any]]:
+        timestamps = epoch_to_datetimes(table[:, 0])
+        hr, temp, eda = (table[:, i].tolist() for i in range(1, 4))
+        return [{'session_id': session_id, 'timestamp': ts, 'hr': h, 'temp': t, 'eda': e, 'created_at': created_at}
+                for ts, h, t, e in zip(timestamps, hr, temp, eda)]
+
+    def flush(self) -> int:
+        """Write every buffered reading to the database on the calling thread. Returns the number persisted."""
+        buffers = self._take_all()
+        return self._write(buffers) if buffers else 0
+
+    def _write(self, chunks: Dict[Tuple[str, Optional[str]], List[np.ndarray]]) -> int:
+        from .service import MeasurementSessionService, SensorReadingService
+
+        with self._flush_lock:
+            buffers = {key: np.concatenate(parts) for key, parts in chunks.items()}
+            started = time.perf_counter()
+            persisted = 0
+            try:
+                with self._app.app_context():
+                    # session ids sent by devices may not exist yet; the readings reference them by foreign key
+                    client_sessions = {session_id: device_id for device_id, session_id in buffers if session_id is not None}
+                    try:
+                        MeasurementSessionService.ensure_exists(list(client_sessions), notes='Created for live WebSocket data',
+                                                                device_ids=client_sessions)
+                    except Exception as e:
+                        logger.error(f"Could not create live sessions {client_sessions}: {e}")
+
+                    groups = []
+                    for (device_id, session_id), table in buffers.items():
+                        try:
+                            target = self._device_session(device_id) if session_id is None else session_id
+                            rows = self._rows(target, table, datetime.now(JAKARTA_TZ))
+                        except Exception as e:
+                            self._drop(device_id, len(table), e)
+                            continue
+                        groups.append((device_id, session_id, rows))
+
+                    try:
+                        persisted = len(SensorReadingService.insert_many([row for *_, rows in groups for row in rows]))
+                    except Exception:
+                        # Retry per device/session so one bad group does not drop the rest
+                        for device_id, session_id, rows in groups:
+                            persisted += self._retry_group(device_id, session_id, rows)
+            finally:
+                with self._lock:
+                    self._pending -= sum(len(table) for table in buffers.values())
+
+            self.stats['persisted'] += persisted
+            self.stats['flushes'] += 1
+            self.stats['last_flush_ms'] = round((time.perf_counter() - started) * 1000.0, 3)
+            return persisted
+
+    def _retry_group(self, device_id: str, session_id: Optional[str], rows: List[Dict[str, Any]]) -> int:
+        """Insert one group on its own. Returns the number persisted (0 when dropped)."""
+        from .service import SensorReadingService
+
+        try:
+            return len(SensorReadingService.insert_many(rows))
+        except Exception as e:
+            error = e
+        if session_id is None:
+            # the cached device session may have been deleted since; recreate it and try once more
+            self._device_sessions.pop(device_id, None)
+            try:
+                new_session_id = self._device_session(device_id)
+                for row in rows:
+                    row['session_id'] = new_session_id
+                return len(SensorReadingService.insert_many(rows))
+            except Exception as e:
+                error = e
+                self._device_sessions.pop(device_id, None)
+        self._drop(device_id, len(rows), error)
+        return 0
+
+    def _drop(self, device_id: str, count: int, error: Exception) -> None:
+        logger.error(f"Dropping {count} live readings from {device_id}: {error}")
+        self.stats['failed'] += count
+
+    def _device_session(self, device_id: str) -> str:
+        """Session that collects live readings sent without a session_id."""
+        from .service import MeasurementSessionService
+
+        session_id = self._device_sessions.get(device_id)
+        if session_id is None:
+            session_id = MeasurementSessionService.create({
+                'name': f'Live ESP32 Session - {device_id}',
+                'notes': f'Live WebSocket data from {device_id}',
+                'device_id': device_id
+            })['id']
+            self._device_sessions[device_id] = session_id
+        return session_id
+
+    def close(self) -> None:
+        """Stop the flush loop and persist whatever is still buffered."""
+        self.stop()
+        if self._wake is not None:
+            self._wake.set()
+        self.flush()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(self.stats, pending=self._pending, max_pending=self.max_pending)
+
+
+class _DeviceWindow:
+    __slots__ = ('samples', 'session_id', 'last_timestamp', 'last_seen', 'dirty')
+
+    def __init__(self, size: int):
+        self.samples: Deque[Tuple[float, float, float]] = deque(maxlen=size)
+        self.session_id = None
+        self.last_timestamp = None
+        self.last_seen = 0.0
+        self.dirty = False
+
+
+class LiveInferenceStage(_BackgroundLoop):
+    """Streaming stress prediction for the live feed.
+
+    Each device keeps a sliding window of its last `window_size` samples.
+    Every `interval` seconds, the windows that received new samples are
+    reduced to their mean (HR/TEMP/EDA) and scored together in a single
+    `predict_batch` call, so the model cost follows the tick rate, not the
+    message rate. Each result is handed to `emit(device_id, session_id, payload)`.
+    """
+
+    _task_name = 'Live inference tick'
+
+    def __init__(
+        self,
+        predict_batch: Callable,
+        emit: Callable[[str, Optional[str], Dict[str, Any]], None],
+        window_size: int = 10,
+        interval: float = 1.0,
+        idle_timeout: float = 60.0,
+        start_task: Callable = _thread_task,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        super().__init__(interval, start_task, sleep)
+        self._predict_batch = predict_batch
+        self._emit = emit
+        self.window_size = max(int(window_size), 1)
+        self.idle_timeout = float(idle_timeout)
+
+        self._lock = threading.Lock()
+        self._windows: Dict[str, _DeviceWindow] = {}
+        self.stats = {'ticks': 0, 'predictions': 0, 'errors': 0, 'last_tick_ms': 0.0}
+
+    def add(self, device_id: str, session_id: Optional[str], timestamp: datetime,
+            hr: float, temp: float, eda: float) -> None:
+        self.add_many(device_id, session_id, [timestamp.timestamp()], [hr], [temp], [eda])
+
+    def add_many(self, device_id: str, session_id: Optional[str], timestamps: Sequence[float],
+                 hr: Sequence[float], temp: Sequence[float], eda: Sequence[float]) -> None:
+        """Feed samples (timestamps in Unix epoch seconds) to the device's window."""
+        if not len(timestamps):
+            return
+        # only the newest window_size samples can still be in the window
+        tail = _columns(timestamps[-self.window_size:], hr[-self.window_size:],
+                        temp[-self.window_size:], eda[-self.window_size:])
+        with self._lock:
+            window = self._windows.get(device_id)
+            if window is None:
+                window = self._windows[device_id] = _DeviceWindow(self.window_size)
+            window.samples.extend(map(tuple, tail[:, 1:].tolist()))
+            window.session_id = session_id
+            window.last_timestamp = float(tail[-1, 0])
+            window.last_seen = time.monotonic()
+            window.dirty = True
+
+        self._ensure_started()
+
+    def _work(self) -> None:
+        self.tick()
+
+    def tick(self) -> List[Dict[str, Any]]:
+        """Score every window that changed since the last tick. Returns the emitted payloads."""
+        started = time.perf_counter()
+        now = time.monotonic()
+
+        with self._lock:
+            for device_id in [d for d, w in self._windows.items() if now - w.last_seen > self.idle_timeout]:
+                del self._windows[device_id]
+
+            ready = [(d, w) for d, w in self._windows.items() if w.dirty]
+            features = np.array([np.mean(w.samples, axis=0) for _, w in ready], dtype=float).reshape(-1, 3)
+            meta = [(d, w.session_id, w.last_timestamp, len(w.samples)) for d, w in ready]
+            for _, w in ready:
+                w.dirty = False
+
+        if not meta:
+            return []
+
+        result = self._predict_batch(features)
+        timestamps = epoch_to_iso(np.array([m[2] for m in meta]))
+        payloads = []
+        for i, (device_id, session_id, _, count) in enumerate(meta):
+            payload = {
+                'device_id': device_id,
+                'session_id': session_id,
+                'timestamp': timestamps[i],
+                'label': result['labels'][i],
+                'confidence_level': float(result['confidences'][i]),
+                'model_version': result.get('version'),
+                'window_size': count,
+                'hr': float(features[i, 0]),
+                'temp': float(features[i, 1]),
+                'eda': float(features[i, 2])
+            }
+            self._emit(device_id, session_id, payload)
+            payloads.append(payload)
+
+        self.stats['ticks'] += 1
+        self.stats['predictions'] += len(payloads)
+        self.stats['last_tick_ms'] = round((time.perf_counter() - started) * 1000.0, 3)
+        return payloads
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(self.stats, devices=len(self._windows), window_size=self.window_size,
+                    interval_ms=self.interval * 1000.0)
+
+
+class LiveBroadcastCoalescer(_BackgroundLoop):
+    """Coalesces the live relay into at most one frame per stream per interval.
+
+    Samples are queued per (device_id, session_id), which is what decides the
+    rooms a sample goes to. Every `interval` seconds each stream with new
+    samples is sent as a single `live_sensor_batch` payload whose values are
+    packed into parallel arrays, so a subscriber receives at most 1/interval
+    frames per second per stream whatever the sensor rate is. Samples are kept
+    as numpy column chunks and only converted to JSON lists when a frame is sent.
+    """
+
+    _task_name = 'Live broadcast flush'
+
+    def __init__(
+        self,
+        emit: Callable[[str, Optional[str], Dict[str, Any]], None],
+        interval: float = 0.05,
+        start_task: Callable = _thread_task,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        super().__init__(interval, start_task, sleep)
+        self._emit = emit
+
+        self._lock = threading.Lock()
+        self._streams: Dict[Tuple[str, Optional[str]], List[np.ndarray]] = {}
+        self.stats = {'samples': 0, 'frames': 0, 'errors': 0, 'last_frame_ms': 0.0}
+
+    def add(self, device_id: str, session_id: Optional[str], timestamp: float,
+            hr: float, temp: float, eda: float) -> None:
+        self.add_many(device_id, session_id, [timestamp], [hr], [temp], [eda])
+
+    def add_many(self, device_id: str, session_id: Optional[str], timestamps: Sequence[float],
+                 hr: Sequence[float], temp: Sequence[float], eda: Sequence[float]) -> None:
+        """Queue samples (timestamps in Unix epoch seconds) for the next frame of their stream."""
+        chunk = _columns(timestamps, hr, temp, eda)
+        with self._lock:
+            self._streams.setdefault((device_id, session_id), []).append(chunk)
+            self.stats['samples'] += len(chunk)
+
+        self._ensure_started()
+
+    def _work(self) -> None:
+        self.flush()
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Emit one frame per stream that received samples. Returns the emitted payloads."""
+        with self._lock:
+            streams, self._streams = self._streams, {}
+
+        if not streams:
+            return []
+
+        started = time.perf_counter()
+        payloads = []
+        for (device_id, session_id), chunks in streams.items():
+            payload = batch_payload(device_id, session_id, np.concatenate(chunks))
+            self._emit(device_id, session_id, payload)
+            payloads.append(payload)
+
+        self.stats['frames'] += len(payloads)
+        self.stats['last_frame_ms'] = round((time.perf_counter() - started) * 1000.0, 3)
+        return payloads
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(self.stats, streams=len(self._streams),
+                    max_fps=round(1.0 / self.interval, 3) if self.interval else None)
+
+
+def batch_payload(device_id: str, session_id: Optional[str], table: np.ndarray) -> Dict[str, Any]:
+    """`live_sensor_batch` payload for rows of (epoch seconds, hr, temp, eda)."""
+    return {
+        'device_id': device_id,
+        'session_id': session_id,
+        'count': len(table),
+        'timestamp': epoch_to_iso(table[:, 0]),
+        'hr': table[:, 1].tolist(),
+        'temp': table[:, 2].tolist(),
+        'eda': table[:, 3].tolist()
+    }
+
+
+def _flag(value) -> bool:
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+def init_live_pipeline(app, socketio) -> None:
+    """Create the opt-in live pipeline stages configured for `app` and register them in app.extensions."""
+    import atexit
+    import os
+
+    app.config.setdefault('LIVE_PERSIST_ENABLED', _flag(os.environ.get('LIVE_PERSIST_ENABLED', False)))
+    app.config.setdefault('LIVE_PERSIST_BATCH_SIZE', 500)
+    app.config.setdefault('LIVE_PERSIST_INTERVAL_MS', 1000)
+    app.config.setdefault('LIVE_PERSIST_MAX_PENDING', 100000)
+
+    if app.config['LIVE_PERSIST_ENABLED']:
+        buffer = LiveReadingBuffer(
+            app,
+            batch_size=app.config['LIVE_PERSIST_BATCH_SIZE'],
+            flush_interval=app.config['LIVE_PERSIST_INTERVAL_MS'] / 1000.0,
+            max_pending=app.config['LIVE_PERSIST_MAX_PENDING'],
+            start_task=socketio.start_background_task,
+            create_event=socketio.server.eio.create_event,
+        )
+        app.extensions['live_buffer'] = buffer
+        atexit.register(buffer.close)
+
+    app.config.setdefault('LIVE_INFERENCE_ENABLED', _flag(os.environ.get('LIVE_INFERENCE_ENABLED', False)))
+    app.config.setdefault('LIVE_INFERENCE_WINDOW', 10)
+    app.config.setdefault('LIVE_INFERENCE_INTERVAL_MS', 1000)
+    app.config.setdefault('LIVE_INFERENCE_IDLE_SECONDS', 60)
+
+    if app.config['LIVE_INFERENCE_ENABLED']:
+        from .service import StressModelService
+
+        def emit_prediction(device_id, session_id, payload):
+            from .events import live_rooms
+            socketio.emit('live_stress_prediction', payload, to=live_rooms(device_id, session_id))
+
+        stage = LiveInferenceStage(
+            StressModelService.predict_batch,
+            emit_prediction,
+            window_size=app.config['LIVE_INFERENCE_WINDOW'],
+            interval=app.config['LIVE_INFERENCE_INTERVAL_MS'] / 1000.0,
+            idle_timeout=app.config['LIVE_INFERENCE_IDLE_SECONDS'],
+            start_task=socketio.start_background_task,
+            sleep=socketio.sleep,
+        )
+        app.extensions['live_inference'] = stage
+        atexit.register(stage.stop)
+
+    app.config.setdefault('LIVE_BROADCAST_MAX_FPS', float(os.environ.get('LIVE_BROADCAST_MAX_FPS', 0)))
+
+    if app.config['LIVE_BROADCAST_MAX_FPS'] > 0:
+        def emit_batch(device_id, session_id, payload):
+            from .events import live_rooms
+            socketio.emit('live_sensor_batch', payload, to=live_rooms(device_id, session_id))
+
+        coalescer = LiveBroadcastCoalescer(
+            emit_batch,
+            interval=1.0 / app.config['LIVE_BROADCAST_MAX_FPS'],
+            start_task=socketio.start_background_task,
+            sleep=socketio.sleep,
+        )
+        app.extensions['live_broadcast'] = coalescer
+        atexit.register(coalescer.stop)
+
+
+__all__ = [
+    'PACKED_SAMPLE_DTYPE', 'decode_packed_samples', 'epoch_to_datetimes', 'epoch_to_iso', 'batch_payload',
+    'LiveReadingBuffer', 'LiveInferenceStage', 'LiveBroadcastCoalescer', 'init_live_pipeline'
+]
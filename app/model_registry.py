@@ -0,0 +1,401 @@
+"""
+Model registry: loads the stress model artifacts once at startup.
+
+The scaler and classifier are loaded, validated and warmed up in create_app
+so the first request does not pay the unpickle cost. A failed load leaves
+the instance unready (reported by /api/health/ready) instead of raising on
+the first prediction.
+
+Artifacts can be replaced without a restart: a reload (admin API or the
+MODEL_WATCH_INTERVAL file watcher) builds and warms up a new ModelVersion
+next to the one serving traffic and swaps it in with a single assignment.
+A failed reload keeps the previous version serving.
+
+Tree ensembles are served from a memory-mapped FlatForest (app/forest.py)
+when MODEL_MMAP is on, so worker processes share one copy of the forest.
+With MODEL_FAST_PATH on, the scaler is also folded into the forest's
+thresholds and predictions skip scikit-learn entirely, after checking the
+result matches the scaler + model pipeline.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+import joblib
+import numpy as np
+
+from .forest import FlatForest, file_digest, load_or_build, verify_folded
+
+logger = logging.getLogger(__name__)
+
+# Jakarta timezone (UTC+7)
+JAKARTA_TZ = timezone(timedelta(hours=7))
+
+
+def process_memory() -> Dict[str, int]:
+    """Memory of this process in bytes.
+
+    On Linux, ``pss_bytes`` counts shared pages divided among the processes
+    mapping them, so summing it over workers gives their real footprint.
+    """
+    try:
+        with open('/proc/self/smaps_rollup') as fh:
+            fields = [line.split(':', 1) for line in fh if line.rstrip().endswith(' kB')]
+        kb = {k.strip(): int(v.split()[0]) * 1024 for k, v in fields}
+        return {
+            'rss_bytes': kb.get('Rss', 0),
+            'pss_bytes': kb.get('Pss', 0),
+            'shared_bytes': kb.get('Shared_Clean', 0) + kb.get('Shared_Dirty', 0),
+            'private_bytes': kb.get('Private_Clean', 0) + kb.get('Private_Dirty', 0)
+        }
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is in KiB on Linux
+        return {'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+
+
+class ModelVersion(NamedTuple):
+    """An immutable, warmed-up scaler/classifier pair; replaced as a whole on reload."""
+    version: str
+    scaler: Any
+    model: Any
+    artifacts: Dict[str, Dict[str, Any]]
+    warmup_ms: float
+    loaded_at: datetime
+    # FlatForest with the scaler folded in, or None to serve through scaler + model
+    fast: Any = None
+
+
+class ModelRegistry:
+    """Loads the scaler/classifier pair into StressModelService and tracks readiness.
+
+    States: ``not_loaded`` -> ``loading`` -> ``ready`` or ``failed``; ``lazy``
+    when eager loading is disabled and StressModelService loads on first use.
+    Once a version is active the state stays ``ready`` across reloads.
+    """
+
+    SCALER_FILE = 'scaler_model.pkl'
+    MODEL_FILE = 'classification_rf_model.pkl'
+
+    # Rows of [hr, temp, eda] used to warm up the prediction path
+    WARMUP_SAMPLES = np.array([
+        [65.0, 36.4, 1.5],
+        [85.0, 36.8, 5.0],
+        [110.0, 37.2, 10.0],
+    ])
+
+    def __init__(self, model_dir, warmup_batch_size: int = 64, mmap: bool = True, fast_path: bool = True,
+                 history_size: int = 10):
+        self.model_dir = Path(model_dir)
+        self.warmup_batch_size = max(int(warmup_batch_size), 1)
+        self.mmap = mmap
+        self.fast_path = fast_path
+        # Serialises loads; predictions never take it
+        self._lock = threading.Lock()
+        self._watching = False
+        self.state = 'not_loaded'
+        self.error: Optional[str] = None
+        self.active: Optional[ModelVersion] = None
+        self.reloading = False
+        self.history = deque(maxlen=history_size)
+
+    @property
+    def ready(self) -> bool:
+        return self.state in ('ready', 'lazy')
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.active.version if self.active else None
+
+    def _paths(self) -> Tuple[Path, Path]:
+        return self.model_dir / self.SCALER_FILE, self.model_dir / self.MODEL_FILE
+
+    def signature(self) -> Tuple:
+        """(mtime_ns, size) of each artifact, None for a missing file; cheap change detection."""
+        stats = []
+        for path in self._paths():
+            try:
+                st = path.stat()
+                stats.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stats.append(None)
+        return tuple(stats)
+
+    def _version_id(self) -> str:
+        """Content hash of both artifacts, so the same files always get the same version."""
+        digest = hashlib.sha256()
+        for name, path in zip(('Scaler', 'Model'), self._paths()):
+            if not path.exists():
+                raise RuntimeError(f"{name} not found at {path}")
+            digest.update(file_digest(path).encode())
+        return digest.hexdigest()[:12]
+
+    def _load_artifact(self, name: str, filename: str, artifacts: Dict[str, Dict[str, Any]], mmap: bool = False):
+        path = self.model_dir / filename
+        if not path.exists():
+            raise RuntimeError(f"{name.capitalize()} not found at {path}")
+
+        started = time.perf_counter()
+        obj, info = None, {'format': 'pickle'}
+        if mmap:
+            try:
+                obj = load_or_build(path)
+                info = {'format': 'flat_forest', 'mapped': obj.is_mapped, 'mapped_bytes': obj.nbytes}
+            except TypeError as e:
+                logger.info(f"Serving {name} from the pickle: {e}")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Memory-mapped {name} unavailable, serving it from the pickle: {e}")
+        if obj is None:
+            obj = joblib.load(str(path))
+        load_ms = (time.perf_counter() - started) * 1000.0
+        size = path.stat().st_size
+
+        artifacts[name] = dict(info, path=str(path), size_bytes=size, load_ms=round(load_ms, 3))
+        logger.info(f"Loaded {name} from {path} ({size / 1024:.1f} KiB, {info['format']}) in {load_ms:.1f} ms")
+        return obj
+
+    @staticmethod
+    def _validate(scaler, model, service) -> None:
+        n_features = len(service.FEATURE_COLUMNS)
+        if not hasattr(scaler, 'transform'):
+            raise RuntimeError(f"Scaler {type(scaler).__name__} has no transform()")
+        if not hasattr(model, 'predict'):
+            raise RuntimeError(f"Model {type(model).__name__} has no predict()")
+
+        names = getattr(scaler, 'feature_names_in_', None)
+        if names is not None and list(names) != service.FEATURE_COLUMNS:
+            raise RuntimeError(f"Scaler was fitted on {list(names)}, expected {service.FEATURE_COLUMNS}")
+        for name, obj in (('Scaler', scaler), ('Model', model)):
+            fitted = getattr(obj, 'n_features_in_', n_features)
+            if fitted != n_features:
+                raise RuntimeError(f"{name} expects {fitted} features, expected {n_features}")
+
+        unknown = [c for c in getattr(model, 'classes_', []) if int(c) not in service.LABELS]
+        if unknown:
+            raise RuntimeError(f"Model predicts unknown classes {unknown}")
+
+    @staticmethod
+    def _single_row_us(predict, row: np.ndarray, repeat: int = 20) -> float:
+        """Median latency of one single-row prediction, in microseconds."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            predict(row)
+            timings.append(time.perf_counter() - started)
+        return round(float(np.median(timings)) * 1e6, 1)
+
+    def _compile(self, service, scaler, model, artifacts: Dict[str, Dict[str, Any]]):
+        """Fold the scaler into a flat copy of the forest and check it against the pipeline.
+
+        Returns the folded forest, or None (with the reason in the artifacts)
+        when the model or scaler cannot be folded or the check fails.
+        """
+        started = time.perf_counter()
+        try:
+            flat = model if isinstance(model, FlatForest) else FlatForest.from_sklearn(model)
+            fast = flat.fold_scaler(scaler, input_order=service.INPUT_ORDER)
+            probed = verify_folded(fast, scaler, model)
+        except (TypeError, ValueError) as e:
+            logger.info(f"Prediction fast path unavailable, serving through the scaler: {e}")
+            artifacts['fast_path'] = {'enabled': False, 'reason': str(e)}
+            return None
+        compile_ms = (time.perf_counter() - started) * 1000.0
+
+        row = self.WARMUP_SAMPLES[1:2]
+        latency = {
+            'pipeline': self._single_row_us(lambda X: service._predict_with(scaler, model, X), row),
+            'fast': self._single_row_us(lambda X: service._predict_with(scaler, model, X, fast=fast), row),
+        }
+        artifacts['fast_path'] = {
+            'enabled': True,
+            'verified_rows': probed,
+            'compile_ms': round(compile_ms, 3),
+            'single_row_us': latency
+        }
+        logger.info(f"Prediction fast path ready: {latency['fast']:.0f} us per row vs {latency['pipeline']:.0f} us")
+        return fast
+
+    def _warm_up(self, service, scaler, model, fast=None) -> float:
+        # One single-row call and one full batch, so both paths are exercised
+        started = time.perf_counter()
+        service._predict_with(scaler, model, self.WARMUP_SAMPLES[:1], fast=fast)
+        reps = -(-self.warmup_batch_size // len(self.WARMUP_SAMPLES))
+        labels, _ = service._predict_with(scaler, model, np.tile(self.WARMUP_SAMPLES, (reps, 1))[:self.warmup_batch_size],
+                                          fast=fast)
+        if len(labels) != self.warmup_batch_size:
+            raise RuntimeError('Warm-up batch returned the wrong number of predictions')
+        warmup_ms = round((time.perf_counter() - started) * 1000.0, 3)
+        logger.info(f"Model warm-up finished in {warmup_ms:.1f} ms")
+        return warmup_ms
+
+    def _build(self, service, version: str) -> ModelVersion:
+        """Load, validate and warm up a candidate without touching the active version."""
+        artifacts = {}
+        scaler = self._load_artifact('scaler', self.SCALER_FILE, artifacts)
+        model = self._load_artifact('model', self.MODEL_FILE, artifacts, mmap=self.mmap)
+        self._validate(scaler, model, service)
+        fast = self._compile(service, scaler, model, artifacts) if self.fast_path else None
+        warmup_ms = self._warm_up(service, scaler, model, fast)
+        return ModelVersion(version, scaler, model, artifacts, warmup_ms, datetime.now(JAKARTA_TZ), fast)
+
+    def _record(self, version: Optional[str], status: str, error: Optional[str] = None) -> None:
+        self.history.appendleft({
+            'version': version,
+            'status': status,
+            'error': error,
+            'at': datetime.now(JAKARTA_TZ).isoformat()
+        })
+
+    def load(self) -> bool:
+        """Load (or reload) both artifacts and swap them in. Returns whether a version is serving; never raises.
+
+        Reloading files identical to the active version is a no-op.
+        """
+        from .service import StressModelService
+
+        with self._lock:
+            first = self.active is None
+            if first:
+                self.state = 'loading'
+            else:
+                self.reloading = True
+            version = None
+            try:
+                version = self._version_id()
+                if not first and version == self.active.version:
+                    logger.info(f"Model artifacts unchanged, still serving version {version}")
+                    self.error = None
+                    return True
+                candidate = self._build(StressModelService, version)
+            except Exception as e:
+                self.error = str(e)
+                self._record(version, 'failed', self.error)
+                if first:
+                    StressModelService._active = None
+                    self.state = 'failed'
+                    logger.error(f"Model registry not ready: {e}")
+                    return False
+                logger.error(f"Model reload failed, still serving version {self.active.version}: {e}")
+                return True
+            finally:
+                self.reloading = False
+
+            # Requests read StressModelService._active once, so they see either version, never a mix
+            self.active = StressModelService._active = candidate
+            self.state = 'ready'
+            self.error = None
+            self._record(version, 'active')
+            logger.info(f"Serving model version {version}")
+            return True
+
+    def reload_async(self, start_task: Callable) -> bool:
+        """Start load() in the background. Returns False when a load is already running."""
+        if self._lock.locked():
+            return False
+        start_task(self.load)
+        return True
+
+    def watch(self, interval: float, start_task: Callable, sleep: Callable[[float], None] = time.sleep) -> None:
+        """Poll the artifact files every `interval` seconds and reload after they change.
+
+        A change is acted on once the files look the same on two consecutive
+        polls, so a copy still in progress is not picked up half-written.
+        """
+        def loop():
+            last, pending = self.signature(), None
+            while self._watching:
+                sleep(interval)
+                current = self.signature()
+                if current == last:
+                    pending = None
+                    continue
+                if current != pending:
+                    pending = current
+                    continue
+                last, pending = current, None
+                logger.info(f"Model artifacts changed in {self.model_dir}, reloading")
+                self.load()
+
+        self._watching = True
+        start_task(loop)
+
+    def stop_watching(self) -> None:
+        self._watching = False
+
+    def health(self) -> Dict[str, Any]:
+        active = self.active
+        return {
+            'ready': self.ready,
+            'state': self.state,
+            'error': self.error,
+            'version': active.version if active else None,
+            'reloading': self.reloading,
+            'model_dir': str(self.model_dir),
+            'loaded_at': active.loaded_at.isoformat() if active else None,
+            'artifacts': active.artifacts if active else {},
+            'warmup_ms': active.warmup_ms if active else None,
+            'history': list(self.history),
+            'memory': process_memory()
+        }
+
+
+def init_model_registry(app, socketio=None) -> ModelRegistry:
+    """Create the registry for `app`, load the models unless MODEL_EAGER_LOAD is off, and register it.
+
+    With MODEL_WATCH_INTERVAL > 0 the artifacts are watched and reloaded on
+    change, using the Socket.IO background task helpers when given.
+    """
+    from .service import StressModelService
+
+    registry = ModelRegistry(
+        app.config['MODEL_DIR'],
+        warmup_batch_size=app.config['MODEL_WARMUP_BATCH_SIZE'],
+        mmap=app.config['MODEL_MMAP'],
+        fast_path=app.config['MODEL_FAST_PATH'],
+    )
+    app.extensions['model_registry'] = registry
+    if app.config['MODEL_EAGER_LOAD']:
+        StressModelService._registry = registry
+        registry.load()
+        interval = float(app.config.get('MODEL_WATCH_INTERVAL') or 0)
+        if interval > 0:
+            if socketio is not None:
+                registry.watch(interval, socketio.start_background_task, socketio.sleep)
+            else:
+                registry.watch(interval, lambda fn: threading.Thread(target=fn, daemon=True).start())
+    else:
+        StressModelService._registry = None
+        registry.state = 'lazy'
+    return registry
+
+
+# Registry of a CPU_POOL=process worker, set by init_worker()
+_worker_registry: Optional[ModelRegistry] = None
+
+
+def init_worker(model_dir, warmup_batch_size: int, mmap: bool, fast_path: bool) -> None:
+    """Process pool initializer: load the models into this worker process."""
+    global _worker_registry
+    from .service import StressModelService
+
+    _worker_registry = ModelRegistry(model_dir, warmup_batch_size=warmup_batch_size, mmap=mmap, fast_path=fast_path)
+    StressModelService._registry = _worker_registry
+    _worker_registry.load()
+
+
+def predict_in_worker(X: np.ndarray, version: Optional[str]) -> Dict[str, Any]:
+    """predict_batch() inside a pool process, first catching up with the parent's model version."""
+    from .service import StressModelService
+
+    if _worker_registry is not None and version is not None and _worker_registry.version != version:
+        _worker_registry.load()
+    return StressModelService._predict_local(X)
+
+
+__all__ = ['ModelRegistry', 'ModelVersion', 'init_model_registry', 'init_worker', 'predict_in_worker', 'process_memory']
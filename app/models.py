@@ -5,7 +5,7 @@ import uuid
 from flask import current_app
 from werkzeug.security import generate_password_hash, check_password_hash
 
-from . import db
+from . import db, offload
 
 # Jakarta timezone (UTC+7)
 JAKARTA_TZ = timezone(timedelta(hours=7))
@@ -32,14 +32,24 @@ class MeasurementSession(db.Model):
     name = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, nullable=False)
     notes = db.Column(db.Text)
+    # Device that recorded the session (live/offline ESP32 data); NULL for sessions created through the API
+    device_id = db.Column(db.String(64), nullable=True, index=True)
     
-    # Relationships with cascade delete
-    stress_histories = db.relationship('HistoryStress', back_populates='session', lazy='dynamic', cascade='all, delete-orphan')
-    sensor_readings = db.relationship('SensorReading', back_populates='session', lazy='dynamic', cascade='all, delete-orphan')
+    # Relationships with cascade delete. passive_deletes leaves the children to the
+    # database's ON DELETE CASCADE instead of loading them before deleting a session
+    stress_histories = db.relationship('HistoryStress', back_populates='session', lazy='dynamic',
+                                       cascade='all, delete-orphan', passive_deletes=True)
+    sensor_readings = db.relationship('SensorReading', back_populates='session', lazy='dynamic',
+                                      cascade='all, delete-orphan', passive_deletes=True)
 
 
 class HistoryStress(db.Model):
     __tablename__ = 'stress_history'
+    __table_args__ = (
+        # per-session reads ordered by time, and time-range / recent reads across sessions
+        db.Index('ix_stress_history_session_id_timestamp', 'session_id', 'timestamp'),
+        db.Index('ix_stress_history_timestamp', 'timestamp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String(36), db.ForeignKey('measurement_sessions.id', ondelete='CASCADE'), nullable=True)
@@ -49,6 +59,8 @@ class HistoryStress(db.Model):
     eda = db.Column(db.Float)
     label = db.Column(db.String(128))
     confidence_level = db.Column(db.Float)
+    # Registry version of the model that produced the label; NULL for device or manual labels
+    model_version = db.Column(db.String(64), nullable=True)
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(JAKARTA_TZ))
     
@@ -59,6 +71,10 @@ class HistoryStress(db.Model):
 class SensorReading(db.Model):
     """Model for storing individual sensor readings within a measurement session."""
     __tablename__ = 'sensor_readings'
+    __table_args__ = (
+        db.Index('ix_sensor_readings_session_id_timestamp', 'session_id', 'timestamp'),
+        db.Index('ix_sensor_readings_timestamp', 'timestamp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String(36), db.ForeignKey('measurement_sessions.id', ondelete='CASCADE'), nullable=False)
@@ -72,6 +88,38 @@ class SensorReading(db.Model):
     session = db.relationship('MeasurementSession', back_populates='sensor_readings')
 
 
+class ReadingRollup(db.Model):
+    """sensor_readings aggregated per time bucket for one session or device (see app/rollups.py)."""
+    __tablename__ = 'sensor_reading_rollups'
+
+    scope = db.Column(db.String(16), primary_key=True)  # 'session' or 'device'
+    scope_id = db.Column(db.String(64), primary_key=True)
+    resolution = db.Column(db.Integer, primary_key=True)  # bucket width in seconds
+    bucket_start = db.Column(db.DateTime, primary_key=True)  # Jakarta wall-clock time
+    count = db.Column(db.Integer, nullable=False)
+    hr_sum = db.Column(db.Float, nullable=False)
+    hr_min = db.Column(db.Float, nullable=False)
+    hr_max = db.Column(db.Float, nullable=False)
+    temp_sum = db.Column(db.Float, nullable=False)
+    temp_min = db.Column(db.Float, nullable=False)
+    temp_max = db.Column(db.Float, nullable=False)
+    eda_sum = db.Column(db.Float, nullable=False)
+    eda_min = db.Column(db.Float, nullable=False)
+    eda_max = db.Column(db.Float, nullable=False)
+
+
+class StressRollup(db.Model):
+    """stress_history label counts per time bucket for one session or device (see app/rollups.py)."""
+    __tablename__ = 'stress_history_rollups'
+
+    scope = db.Column(db.String(16), primary_key=True)
+    scope_id = db.Column(db.String(64), primary_key=True)
+    resolution = db.Column(db.Integer, primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    label = db.Column(db.String(128), primary_key=True)  # 'Unknown' for unlabeled rows
+    count = db.Column(db.Integer, nullable=False)
+
+
 class User(db.Model):
     """Model for user authentication and authorization."""
     __tablename__ = 'users'
@@ -85,11 +133,11 @@ class User(db.Model):
 
     def set_password(self, password: str) -> None:
         """Hash and set the user's password."""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = offload.run(generate_password_hash, password)
 
     def check_password(self, password: str) -> bool:
         """Check if the provided password matches the hash."""
-        return check_password_hash(self.password_hash, password)
+        return offload.run(check_password_hash, self.password_hash, password)
 
     def to_dict(self, include_timestamps: bool = True) -> dict:
         """Convert user object to dictionary (excluding password)."""
@@ -121,7 +169,8 @@ def create_tables(app=None) -> None:
             db.create_all()
 
 
-__all__ = ["AppInfo", "MeasurementSession", "HistoryStress", "SensorReading", "User", "create_tables"]
+__all__ = ["AppInfo", "MeasurementSession", "HistoryStress", "SensorReading", "ReadingRollup", "StressRollup", "User",
+           "create_tables"]
 
 
 if __name__ == '__main__':
@@ -0,0 +1,191 @@
+"""
+Worker pool for CPU-bound calls (model inference, password hashing).
+
+The Socket.IO server runs every request and event on the eventlet hub
+thread, so a long computation there stalls all connections. WorkerPool runs
+such calls on a thread or process pool; the calling greenthread waits
+through eventlet's tpool, which keeps the hub serving other clients.
+
+- CPU_POOL=thread: numpy and hashlib release the GIL for the heavy parts
+- CPU_POOL=process: full isolation; each worker loads (memory-maps) the model itself
+- CPU_POOL=inline: run on the caller, the behaviour without a pool
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+KINDS = ('inline', 'thread', 'process')
+
+
+def _call_timed(fn: Callable, args: tuple, kwargs: dict) -> tuple:
+    # Module level so process pools can pickle it; wall clock because the
+    # start time is compared with the submit time of another process
+    started = time.time()
+    return started, fn(*args, **kwargs)
+
+
+def blocking_wait(future: Future) -> Any:
+    return future.result()
+
+
+def eventlet_wait(future: Future) -> Any:
+    """Wait for `future` without blocking the eventlet hub.
+
+    Greenthreads all run on the main thread; other OS threads (tests, the
+    micro-batcher's callers) can simply block.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return future.result()
+    from eventlet import tpool
+    return tpool.execute(future.result)
+
+
+def run_io(fn: Callable, *args, **kwargs) -> Any:
+    """Run a blocking I/O call (e.g. a database write) without blocking the eventlet hub.
+
+    On the main thread, where the greenthreads run, the call goes to one of
+    eventlet's tpool threads; other OS threads simply make it.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return fn(*args, **kwargs)
+    from eventlet import tpool
+    return tpool.execute(fn, *args, **kwargs)
+
+
+class WorkerPool:
+    """Runs callables on a thread or process pool and tracks queue and run times."""
+
+    def __init__(self, kind: str = 'thread', size: Optional[int] = None, wait: Callable[[Future], Any] = blocking_wait,
+                 initializer: Optional[Callable] = None, initargs: tuple = ()):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown worker pool kind {kind!r}, expected one of {KINDS}")
+        self.kind = kind
+        self.size = max(int(size or min(4, os.cpu_count() or 1)), 1)
+        self._wait = wait
+        if kind == 'thread':
+            self._executor = ThreadPoolExecutor(self.size, thread_name_prefix='cpu-pool', initializer=initializer,
+                                                initargs=initargs)
+        elif kind == 'process':
+            # spawn, not fork: a forked copy of the eventlet hub is not safe to use
+            self._executor = ProcessPoolExecutor(self.size, mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=initializer, initargs=initargs)
+        else:
+            self._executor = None
+        self._lock = threading.Lock()
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'in_flight': 0, 'max_in_flight': 0,
+                      'queue_ms_total': 0.0, 'queue_ms_max': 0.0, 'run_ms_total': 0.0, 'run_ms_max': 0.0}
+
+    def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Call ``fn(*args, **kwargs)`` on the pool and return its result (or raise its exception)."""
+        if self._executor is None:
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            self.stats['submitted'] += 1
+            self.stats['in_flight'] += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+        submitted = time.time()
+        try:
+            started, result = self._wait(self._executor.submit(_call_timed, fn, args, kwargs))
+        except Exception:
+            with self._lock:
+                self.stats['in_flight'] -= 1
+                self.stats['failed'] += 1
+            raise
+
+        finished = time.time()
+        queue_ms = max(started - submitted, 0.0) * 1000.0
+        run_ms = max(finished - started, 0.0) * 1000.0
+        with self._lock:
+            self.stats['in_flight'] -= 1
+            self.stats['completed'] += 1
+            self.stats['queue_ms_total'] += queue_ms
+            self.stats['queue_ms_max'] = max(self.stats['queue_ms_max'], queue_ms)
+            self.stats['run_ms_total'] += run_ms
+            self.stats['run_ms_max'] = max(self.stats['run_ms_max'], run_ms)
+        return result
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        completed = stats['completed']
+        return {
+            'kind': self.kind,
+            'size': self.size if self._executor is not None else 0,
+            'submitted': stats['submitted'],
+            'completed': completed,
+            'failed': stats['failed'],
+            'in_flight': stats['in_flight'],
+            'max_in_flight': stats['max_in_flight'],
+            'queue_ms': {
+                'mean': stats['queue_ms_total'] / completed if completed else 0.0,
+                'max': stats['queue_ms_max']
+            },
+            'run_ms': {
+                'mean': stats['run_ms_total'] / completed if completed else 0.0,
+                'max': stats['run_ms_max']
+            }
+        }
+
+
+# Pool used by run(); None runs everything inline
+_pool: Optional[WorkerPool] = None
+
+
+def configure_pool(pool: Optional[WorkerPool]) -> None:
+    """Install the process-wide pool, shutting down the previous one."""
+    global _pool
+    previous, _pool = _pool, pool
+    if previous is not None and previous is not pool:
+        previous.shutdown(wait=False)
+
+
+def get_pool() -> Optional[WorkerPool]:
+    return _pool
+
+
+def run(fn: Callable, *args, **kwargs) -> Any:
+    """Run a CPU-bound call on the configured pool, or inline when there is none."""
+    pool = _pool
+    if pool is None:
+        return fn(*args, **kwargs)
+    return pool.run(fn, *args, **kwargs)
+
+
+def pool_metrics() -> Optional[Dict[str, Any]]:
+    return _pool.snapshot() if _pool is not None else None
+
+
+def init_cpu_pool(app) -> Optional[WorkerPool]:
+    """Create the pool configured by CPU_POOL / CPU_POOL_SIZE and install it."""
+    kind = app.config['CPU_POOL']
+    if kind == 'inline':
+        configure_pool(None)
+        app.extensions['cpu_pool'] = None
+        return None
+
+    initializer, initargs = None, ()
+    if kind == 'process' and app.config['MODEL_EAGER_LOAD']:
+        # each worker process loads (and memory-maps) the model itself
+        from .model_registry import init_worker
+        initializer = init_worker
+        initargs = (app.config['MODEL_DIR'], app.config['MODEL_WARMUP_BATCH_SIZE'],
+                    app.config['MODEL_MMAP'], app.config['MODEL_FAST_PATH'])
+
+    pool = WorkerPool(kind, app.config['CPU_POOL_SIZE'] or None, wait=eventlet_wait,
+                      initializer=initializer, initargs=initargs)
+    configure_pool(pool)
+    app.extensions['cpu_pool'] = pool
+    return pool
+
+
+__all__ = ['WorkerPool', 'blocking_wait', 'eventlet_wait', 'run_io', 'configure_pool', 'get_pool', 'run', 'pool_metrics',
+           'init_cpu_pool']
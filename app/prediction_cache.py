@@ -0,0 +1,138 @@
+"""
+LRU/TTL cache of stress predictions keyed on quantized sensor inputs.
+
+Live and offline streams send many near-identical [hr, temp, eda] rows.
+Each row is snapped to a grid of per-sensor steps (e.g. HR to 0.5 bpm) and
+the prediction for the snapped row is cached, so the result depends only on
+the grid cell, never on which reading of that cell arrived first. The steps
+set the accuracy trade-off; a step of 0 keeps that sensor exact.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Sequence, Tuple
+
+import numpy as np
+
+
+class PredictionCache:
+    """Bounded LRU of ``snapped row -> (label, confidence)`` with a TTL.
+
+    Entries belong to one model; passing a different `token` (the model
+    version) to predict() drops them all.
+    """
+
+    COLUMNS = ('hr', 'temp', 'eda')
+
+    def __init__(self, steps: Sequence[float], max_entries: int = 4096, ttl: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        if max_entries < 1:
+            raise ValueError('max_entries must be at least 1')
+        self.steps = np.asarray(steps, dtype=float)
+        if self.steps.shape != (len(self.COLUMNS),) or (self.steps < 0).any():
+            raise ValueError(f"Expected {len(self.COLUMNS)} non-negative quantization steps, got {list(steps)}")
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Tuple[float, ...], Tuple[Any, float, float]]' = OrderedDict()
+        self._token: Hashable = None
+        self.stats = {'hits': 0, 'misses': 0, 'bypassed': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def quantize(self, X: np.ndarray) -> np.ndarray:
+        """Snap each column to the nearest multiple of its step (columns with step 0 are unchanged)."""
+        quantized = self.steps > 0
+        divisor = np.where(quantized, self.steps, 1.0)
+        return np.where(quantized, np.rint(X / divisor) * divisor, X)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def predict(self, X: np.ndarray, token: Hashable, compute: Callable[[np.ndarray], tuple]) -> tuple:
+        """Labels and confidences for the (N, 3) rows `X`, calling `compute` once for the missing cells.
+
+        `compute` takes an (M, 3) array and returns ``(labels, confidences)``.
+        Rows with non-finite values are computed as-is and never cached.
+        """
+        snapped = self.quantize(X)
+        finite = np.isfinite(snapped).all(axis=1)
+        labels = np.empty(len(X), dtype=object)
+        confidences = np.empty(len(X), dtype=float)
+        missing: Dict[Tuple[float, ...], List[int]] = {}
+        now = self._clock()
+
+        with self._lock:
+            if token != self._token:
+                if self._entries:
+                    self.stats['invalidations'] += 1
+                    self._entries.clear()
+                self._token = token
+
+            for i, key in enumerate(map(tuple, snapped.tolist())):
+                if not finite[i]:
+                    continue
+                if key in missing:
+                    # duplicate of a row already being computed in this call
+                    missing[key].append(i)
+                    self.stats['hits'] += 1
+                    continue
+                entry = self._entries.get(key)
+                if entry is not None and entry[2] > now:
+                    self._entries.move_to_end(key)
+                    labels[i], confidences[i] = entry[0], entry[1]
+                    self.stats['hits'] += 1
+                    continue
+                if entry is not None:
+                    del self._entries[key]
+                    self.stats['expirations'] += 1
+                missing[key] = [i]
+                self.stats['misses'] += 1
+            bypass = np.flatnonzero(~finite)
+            self.stats['bypassed'] += len(bypass)
+
+        if not missing and not len(bypass):
+            return labels, confidences
+
+        keys = list(missing)
+        rows = np.vstack([np.array(keys, dtype=float).reshape(-1, X.shape[1]), X[bypass]])
+        new_labels, new_confidences = compute(rows)
+
+        for pos, i in enumerate(bypass, start=len(keys)):
+            labels[i], confidences[i] = new_labels[pos], new_confidences[pos]
+        for pos, key in enumerate(keys):
+            for i in missing[key]:
+                labels[i], confidences[i] = new_labels[pos], new_confidences[pos]
+        self._store(token, keys, new_labels, new_confidences, now)
+        return labels, confidences
+
+    def _store(self, token: Hashable, keys: List[Tuple[float, ...]], labels, confidences, now: float) -> None:
+        expires = now + self.ttl if self.ttl > 0 else float('inf')
+        with self._lock:
+            # the model changed while computing: these results belong to the old one
+            if token != self._token:
+                return
+            for pos, key in enumerate(keys):
+                self._entries[key] = (labels[pos], float(confidences[pos]), expires)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            entries = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        return dict(
+            stats,
+            entries=entries,
+            max_entries=self.max_entries,
+            ttl_seconds=self.ttl,
+            hit_rate=(stats['hits'] / lookups) if lookups else 0.0,
+            quantization=dict(zip(self.COLUMNS, self.steps.tolist()))
+        )
+
+
+__all__ = ['PredictionCache']
@@ -0,0 +1,210 @@
+"""
+Connection registry for Socket.IO clients.
+
+- ConnectionRegistry: connected clients by sid with per-type counters and a device_id index
+- SharedConnectionStats: per-worker counters in a SQLite file so every worker on a host reports host-wide numbers
+- Debouncer: collapses bursts of triggers into one trailing call (used for client_stats)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Mapping
+from datetime import datetime, timezone, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+# Jakarta timezone (UTC+7)
+JAKARTA_TZ = timezone(timedelta(hours=7))
+
+
+class ConnectionRegistry(Mapping):
+    """Connected clients keyed by sid.
+
+    Counters per client type and the device_id -> sids index are updated on
+    add/remove, so stats and lookups never scan the client table. Reading it
+    like a dict (`sid in registry`, `registry[sid]`, `len(registry)`) keeps
+    working for code written against the old `connected_clients` dict.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[str, Dict[str, Any]] = {}
+        self._counts: Dict[str, int] = {}
+        self._devices: Dict[str, Set[str]] = {}
+        self.shared: Optional['SharedConnectionStats'] = None
+
+    def __getitem__(self, sid: str) -> Dict[str, Any]:
+        return self._clients[sid]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._clients))
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def add(self, sid: str, client_type: str, device_id: Optional[str] = None) -> Dict[str, Any]:
+        """Register a connection; re-adding a known sid replaces it."""
+        now = datetime.now(JAKARTA_TZ)
+        client = {'type': client_type, 'connected_at': now, 'last_seen': now, 'device_id': None}
+        with self._lock:
+            self._discard(sid)
+            self._clients[sid] = client
+            self._counts[client_type] = self._counts.get(client_type, 0) + 1
+        if device_id:
+            self.bind_device(sid, device_id)
+        return client
+
+    def remove(self, sid: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._discard(sid)
+
+    def _discard(self, sid: str) -> Optional[Dict[str, Any]]:
+        client = self._clients.pop(sid, None)
+        if client is None:
+            return None
+        self._counts[client['type']] -= 1
+        self._unindex(sid, client['device_id'])
+        return client
+
+    def _unindex(self, sid: str, device_id: Optional[str]) -> None:
+        sids = self._devices.get(device_id)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self._devices[device_id]
+
+    def bind_device(self, sid: str, device_id: str) -> None:
+        """Index a connection under the device it sends data for."""
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None or client['device_id'] == device_id:
+                return
+            self._unindex(sid, client['device_id'])
+            client['device_id'] = device_id
+            self._devices.setdefault(device_id, set()).add(sid)
+
+    def touch(self, sid: str) -> None:
+        client = self._clients.get(sid)
+        if client is not None:
+            client['last_seen'] = datetime.now(JAKARTA_TZ)
+
+    def by_device(self, device_id: str) -> List[str]:
+        """Sids of the connections currently sending for `device_id`."""
+        return list(self._devices.get(device_id, ()))
+
+    def count(self, client_type: str) -> int:
+        return self._counts.get(client_type, 0)
+
+    def stats(self) -> Dict[str, int]:
+        """Payload of the `client_stats` event."""
+        return {
+            'frontend_clients': self.count('frontend'),
+            'esp32_clients': self.count('esp32'),
+            'total_clients': len(self._clients),
+            'devices': len(self._devices)
+        }
+
+    def global_stats(self) -> Dict[str, int]:
+        """Counts over every worker of the host when a shared store is attached, else this process only.
+
+        Served from memory: the other workers' counts are the ones read by the
+        last heartbeat (SharedConnectionStats.sync), so connects and disconnects
+        never touch the stats file.
+        """
+        if self.shared is None:
+            return self.stats()
+        return self.shared.combine(self.stats())
+
+
+class SharedConnectionStats:
+    """Connection counters of all workers on a host, one row per worker.
+
+    A periodic heartbeat calls sync(), which overwrites this worker's row and
+    caches the sum of the other rows; rows that have not been refreshed for
+    `stale_after` seconds (a dead worker) are ignored. The file is local to
+    the host, so workers on other hosts are not counted.
+    """
+
+    COLUMNS = ('frontend_clients', 'esp32_clients', 'total_clients', 'devices')
+
+    def __init__(self, path: str, worker_id: Optional[str] = None, stale_after: float = 30.0):
+        self.path = path
+        self.worker_id = worker_id or f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self.stale_after = float(stale_after)
+        self._others = dict.fromkeys(self.COLUMNS, 0)
+        self._others['workers'] = 0
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS worker_stats (worker_id TEXT PRIMARY KEY, '
+                'frontend_clients INTEGER, esp32_clients INTEGER, total_clients INTEGER, '
+                'devices INTEGER, updated_at REAL)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def publish(self, stats: Dict[str, int]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO worker_stats VALUES (?, ?, ?, ?, ?, ?)',
+                (self.worker_id, *(int(stats.get(c, 0)) for c in self.COLUMNS), time.time())
+            )
+
+    def totals(self, exclude: Optional[str] = None) -> Dict[str, int]:
+        """Sum over the live workers' rows, leaving out the `exclude` worker id."""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT COUNT(*), ' + ', '.join(f'COALESCE(SUM({c}), 0)' for c in self.COLUMNS) +
+                ' FROM worker_stats WHERE updated_at >= ? AND worker_id != ?',
+                (time.time() - self.stale_after, exclude or '')
+            ).fetchone()
+        return dict(zip(self.COLUMNS, row[1:]), workers=row[0])
+
+    def sync(self, stats: Dict[str, int]) -> None:
+        """Publish this worker's counts and cache the other workers' (blocking file I/O, for the heartbeat)."""
+        self.publish(stats)
+        self._others = self.totals(exclude=self.worker_id)
+
+    def combine(self, stats: Dict[str, int]) -> Dict[str, int]:
+        """This worker's current counts plus the other workers' counts from the last sync()."""
+        others = self._others
+        combined = {c: int(stats.get(c, 0)) + others[c] for c in self.COLUMNS}
+        combined['workers'] = others['workers'] + 1
+        return combined
+
+    def remove(self) -> None:
+        with self._connect() as conn:
+            conn.execute('DELETE FROM worker_stats WHERE worker_id = ?', (self.worker_id,))
+
+
+class Debouncer:
+    """Trailing-edge debounce: the first trigger schedules `fn` after `delay`
+    seconds and further triggers before it runs are folded into that call."""
+
+    def __init__(self, fn: Callable[[], None], start_task: Callable, sleep: Callable[[float], None] = time.sleep):
+        self._fn = fn
+        self._start_task = start_task
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._pending = False
+        self.stats = {'triggers': 0, 'calls': 0}
+
+    def trigger(self, delay: float) -> None:
+        with self._lock:
+            self.stats['triggers'] += 1
+            if self._pending:
+                return
+            self._pending = True
+        self._start_task(self._fire, delay)
+
+    def _fire(self, delay: float) -> None:
+        self._sleep(delay)
+        with self._lock:
+            self._pending = False
+        self.stats['calls'] += 1
+        self._fn()
+
+
+__all__ = ['ConnectionRegistry', 'SharedConnectionStats', 'Debouncer']
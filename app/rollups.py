@@ -0,0 +1,401 @@
+"""
+Pre-aggregated rollups of sensor_readings and stress_history.
+
+Readings are summed into 1-minute and 1-hour buckets (count plus sum, min and
+max per sensor) and stress history into label counts per bucket, once per
+session and once per device (the session's device_id). Charts over weeks of
+data then read a few hundred rollup rows instead of every raw row.
+
+- Inserts: record_readings() / record_history() upsert the buckets of the new
+  rows in the caller's transaction, so rollups commit or roll back with the data
+- Updates and deletes: refresh() / rebuild() recompute the affected hours from
+  the raw rows
+- Existing data: `flask rollups backfill`
+
+Buckets use the Jakarta wall-clock time the raw timestamps are stored in.
+"""
+
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import click
+import numpy as np
+from flask.cli import AppGroup
+from sqlalchemy import Integer, cast, delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from . import db
+from .downsample import aggregate
+from .models import HistoryStress, MeasurementSession, ReadingRollup, SensorReading, StressRollup
+
+JAKARTA_TZ = timezone(timedelta(hours=7))
+
+# Bucket widths in seconds; each divides the last, so rebuilds work in whole hours
+RESOLUTIONS = (60, 3600)
+SCOPES = ('session', 'device')
+COLUMNS = ('hr', 'temp', 'eda')
+
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _wall(ts: datetime) -> datetime:
+    """Naive Jakarta wall-clock time of `ts` (naive values already are)."""
+    return ts.astimezone(JAKARTA_TZ).replace(tzinfo=None) if ts.tzinfo is not None else ts
+
+
+def wall_seconds(ts: datetime) -> int:
+    """Whole seconds since 1970 of the wall-clock time of `ts`, as wall_seconds_column() computes it in SQL.
+
+    SQLite keeps times as whole milliseconds, so microseconds are rounded to
+    the millisecond before flooring; 08:59:59.9996 falls in the 09:00 bucket on both sides.
+    """
+    micros = (_wall(ts) - _EPOCH) // _MICROSECOND
+    return (micros + 500) // 1000 // 1000
+
+
+def wall_seconds_column(column):
+    return cast(func.strftime('%s', column), Integer)
+
+
+def _bucket_datetime(seconds: float) -> datetime:
+    return _EPOCH + timedelta(seconds=int(seconds))
+
+
+def _floor(ts: Optional[datetime], resolution: int) -> Optional[datetime]:
+    """Start of the `resolution` bucket containing `ts`, so a range never starts mid-bucket."""
+    return _bucket_datetime(wall_seconds(ts) // resolution * resolution) if ts is not None else None
+
+
+def fetch_float_columns(stmt, width: int) -> np.ndarray:
+    """Run a Core select of `width` numeric columns and return them as an (N, width) float array.
+
+    Skips ORM row loading and per-row numpy conversion, which dominate for large results.
+    """
+    rows = db.session.connection().execute(stmt).all()
+    return np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=len(rows) * width).reshape(-1, width)
+
+
+def _devices(session_ids: Iterable[Optional[str]]) -> Dict[str, str]:
+    """session_id -> device_id for the given sessions that belong to a device."""
+    ids = list({i for i in session_ids if i})
+    if not ids:
+        return {}
+    db.session.flush()
+    stmt = select(MeasurementSession.id, MeasurementSession.device_id).where(
+        MeasurementSession.id.in_(ids), MeasurementSession.device_id.isnot(None))
+    return dict(db.session.connection().execute(stmt).all())
+
+
+def _scopes(rows: Sequence[Dict[str, Any]]) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+    """Group rows by every (scope, scope_id) they roll up into."""
+    devices = _devices(row.get('session_id') for row in rows)
+    groups = defaultdict(list)
+    for row in rows:
+        session_id = row.get('session_id')
+        if not session_id:
+            continue
+        groups[('session', session_id)].append(row)
+        if session_id in devices:
+            groups[('device', devices[session_id])].append(row)
+    return groups
+
+
+def _reading_rows(scope: str, scope_id: str, seconds: np.ndarray, columns: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Rollup rows of time-sorted readings, for every resolution."""
+    rows = []
+    for resolution in RESOLUTIONS:
+        buckets = aggregate(seconds, columns, resolution)
+        for i, start in enumerate(buckets['start']):
+            row = {'scope': scope, 'scope_id': scope_id, 'resolution': resolution,
+                   'bucket_start': _bucket_datetime(start), 'count': int(buckets['count'][i])}
+            for name in COLUMNS:
+                for stat in ('sum', 'min', 'max'):
+                    row[f'{name}_{stat}'] = float(buckets[name][stat][i])
+            rows.append(row)
+    return rows
+
+
+def _count_label(counts: Counter, scope: str, scope_id: str, seconds: int, label: Optional[str]) -> None:
+    label = label if label is not None else 'Unknown'
+    for resolution in RESOLUTIONS:
+        counts[(scope, scope_id, resolution, seconds // resolution * resolution, label)] += 1
+
+
+def _label_rows(counts: Counter) -> List[Dict[str, Any]]:
+    return [
+        {'scope': scope, 'scope_id': scope_id, 'resolution': resolution,
+         'bucket_start': _bucket_datetime(start), 'label': label, 'count': count}
+        for (scope, scope_id, resolution, start, label), count in counts.items()
+    ]
+
+
+def _reading_upsert():
+    table = ReadingRollup.__table__
+    stmt = sqlite_insert(table)
+    merged = {'count': table.c.count + stmt.excluded.count}
+    for name in COLUMNS:
+        merged[f'{name}_sum'] = table.c[f'{name}_sum'] + stmt.excluded[f'{name}_sum']
+        # two-argument min()/max() are SQLite's scalar functions
+        merged[f'{name}_min'] = func.min(table.c[f'{name}_min'], stmt.excluded[f'{name}_min'])
+        merged[f'{name}_max'] = func.max(table.c[f'{name}_max'], stmt.excluded[f'{name}_max'])
+    return stmt.on_conflict_do_update(index_elements=list(table.primary_key), set_=merged)
+
+
+def _stress_upsert():
+    table = StressRollup.__table__
+    stmt = sqlite_insert(table)
+    merged = {'count': table.c.count + stmt.excluded.count}
+    return stmt.on_conflict_do_update(index_elements=list(table.primary_key), set_=merged)
+
+
+# Built once: upserts are not in SQLAlchemy's compiled cache, and rebuilding them per write batch costs more than the write
+_READING_UPSERT = _reading_upsert()
+_STRESS_UPSERT = _stress_upsert()
+
+
+def record_readings(rows: Sequence[Dict[str, Any]]) -> None:
+    """Add newly inserted readings (dicts with session_id, timestamp, hr, temp, eda) to the rollups.
+
+    Does not commit; call it in the transaction that inserts the rows.
+    """
+    out = []
+    for (scope, scope_id), items in _scopes(rows).items():
+        seconds = np.array([wall_seconds(row['timestamp']) for row in items], dtype=np.float64)
+        order = np.argsort(seconds, kind='stable')
+        columns = {name: np.array([row[name] for row in items], dtype=np.float64)[order] for name in COLUMNS}
+        out.extend(_reading_rows(scope, scope_id, seconds[order], columns))
+    if not out:
+        return
+
+    db.session.connection().execute(_READING_UPSERT, out)
+
+
+def record_history(rows: Sequence[Dict[str, Any]]) -> None:
+    """Add newly inserted stress history (dicts with session_id, timestamp, label) to the rollups.
+
+    Rows without a session are not rolled up. Does not commit.
+    """
+    counts = Counter()
+    for (scope, scope_id), items in _scopes(rows).items():
+        for row in items:
+            _count_label(counts, scope, scope_id, wall_seconds(row['timestamp']), row.get('label'))
+    if not counts:
+        return
+
+    db.session.connection().execute(_STRESS_UPSERT, _label_rows(counts))
+
+
+def _scoped(stmt, model, scope: str, scope_id: str):
+    if scope == 'session':
+        return stmt.where(model.session_id == scope_id)
+    return stmt.join(MeasurementSession, model.session_id == MeasurementSession.id).where(
+        MeasurementSession.device_id == scope_id)
+
+
+def _in_range(stmt, column, lo: Optional[datetime], hi: Optional[datetime]):
+    if lo is not None:
+        stmt = stmt.where(column >= lo)
+    if hi is not None:
+        stmt = stmt.where(column < hi)
+    return stmt
+
+
+def _raw_range(stmt, column, lo: Optional[datetime], hi: Optional[datetime]):
+    """Raw rows whose bucket falls in [lo, hi).
+
+    The plain timestamp bounds keep the index usable; the bucket expression
+    drops rows that millisecond rounding moves across an edge.
+    """
+    if lo is not None:
+        stmt = stmt.where(column >= lo - _SECOND, wall_seconds_column(column) >= wall_seconds(lo))
+    if hi is not None:
+        stmt = stmt.where(column < hi, wall_seconds_column(column) < wall_seconds(hi))
+    return stmt
+
+
+def rebuild(scope: str, scope_id: str, first: Optional[datetime] = None, last: Optional[datetime] = None) -> None:
+    """Recompute the rollups of one session or device from the raw rows.
+
+    With `first`/`last` (the earliest and latest affected timestamps) only the
+    whole hours between them are rebuilt. Does not commit.
+    """
+    db.session.flush()
+    hour = RESOLUTIONS[-1]
+    lo = _bucket_datetime(wall_seconds(first) // hour * hour) if first is not None else None
+    hi = _bucket_datetime(wall_seconds(last) // hour * hour + hour) if last is not None else None
+
+    for model in (ReadingRollup, StressRollup):
+        stmt = delete(model).where(model.scope == scope, model.scope_id == scope_id)
+        db.session.execute(_in_range(stmt, model.bucket_start, lo, hi).execution_options(synchronize_session=False))
+
+    stmt = select(wall_seconds_column(SensorReading.timestamp), *[getattr(SensorReading, c) for c in COLUMNS])
+    stmt = _raw_range(_scoped(stmt, SensorReading, scope, scope_id), SensorReading.timestamp, lo, hi)
+    table = fetch_float_columns(stmt.order_by(SensorReading.timestamp), len(COLUMNS) + 1)
+    rows = _reading_rows(scope, scope_id, table[:, 0], {c: table[:, i + 1] for i, c in enumerate(COLUMNS)})
+    if rows:
+        db.session.execute(insert(ReadingRollup), rows)
+
+    stmt = select(wall_seconds_column(HistoryStress.timestamp), HistoryStress.label)
+    stmt = _raw_range(_scoped(stmt, HistoryStress, scope, scope_id), HistoryStress.timestamp, lo, hi)
+    counts = Counter()
+    for seconds, label in db.session.connection().execute(stmt):
+        _count_label(counts, scope, scope_id, seconds, label)
+    if counts:
+        db.session.execute(insert(StressRollup), _label_rows(counts))
+
+
+def refresh(session_id: Optional[str], timestamps: Sequence[datetime]) -> None:
+    """Rebuild the hours around `timestamps` for a session and its device after its rows changed."""
+    if not session_id or not timestamps:
+        return
+    first = min(_wall(ts) for ts in timestamps)
+    last = max(_wall(ts) for ts in timestamps)
+    rebuild('session', session_id, first, last)
+    device_id = _devices([session_id]).get(session_id)
+    if device_id:
+        rebuild('device', device_id, first, last)
+
+
+def affected_devices(session_ids: Sequence[str]) -> Dict[str, Tuple[datetime, datetime]]:
+    """device_id -> (earliest, latest) raw timestamp of the given sessions' rows, for devices they belong to."""
+    ranges: Dict[str, Tuple[datetime, datetime]] = {}
+    for model in (SensorReading, HistoryStress):
+        stmt = (
+            select(MeasurementSession.device_id, func.min(model.timestamp), func.max(model.timestamp))
+            .join(MeasurementSession, model.session_id == MeasurementSession.id)
+            .where(model.session_id.in_(session_ids), MeasurementSession.device_id.isnot(None))
+            .group_by(MeasurementSession.device_id)
+        )
+        for device_id, first, last in db.session.execute(stmt):
+            if device_id in ranges:
+                first, last = min(first, ranges[device_id][0]), max(last, ranges[device_id][1])
+            ranges[device_id] = (first, last)
+    return ranges
+
+
+def forget_sessions(session_ids: Sequence[str]) -> None:
+    """Drop the session-scope rollups of deleted sessions. Does not commit."""
+    for model in (ReadingRollup, StressRollup):
+        db.session.execute(
+            delete(model).where(model.scope == 'session', model.scope_id.in_(session_ids))
+            .execution_options(synchronize_session=False)
+        )
+
+
+def backfill(session_ids: Optional[Sequence[str]] = None, batch_size: int = 100) -> Dict[str, int]:
+    """Build the rollups from the raw tables, for everything or only for `session_ids` (and their devices' hours).
+
+    A full backfill replaces all rollups and commits every `batch_size` sessions or devices.
+    """
+    if session_ids is None:
+        db.session.execute(delete(ReadingRollup))
+        db.session.execute(delete(StressRollup))
+        scopes = [('session', i) for i in db.session.scalars(select(MeasurementSession.id))]
+        devices = db.session.scalars(
+            select(MeasurementSession.device_id).where(MeasurementSession.device_id.isnot(None)).distinct())
+        scopes += [('device', d) for d in devices]
+        ranges = {}
+    else:
+        scopes = [('session', i) for i in session_ids]
+        ranges = affected_devices(session_ids)
+        scopes += [('device', d) for d in ranges]
+
+    try:
+        for n, (scope, scope_id) in enumerate(scopes, 1):
+            rebuild(scope, scope_id, *ranges.get(scope_id, (None, None)) if scope == 'device' else (None, None))
+            if n % batch_size == 0:
+                db.session.commit()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {
+        'sessions': sum(1 for scope, _ in scopes if scope == 'session'),
+        'devices': sum(1 for scope, _ in scopes if scope == 'device'),
+        'reading_rollups': db.session.scalar(select(func.count()).select_from(ReadingRollup)),
+        'stress_rollups': db.session.scalar(select(func.count()).select_from(StressRollup)),
+    }
+
+
+def _resolution_base(resolution: int) -> int:
+    """The stored resolution that `resolution` is merged from."""
+    for base in reversed(RESOLUTIONS):
+        if resolution % base == 0:
+            return base
+    raise ValueError(f'Rollups have {RESOLUTIONS[0]}-second buckets; resolution must be a multiple of {RESOLUTIONS[0]}s')
+
+
+def reading_buckets(scope: str, scope_id: str, resolution: int, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None) -> Dict[str, Any]:
+    """Per-bucket count and min/max/mean of each sensor, merged from the stored rollups.
+
+    `start` is rounded down to a bucket boundary; `end` excludes buckets starting at or after it.
+
+    Returns arrays shaped like downsample.aggregate(): ``{'start', 'count', '<column>': {'min', 'max', 'mean'}}``.
+    """
+    base = _resolution_base(resolution)
+    start = _floor(start, resolution)
+    stats = [ReadingRollup.count] + [getattr(ReadingRollup, f'{c}_{s}') for c in COLUMNS for s in ('sum', 'min', 'max')]
+    stmt = select(wall_seconds_column(ReadingRollup.bucket_start), *stats).where(
+        ReadingRollup.scope == scope, ReadingRollup.scope_id == scope_id, ReadingRollup.resolution == base)
+    stmt = _in_range(stmt, ReadingRollup.bucket_start, start, end).order_by(ReadingRollup.bucket_start)
+    table = fetch_float_columns(stmt, len(stats) + 1)
+    if not len(table):
+        return {'start': np.empty(0), 'count': np.empty(0, dtype=np.int64),
+                **{c: {'min': np.empty(0), 'max': np.empty(0), 'mean': np.empty(0)} for c in COLUMNS}}
+
+    bucket = (table[:, 0] // resolution).astype(np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+    counts = np.add.reduceat(table[:, 1], starts)
+    result = {'start': bucket[starts].astype(np.float64) * resolution, 'count': counts.astype(np.int64)}
+    for i, name in enumerate(COLUMNS):
+        col = 2 + 3 * i
+        result[name] = {
+            'min': np.minimum.reduceat(table[:, col + 1], starts),
+            'max': np.maximum.reduceat(table[:, col + 2], starts),
+            'mean': np.add.reduceat(table[:, col], starts) / counts,
+        }
+    return result
+
+
+def label_buckets(scope: str, scope_id: str, resolution: int, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None) -> Tuple[List[int], Dict[str, List[int]]]:
+    """Bucket starts (wall-clock seconds) and per-label counts aligned with them."""
+    base = _resolution_base(resolution)
+    start = _floor(start, resolution)
+    stmt = select(wall_seconds_column(StressRollup.bucket_start), StressRollup.label, StressRollup.count).where(
+        StressRollup.scope == scope, StressRollup.scope_id == scope_id, StressRollup.resolution == base)
+    rows = db.session.execute(_in_range(stmt, StressRollup.bucket_start, start, end)).all()
+
+    starts = sorted({seconds // resolution * resolution for seconds, _, _ in rows})
+    index = {s: i for i, s in enumerate(starts)}
+    labels: Dict[str, List[int]] = {}
+    for seconds, label, count in rows:
+        labels.setdefault(label, [0] * len(starts))[index[seconds // resolution * resolution]] += count
+    return starts, labels
+
+
+rollups_cli = AppGroup('rollups', help='Maintain the sensor_readings / stress_history rollup tables.')
+
+
+@rollups_cli.command('backfill')
+@click.option('--session', 'session_ids', multiple=True, help='Only rebuild this session (repeatable).')
+def backfill_command(session_ids):
+    """Build the rollups from existing sensor_readings and stress_history."""
+    started = time.perf_counter()
+    result = backfill(list(session_ids) or None)
+    click.echo(
+        f"Rebuilt rollups of {result['sessions']} sessions and {result['devices']} devices in "
+        f"{time.perf_counter() - started:.1f}s: {result['reading_rollups']} reading rows, "
+        f"{result['stress_rollups']} stress rows"
+    )
+
+
+__all__ = ['RESOLUTIONS', 'SCOPES', 'record_readings', 'record_history', 'rebuild', 'refresh', 'affected_devices',
+           'forget_sessions', 'backfill', 'reading_buckets', 'label_buckets', 'fetch_float_columns', 'rollups_cli']
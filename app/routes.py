@@ -1,13 +1,40 @@
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
-from .service import AppInfoService, StressHistoryService, StressModelService, MeasurementSessionService, SensorReadingService, UserService
+from .service import AppInfoService, StressHistoryService, StressHistoryStats, StressModelService, MeasurementSessionService, SensorReadingService, RollupService, OfflineSyncService, UserService
+from .offload import pool_metrics
+from .storage import sqlite_profile
+from . import db
 from datetime import datetime, timezone, timedelta
+import csv
+import io
+import json
 
 # Jakarta timezone (UTC+7)
 JAKARTA_TZ = timezone(timedelta(hours=7))
 
 main = Blueprint('main', __name__)
 
+
+def _page_args(*filters):
+	"""Read keyset pagination (limit/after/before) and the given filter args from the query string."""
+	default_limit = current_app.config.get('API_PAGE_SIZE', 100)
+	max_limit = current_app.config.get('API_MAX_PAGE_SIZE', 1000)
+	try:
+		limit = int(request.args.get('limit', default_limit))
+	except ValueError:
+		raise ValueError('limit must be an integer')
+	if limit < 1:
+		raise ValueError('limit must be positive')
+
+	args = {
+		'limit': min(limit, max_limit),
+		'after': request.args.get('after'),
+		'before': request.args.get('before')
+	}
+	for name in filters:
+		args[name] = request.args.get(name)
+	return args
+
 @main.route('/')
 def index():
 	return render_template('index.html')
@@ -144,9 +171,12 @@ def api_status():
 
 @main.route('/api/stress-history', methods=['GET'])
 def get_stress_histories():
+	"""List stress history newest first, one keyset page at a time."""
 	try:
-		items = StressHistoryService.get_all()
-		return jsonify({'success': True, 'data': items})
+		items, page = StressHistoryService.get_page(**_page_args('session_id', 'start', 'end'))
+		return jsonify({'success': True, 'data': items, 'pagination': page})
+	except ValueError as e:
+		return jsonify({'success': False, 'error': str(e)}), 400
 	except Exception as e:
 		return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -168,6 +198,8 @@ def create_stress_history():
 		data = request.get_json() or {}
 		# timestamp is optional; service will set if missing/invalid
 		item = StressHistoryService.create(data)
+		if item is None:
+			return jsonify({'success': False, 'error': 'Session not found'}), 404
 		return jsonify({'success': True, 'data': item}), 201
 	except Exception as e:
 		return jsonify({'success': False, 'error': str(e)}), 500
@@ -227,6 +259,9 @@ def predict_stress():
 		except Exception:
 			return jsonify({'success': False, 'error': 'hr, temp and eda must be numbers'}), 400
 
+		if not StressModelService.ready():
+			return jsonify({'success': False, 'error': 'Stress model is not ready'}), 503
+
 		# Step 1: Create a new measurement session
 		session_data = {
 			'notes': data.get('notes', 'Stress prediction session')
@@ -241,8 +276,9 @@ def predict_stress():
 		# If ESP32 sends readings array, save all 10 last-second samples.
 		# If not, fallback to saving only the final average reading.
 		saved_readings = []
+		errors = []
 
-		readings = record.get('readings', [])
+		readings = data.get('readings', [])
 
 		if isinstance(readings, list) and len(readings) > 0:
 			for reading_idx, reading in enumerate(readings):
@@ -263,7 +299,6 @@ def predict_stress():
 
 				except Exception as reading_error:
 					errors.append({
-						'index': idx,
 						'reading_index': reading_idx,
 						'error': str(reading_error)
 					})
@@ -288,17 +323,22 @@ def predict_stress():
 			'eda': result['eda'],
 			'label': result['label'],
 			'confidence_level': result['confidence_level'],
+			'model_version': result.get('model_version'),
 			'notes': data.get('notes', '')
 		}
 		saved_history = StressHistoryService.create(history_data)
 
-		return jsonify({
+		response = {
 			'success': True,
 			'data': result,
 			'session_id': session['id'],
 			'history_id': saved_history['id'],
 			'sensor_reading_id': saved_sensor['id']
-		})
+		}
+		if errors:
+			response['errors'] = errors
+
+		return jsonify(response)
 	except Exception as e:
 		return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -307,10 +347,12 @@ def predict_stress():
 
 @main.route('/api/sessions', methods=['GET'])
 def get_sessions():
-	"""Get all measurement sessions."""
+	"""List measurement sessions newest first, one keyset page at a time."""
 	try:
-		sessions = MeasurementSessionService.get_all()
-		return jsonify({'success': True, 'data': sessions})
+		sessions, page = MeasurementSessionService.get_page(**_page_args('start', 'end'))
+		return jsonify({'success': True, 'data': sessions, 'pagination': page})
+	except ValueError as e:
+		return jsonify({'success': False, 'error': str(e)}), 400
 	except Exception as e:
 		return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -371,14 +413,35 @@ def delete_session(session_id):
 		return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@main.route('/api/sessions/bulk-delete', methods=['POST'])
+@jwt_required()
+def bulk_delete_sessions():
+	"""Delete many sessions and all their data in one transaction. Requires authentication."""
+	try:
+		data = request.get_json(silent=True) or {}
+		session_ids = data.get('session_ids')
+		if not isinstance(session_ids, list) or not session_ids:
+			return jsonify({'success': False, 'error': 'Request body must contain a non-empty "session_ids" array'}), 400
+		if not all(isinstance(i, str) and i for i in session_ids):
+			return jsonify({'success': False, 'error': 'session_ids must be non-empty strings'}), 400
+
+		result = MeasurementSessionService.delete_many(session_ids)
+		not_found = result.pop('not_found')
+		return jsonify({'success': True, 'deleted': result, 'not_found': not_found})
+	except Exception as e:
+		return jsonify({'success': False, 'error': str(e)}), 500
+
+
 # RESTful API endpoints for sensor_readings CRUD
 
 @main.route('/api/sensor-readings', methods=['GET'])
 def get_sensor_readings():
-	"""Get all sensor readings."""
+	"""List sensor readings newest first, one keyset page at a time."""
 	try:
-		readings = SensorReadingService.get_all()
-		return jsonify({'success': True, 'data': readings})
+		readings, page = SensorReadingService.get_page(**_page_args('session_id', 'start', 'end'))
+		return jsonify({'success': True, 'data': readings, 'pagination': page})
+	except ValueError as e:
+		return jsonify({'success': False, 'error': str(e)}), 400
 	except Exception as e:
 		return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -395,16 +458,146 @@ def get_sensor_reading(reading_id):
 		return jsonify({'success': False, 'error': str(e)}), 500
 
 
+EXPORT_MIMETYPES = {
+	'json': 'application/json',
+	'ndjson': 'application/x-ndjson',
+	'csv': 'text/csv'
+}
+
+
+def _export_format():
+	"""Pick the export format from ?format= or, failing that, the Accept header."""
+	fmt = request.args.get('format')
+	if fmt:
+		fmt = fmt.lower()
+		if fmt not in EXPORT_MIMETYPES:
+			raise ValueError(f"Unsupported format '{fmt}', use one of: {', '.join(EXPORT_MIMETYPES)}")
+		return fmt
+
+	best = request.accept_mimetypes.best_match(list(EXPORT_MIMETYPES.values()), default='application/json')
+	return {v: k for k, v in EXPORT_MIMETYPES.items()}[best]
+
+
+def _stream_readings(session_id, fmt, chunk_rows=500):
+	"""Generate NDJSON or CSV text for a session's readings, a chunk of rows per write."""
+	columns = SensorReadingService.EXPORT_COLUMNS
+	batch_size = current_app.config.get('EXPORT_YIELD_PER', 1000)
+
+	def value(v):
+		return v.isoformat() if isinstance(v, datetime) else v
+
+	buf = io.StringIO()
+	writer = csv.writer(buf) if fmt == 'csv' else None
+	if writer:
+		writer.writerow(columns)
+
+	pending = 0
+	for row in SensorReadingService.iter_by_session(session_id, batch_size=batch_size):
+		if writer:
+			writer.writerow([value(v) for v in row])
+		else:
+			buf.write(json.dumps(dict(zip(columns, (value(v) for v in row)))))
+			buf.write('\n')
+		pending += 1
+		if pending >= chunk_rows:
+			yield buf.getvalue()
+			buf.seek(0)
+			buf.truncate()
+			pending = 0
+
+	if buf.tell():
+		yield buf.getvalue()
+
+
 @main.route('/api/sessions/<session_id>/sensor-readings', methods=['GET'])
 def get_session_sensor_readings(session_id):
-	"""Get all sensor readings for a specific session."""
+	"""Get all sensor readings for a specific session.
+
+	`?format=ndjson|csv` (or a matching Accept header) streams the readings
+	instead of building one JSON payload.
+	"""
 	try:
+		fmt = _export_format()
+		if fmt != 'json':
+			headers = {}
+			if fmt == 'csv':
+				headers['Content-Disposition'] = f'attachment; filename=session-{session_id}-readings.csv'
+			return Response(
+				stream_with_context(_stream_readings(session_id, fmt)),
+				mimetype=EXPORT_MIMETYPES[fmt],
+				headers=headers
+			)
+
 		readings = SensorReadingService.get_by_session(session_id)
 		return jsonify({'success': True, 'data': readings})
+	except ValueError as e:
+		return jsonify({'success': False, 'error': str(e)}), 400
 	except Exception as e:
 		return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@main.route('/api/sessions/<session_id>/sensor-readings/aggregate', methods=['GET'])
+def aggregate_session_sensor_readings(session_id):
+	"""Downsampled sensor readings of a session for charts.
+
+	`?mode=buckets` (default) returns min/max/mean/count per `resolution`
+	bucket (1s, 10s, 1m, 1h, ... or auto); `?mode=lttb` returns `points`
+	points per series chosen by LTTB. `start`/`end` limit the time range and
+	`fields` the series (hr,temp,eda).
+	"""
+	try:
+		try:
+			points = int(request.args.get('points', current_app.config.get('AGGREGATE_DEFAULT_POINTS', 2000)))
+		except ValueError:
+			raise ValueError('points must be an integer')
+		fields = request.args.get('fields')
+		data = SensorReadingService.aggregate(
+			session_id,
+			mode=request.args.get('mode', 'buckets'),
+			resolution=request.args.get('resolution'),
+			points=points,
+			max_points=current_app.config.get('AGGREGATE_MAX_POINTS', 10000),
+			start=request.args.get('start'),
+			end=request.args.get('end'),
+			fields=[f.strip() for f in fields.split(',') if f.strip()] if fields else None
+		)
+		return jsonify({'success': True, 'data': data})
+	except ValueError as e:
+		return jsonify({'success': False, 'error': str(e)}), 400
+	except Exception as e:
+		return jsonify({'success': False, 'error': str(e)}), 500
+
+
+def _rollup_response(scope, scope_id):
+	"""Rollup chart data for a session or device from `resolution` (default 1h), `start` and `end`."""
+	try:
+		data = RollupService.summary(
+			scope,
+			scope_id,
+			resolution=request.args.get('resolution', '1h'),
+			start=request.args.get('start'),
+			end=request.args.get('end'),
+			max_buckets=current_app.config.get('AGGREGATE_MAX_POINTS', 10000)
+		)
+		return jsonify({'success': True, 'data': data})
+	except ValueError as e:
+		return jsonify({'success': False, 'error': str(e)}), 400
+	except Exception as e:
+		return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@main.route('/api/sessions/<session_id>/rollups', methods=['GET'])
+def session_rollups(session_id):
+	"""Per-bucket sensor min/max/mean and stress label counts of a session, from the rollup tables."""
+	return _rollup_response('session', session_id)
+
+
+@main.route('/api/devices/<device_id>/rollups', methods=['GET'])
+def device_rollups(device_id):
+	"""Per-bucket sensor min/max/mean and stress label counts across all sessions of a device."""
+	return _rollup_response('device', device_id)
+
+
 @main.route('/api/sessions/<session_id>/sensor-readings/bulk', methods=['POST'])
 def create_bulk_sensor_readings(session_id):
 	"""Create multiple sensor readings for a session at once."""
@@ -426,30 +619,11 @@ def create_bulk_sensor_readings(session_id):
 				'error': 'Readings array cannot be empty'
 			}), 400
 		
-		# Validate each reading has required fields
-		required_fields = ['hr', 'temp', 'eda']
-		created_readings = []
-		errors = []
-		
-		for idx, reading_data in enumerate(readings_data):
-			missing = [f for f in required_fields if f not in reading_data]
-			if missing:
-				errors.append({
-					'index': idx,
-					'error': f"Missing fields: {', '.join(missing)}"
-				})
-				continue
-			
-			try:
-				# Add session_id to each reading
-				reading_data['session_id'] = session_id
-				created = SensorReadingService.create(reading_data)
-				created_readings.append(created)
-			except Exception as e:
-				errors.append({
-					'index': idx,
-					'error': str(e)
-				})
+		# Validate the whole array up front, then insert it in one transaction
+		result = SensorReadingService.create_many(session_id, readings_data)
+		if result is None:
+			return jsonify({'success': False, 'error': 'Session not found'}), 404
+		created_readings, errors = result
 		
 		# Return results
 		response = {
@@ -480,6 +654,8 @@ def create_sensor_reading():
 			return jsonify({'success': False, 'error': f"Missing fields: {', '.join(missing)}"}), 400
 		
 		reading = SensorReadingService.create(data)
+		if reading is None:
+			return jsonify({'success': False, 'error': 'Session not found'}), 404
 		return jsonify({'success': True, 'data': reading}), 201
 	except Exception as e:
 		return jsonify({'success': False, 'error': str(e)}), 500
@@ -599,16 +775,14 @@ def esp32_http_fallback():
 
 		# Perform stress prediction
 		try:
-			prediction_result = StressModelService.predict_stress({
-				'hr': hr,
-				'temp': temp,
-				'eda': eda
-			})
-			stress_label = prediction_result.get('prediction', 'unknown')
-			confidence = prediction_result.get('confidence', 0.0)
+			prediction_result = StressModelService.predict(hr, temp, eda)
+			stress_label = prediction_result.get('label', 'unknown')
+			confidence = prediction_result.get('confidence_level', 0.0)
+			model_version = prediction_result.get('model_version')
 		except Exception as e:
 			stress_label = 'error'
 			confidence = 0.0
+			model_version = None
 
 		# Save to database using the existing service
 		history_data = {
@@ -618,6 +792,7 @@ def esp32_http_fallback():
 			'eda': eda,
 			'label': stress_label,
 			'confidence_level': confidence,
+			'model_version': model_version,
 			'notes': f'HTTP data from {device_id}'
 		}
 		
@@ -654,9 +829,12 @@ def esp32_http_fallback():
 def system_status():
 	"""Get system status including WebSocket connections."""
 	try:
-		# Get recent data count
-		recent_count = StressHistoryService.get_recent_count(hours=24)
-		total_count = len(StressHistoryService.get_all())
+		# Maintained counters; the table is only re-counted when the TTL expires
+		counts = StressHistoryStats.snapshot()
+		live_buffer = current_app.extensions.get('live_buffer')
+		live_inference = current_app.extensions.get('live_inference')
+		live_broadcast = current_app.extensions.get('live_broadcast')
+		model_registry = current_app.extensions.get('model_registry')
 		
 		return jsonify({
 			'success': True,
@@ -668,15 +846,25 @@ def system_status():
 				'real_time_monitoring': True
 			},
 			'statistics': {
-				'total_records': total_count,
-				'recent_24h_records': recent_count,
+				'total_records': counts['total'],
+				'recent_24h_records': counts['recent_24h'],
+				'records_by_label': counts['by_label'],
+				'hourly_records': counts['hourly'],
+				'counts_age_seconds': counts['age_seconds'],
 				'last_updated': datetime.now(JAKARTA_TZ).isoformat()
 			},
+			'live_persistence': live_buffer.snapshot() if live_buffer else None,
+			'live_inference': live_inference.snapshot() if live_inference else None,
+			'live_broadcast': live_broadcast.snapshot() if live_broadcast else None,
+			'model': model_registry.health() if model_registry else None,
+			'storage': sqlite_profile(db.engine),
 			'endpoints': {
 				'websocket': '/socket.io/',
 				'http_esp32_fallback': '/api/esp32/data',
 				'websocket_info': '/api/websocket/info',
-				'system_status': '/api/system/status'
+				'system_status': '/api/system/status',
+				'inference_metrics': '/api/system/inference',
+				'readiness': '/api/health/ready'
 			}
 		})
 	except Exception as e:
@@ -687,6 +875,74 @@ def system_status():
 		}), 500
 
 
+@main.route('/api/health/live', methods=['GET'])
+def health_live():
+	"""Liveness probe: the process is up and serving requests."""
+	return jsonify({'success': True, 'status': 'alive'})
+
+
+@main.route('/api/health/ready', methods=['GET'])
+def health_ready():
+	"""Readiness probe: 200 once the model artifacts are loaded and warmed up, 503 otherwise."""
+	registry = current_app.extensions.get('model_registry')
+	model = registry.health() if registry else {'ready': StressModelService.ready(), 'state': 'lazy'}
+	return jsonify({
+		'success': model['ready'],
+		'status': 'ready' if model['ready'] else 'unready',
+		'model': model
+	}), 200 if model['ready'] else 503
+
+
+@main.route('/api/admin/model/reload', methods=['POST'])
+@jwt_required()
+def reload_model():
+	"""Reload the model artifacts from MODEL_DIR without a restart.
+
+	The new version is loaded and warmed up in the background, then swapped
+	in; requests keep using the current version meanwhile. With ?wait=1 the
+	reload runs before responding.
+	"""
+	try:
+		registry = current_app.extensions.get('model_registry')
+		if registry is None or registry.state == 'lazy':
+			return jsonify({'success': False, 'error': 'Model hot reload requires MODEL_EAGER_LOAD'}), 409
+
+		if request.args.get('wait', '').lower() in ('1', 'true', 'yes'):
+			previous = registry.version
+			registry.load()
+			model = registry.health()
+			if registry.error:
+				# A failed reload keeps the previous version serving
+				return jsonify({'success': False, 'error': registry.error, 'model': model}), 500
+			return jsonify({'success': True, 'reloaded': model['version'] != previous, 'model': model})
+
+		from . import socketio
+		started = registry.reload_async(socketio.start_background_task)
+		if not started:
+			return jsonify({'success': False, 'error': 'A model reload is already in progress'}), 409
+		return jsonify({'success': True, 'status': 'reloading', 'version': registry.version}), 202
+	except Exception as e:
+		return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@main.route('/api/system/inference', methods=['GET'])
+def inference_metrics():
+	"""Get micro-batching, prediction cache and CPU pool metrics of the prediction service."""
+	try:
+		metrics = StressModelService.batching_metrics()
+		cache = StressModelService.cache_metrics()
+		return jsonify({
+			'success': True,
+			'batching_enabled': metrics is not None,
+			'data': metrics,
+			'cache_enabled': cache is not None,
+			'cache': cache,
+			'cpu_pool': pool_metrics()
+		})
+	except Exception as e:
+		return jsonify({'success': False, 'error': str(e)}), 500
+
+
 # ============================================
 # Authentication & User Management Routes
 # ============================================
@@ -974,138 +1230,15 @@ def offline_sync():
                 'error': 'records must be a non-empty array'
             }), 400
 
-        created_items = []
-        errors = []
-
-        for idx, record in enumerate(records):
-            try:
-                missing = [
-                    key for key in ('hr', 'temp', 'eda', 'label')
-                    if key not in record
-                ]
-
-                if missing:
-                    errors.append({
-                        'index': idx,
-                        'error': f"Missing fields: {', '.join(missing)}"
-                    })
-                    continue
-
-                hr = float(record['hr'])
-                temp = float(record['temp'])
-                eda = float(record['eda'])
-
-                raw_label = str(record.get('label', '')).strip().lower()
-
-                if raw_label == 'normal':
-                    label = 'Normal'
-                elif raw_label in ['medium', 'medium stress', 'medium stres']:
-                    label = 'Medium Stress'
-                elif raw_label in ['high', 'high stress']:
-                    label = 'High Stress'
-                else:
-                    label = 'Normal'
-
-                duration = record.get('duration', 60)
-                average_window = record.get('average_window', 10)
-                prediction_source = record.get(
-                    'prediction_source',
-                    'esp32_offline'
-                )
-                local_millis = record.get('local_millis')
-
-                # Create session for each offline record
-                session_data = {
-                    'name': f'Offline ESP32 Session - {device_id}',
-                    'notes': (
-                        f'Offline synced data from {device_id}; '
-                        f'duration={duration}s; '
-                        f'average_window={average_window}s; '
-                        f'local_millis={local_millis}'
-                    )
-                }
-
-                session = MeasurementSessionService.create(session_data)
-
-                # ============================================
-                # Save sensor readings
-                # Jika ada readings array dari ESP32, simpan semua.
-                # Kalau readings kosong, simpan 1 data rata-rata akhir.
-                # ============================================
-                saved_readings = []
-
-                readings = record.get('readings', [])
-
-                if isinstance(readings, list) and len(readings) > 0:
-                    for reading_idx, reading in enumerate(readings):
-                        try:
-                            reading_hr = float(reading.get('hr', hr))
-                            reading_temp = float(reading.get('temp', temp))
-                            reading_eda = float(reading.get('eda', eda))
-
-                            sensor_data = {
-                                'session_id': session['id'],
-                                'hr': reading_hr,
-                                'temp': reading_temp,
-                                'eda': reading_eda
-                            }
-
-                            saved_reading = SensorReadingService.create(sensor_data)
-                            saved_readings.append(saved_reading)
-
-                        except Exception as reading_error:
-                            errors.append({
-                                'index': idx,
-                                'reading_index': reading_idx,
-                                'error': str(reading_error)
-                            })
-                else:
-                    sensor_data = {
-                        'session_id': session['id'],
-                        'hr': hr,
-                        'temp': temp,
-                        'eda': eda
-                    }
-
-                    saved_reading = SensorReadingService.create(sensor_data)
-                    saved_readings.append(saved_reading)
-
-                saved_sensor = saved_readings[0] if saved_readings else {'id': None}
-
-                # Save stress history using ESP32 offline result
-                history_data = {
-                    'session_id': session['id'],
-                    'hr': hr,
-                    'temp': temp,
-                    'eda': eda,
-                    'label': label,
-                    'confidence_level': 1.0,
-                    'notes': (
-                        f'prediction_source={prediction_source}; '
-                        f'device_id={device_id}; '
-                        f'offline_sync=true; '
-                        f'duration={duration}s; '
-                        f'average_window={average_window}s; '
-                        f'local_millis={local_millis}'
-                    )
-                }
-
-                saved_history = StressHistoryService.create(history_data)
-
-                created_items.append({
-                    'index': idx,
-                    'session_id': session['id'],
-                    'sensor_reading_id': saved_sensor['id'],
-                    'sensor_reading_count': len(saved_readings),
-                    'history_id': saved_history['id'],
-                    'label': label
-                })
-
-            except Exception as item_error:
-                errors.append({
-                    'index': idx,
-                    'error': str(item_error)
-                })
+        # Validate everything, score unlabeled records in one model call,
+        # then bulk-write sessions/readings/histories per chunk.
+        result = OfflineSyncService.sync(
+            device_id,
+            records,
+            chunk_size=current_app.config.get('OFFLINE_SYNC_CHUNK_SIZE', 500)
+        )
+        created_items = result['data']
+        errors = result['errors']
 
         response = {
             'success': len(created_items) > 0,
@@ -1,11 +1,22 @@
 from datetime import datetime, timezone, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Iterator, Sequence
 from flask_jwt_extended import create_access_token, create_refresh_token
+from sqlalchemy import delete, func, insert, select, tuple_
 from . import db
 from .models import AppInfo, HistoryStress, MeasurementSession, SensorReading, User
+from .batching import MicroBatcher
+from .downsample import aggregate, auto_resolution, downsample, parse_resolution
+from .prediction_cache import PredictionCache
+from . import offload
+from . import rollups
+import base64
+import json
 import os
+import threading
+import time
 from pathlib import Path
 import joblib
+import numpy as np
 import pandas as pd
 import uuid
 
@@ -13,6 +24,96 @@ import uuid
 JAKARTA_TZ = timezone(timedelta(hours=7))
 
 
+def _bulk_insert(model, rows: List[Dict[str, Any]]) -> List[Any]:
+    """Insert pre-validated rows with executemany and return their primary keys in order.
+
+    Does not commit; the caller owns the transaction.
+    """
+    if not rows:
+        return []
+
+    pk = model.__mapper__.primary_key[0]
+    if db.engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+        stmt = insert(model).returning(pk, sort_by_parameter_order=True)
+        return list(db.session.scalars(stmt, rows))
+
+    # Fallback for backends without INSERT..RETURNING on executemany
+    objects = [model(**row) for row in rows]
+    db.session.add_all(objects)
+    db.session.flush()
+    return [getattr(obj, pk.key) for obj in objects]
+
+
+def _parse_jakarta_timestamp(value: Any) -> datetime:
+    """Parse an ISO timestamp (or pass through a datetime); naive values are assumed Jakarta time."""
+    parsed = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        return parsed.astimezone(JAKARTA_TZ)
+    return parsed.replace(tzinfo=JAKARTA_TZ)
+
+
+def _session_exists(session_id: str) -> bool:
+    return db.session.get(MeasurementSession, session_id) is not None
+
+
+def _epoch_to_iso(epoch: np.ndarray, unit: str) -> List[str]:
+    """ISO strings (Jakarta offset) for wall-clock epoch seconds from SensorReadingService.fetch_columns."""
+    stamps = np.round(epoch * 1000.0).astype('datetime64[ms]')
+    return [f'{s}+07:00' for s in np.datetime_as_string(stamps, unit=unit)]
+
+
+def encode_cursor(ts: datetime, rec_id: Any) -> str:
+    """Opaque keyset cursor for the (timestamp, id) position of a row."""
+    raw = json.dumps([ts.isoformat() if ts else None, rec_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, Any]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        ts, rec_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(ts), rec_id
+    except Exception:
+        raise ValueError('Invalid pagination cursor')
+
+
+def _keyset_page(query, ts_col, id_col, limit: int, after: Optional[str] = None,
+                 before: Optional[str] = None) -> Tuple[List[Any], Dict[str, Any]]:
+    """Fetch one page ordered newest first by (timestamp, id) without OFFSET.
+
+    `after` continues towards older rows, `before` goes back towards newer ones.
+    Returns the rows and a pagination dict with ``next_cursor`` / ``prev_cursor``.
+    """
+    if after and before:
+        raise ValueError('Use either after or before, not both')
+
+    key = tuple_(ts_col, id_col)
+    if before:
+        ts, rec_id = decode_cursor(before)
+        rows = query.filter(key > tuple_(ts, rec_id)).order_by(ts_col.asc(), id_col.asc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = list(reversed(rows[:limit]))
+        more_newer, more_older = has_more, True
+    else:
+        if after:
+            ts, rec_id = decode_cursor(after)
+            query = query.filter(key < tuple_(ts, rec_id))
+        rows = query.order_by(ts_col.desc(), id_col.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        more_newer, more_older = bool(after), has_more
+
+    def cursor(row):
+        return encode_cursor(getattr(row, ts_col.key), getattr(row, id_col.key))
+
+    return rows, {
+        'limit': limit,
+        'has_more': has_more,
+        'next_cursor': cursor(rows[-1]) if rows and more_older else None,
+        'prev_cursor': cursor(rows[0]) if rows and more_newer else None
+    }
+
+
 class AppInfoService:
     """Service class for handling app_info CRUD operations."""
 
@@ -92,6 +193,111 @@ class AppInfoService:
         }
 
 
+class StressHistoryStats:
+    """Maintained stress_history counters for /api/system/status.
+
+    Totals, per-label and per-hour counts are loaded with two aggregate
+    queries, then kept current by the service write paths. Bulk deletes
+    and label edits just invalidate them; they are reloaded at most every
+    `ttl` seconds, which also bounds drift between worker processes.
+    """
+
+    HOUR_FORMAT = '%Y-%m-%d %H:00'
+    ROLLING_HOURS = 24
+
+    ttl = 300.0
+    _lock = threading.Lock()
+    _loaded_at = None
+    _total = 0
+    _by_label: Dict[str, int] = {}
+    _by_hour: Dict[str, int] = {}
+
+    @classmethod
+    def configure(cls, ttl: float) -> None:
+        cls.ttl = float(ttl)
+        cls.invalidate()
+
+    @classmethod
+    def invalidate(cls) -> None:
+        with cls._lock:
+            cls._loaded_at = None
+
+    @classmethod
+    def _hour_key(cls, ts: datetime) -> str:
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(JAKARTA_TZ)
+        return ts.strftime(cls.HOUR_FORMAT)
+
+    @classmethod
+    def _load(cls) -> None:
+        cutoff = datetime.now(JAKARTA_TZ).replace(minute=0, second=0, microsecond=0) - timedelta(hours=cls.ROLLING_HOURS - 1)
+
+        by_label = dict(
+            db.session.query(HistoryStress.label, func.count(HistoryStress.id)).group_by(HistoryStress.label).all()
+        )
+        hour = func.strftime('%Y-%m-%d %H:00', HistoryStress.timestamp)
+        by_hour = dict(
+            db.session.query(hour, func.count(HistoryStress.id))
+            .filter(HistoryStress.timestamp >= cutoff)
+            .group_by(hour)
+            .all()
+        )
+
+        cls._by_label = {str(k) if k is not None else 'Unknown': v for k, v in by_label.items()}
+        cls._by_hour = by_hour
+        cls._total = sum(by_label.values())
+        cls._loaded_at = time.monotonic()
+
+    @classmethod
+    def record_insert(cls, rows: List[Tuple[datetime, Optional[str]]]) -> None:
+        """Count newly committed (timestamp, label) rows."""
+        with cls._lock:
+            if cls._loaded_at is None:
+                return
+            for ts, label in rows:
+                label = label if label is not None else 'Unknown'
+                cls._total += 1
+                cls._by_label[label] = cls._by_label.get(label, 0) + 1
+                key = cls._hour_key(ts)
+                cls._by_hour[key] = cls._by_hour.get(key, 0) + 1
+
+    @classmethod
+    def record_delete(cls, ts: datetime, label: Optional[str]) -> None:
+        """Un-count one deleted row."""
+        with cls._lock:
+            if cls._loaded_at is None:
+                return
+            label = label if label is not None else 'Unknown'
+            cls._total = max(cls._total - 1, 0)
+            if cls._by_label.get(label):
+                cls._by_label[label] -= 1
+            key = cls._hour_key(ts)
+            if cls._by_hour.get(key):
+                cls._by_hour[key] -= 1
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, Any]:
+        """Current counters, reloading from the table only when the TTL has expired."""
+        with cls._lock:
+            if cls._loaded_at is None or time.monotonic() - cls._loaded_at > cls.ttl:
+                cls._load()
+
+            now = datetime.now(JAKARTA_TZ).replace(minute=0, second=0, microsecond=0)
+            hours = [cls._hour_key(now - timedelta(hours=h)) for h in range(cls.ROLLING_HOURS - 1, -1, -1)]
+            hourly = [{'hour': h, 'count': cls._by_hour.get(h, 0)} for h in hours]
+
+            # drop buckets that rolled out of the window
+            cls._by_hour = {h: cls._by_hour[h] for h in hours if h in cls._by_hour}
+
+            return {
+                'total': cls._total,
+                'recent_24h': sum(item['count'] for item in hourly),
+                'by_label': {k: v for k, v in cls._by_label.items() if v},
+                'hourly': hourly,
+                'age_seconds': round(time.monotonic() - cls._loaded_at, 3)
+            }
+
+
 class StressHistoryService:
     """Service class for handling stress_history CRUD operations."""
 
@@ -100,6 +306,22 @@ class StressHistoryService:
         histories = HistoryStress.query.order_by(HistoryStress.timestamp.desc()).all()
         return [StressHistoryService._to_dict(h) for h in histories]
 
+    @staticmethod
+    def get_page(limit: int = 100, after: Optional[str] = None, before: Optional[str] = None,
+                 session_id: Optional[str] = None, start: Optional[str] = None,
+                 end: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Get one keyset page of stress history, newest first, with optional filters."""
+        query = HistoryStress.query
+        if session_id:
+            query = query.filter(HistoryStress.session_id == session_id)
+        if start:
+            query = query.filter(HistoryStress.timestamp >= _parse_jakarta_timestamp(start))
+        if end:
+            query = query.filter(HistoryStress.timestamp < _parse_jakarta_timestamp(end))
+
+        rows, page = _keyset_page(query, HistoryStress.timestamp, HistoryStress.id, limit, after, before)
+        return [StressHistoryService._to_dict(h) for h in rows], page
+
     @staticmethod
     def get_by_id(rec_id: int):
         rec = HistoryStress.query.get(rec_id)
@@ -113,6 +335,10 @@ class StressHistoryService:
 
     @staticmethod
     def create(data: dict):
+        """Create a stress history record. Returns None when its session_id does not exist."""
+        if data.get('session_id') and not _session_exists(data['session_id']):
+            return None
+
         # Use Jakarta time for timestamp
         ts_val = datetime.now(JAKARTA_TZ)
 
@@ -124,10 +350,17 @@ class StressHistoryService:
             eda=data.get('eda'),
             label=data.get('label'),
             confidence_level=data.get('confidence_level'),
+            model_version=data.get('model_version'),
             notes=data.get('notes') or ''
         )
-        db.session.add(rec)
-        db.session.commit()
+        try:
+            db.session.add(rec)
+            rollups.record_history([{'session_id': rec.session_id, 'timestamp': ts_val, 'label': rec.label}])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        StressHistoryStats.record_insert([(ts_val, rec.label)])
         return StressHistoryService._to_dict(rec)
 
     @staticmethod
@@ -135,6 +368,7 @@ class StressHistoryService:
         rec = HistoryStress.query.get(rec_id)
         if not rec:
             return None
+        old_ts = rec.timestamp
 
         if 'timestamp' in data:
             try:
@@ -160,7 +394,11 @@ class StressHistoryService:
         if 'notes' in data:
             rec.notes = data.get('notes')
 
+        if 'label' in data or 'timestamp' in data:
+            rollups.refresh(rec.session_id, [old_ts, rec.timestamp])
         db.session.commit()
+        if 'label' in data or 'timestamp' in data:
+            StressHistoryStats.invalidate()
         return StressHistoryService._to_dict(rec)
 
     @staticmethod
@@ -170,28 +408,16 @@ class StressHistoryService:
         if not rec:
             return False
         
-        # Get session_id before deleting the record
         session_id = rec.session_id
-        
-        # Delete the stress history record
+        if session_id and db.session.get(MeasurementSession, session_id) is not None:
+            # Cascade to the session, which takes its readings and other stress history along
+            MeasurementSessionService.delete_many([session_id])
+            return True
+
+        rec_ts, rec_label = rec.timestamp, rec.label
         db.session.delete(rec)
         db.session.commit()
-        
-        # If this record had a session, cascade delete the session
-        # (which will also delete all related sensor_readings and other stress_history)
-        if session_id:
-            session = MeasurementSession.query.get(session_id)
-            if session:
-                # Delete all sensor readings for this session
-                SensorReading.query.filter_by(session_id=session_id).delete()
-                
-                # Delete all remaining stress history for this session
-                HistoryStress.query.filter_by(session_id=session_id).delete()
-                
-                # Delete the session itself
-                db.session.delete(session)
-                db.session.commit()
-        
+        StressHistoryStats.record_delete(rec_ts, rec_label)
         return True
 
     @staticmethod
@@ -213,6 +439,7 @@ class StressHistoryService:
             'eda': rec.eda,
             'label': rec.label,
             'confidence_level': rec.confidence_level,
+            'model_version': rec.model_version,
             'notes': rec.notes or '',
             'created_at': rec.created_at.isoformat() if rec.created_at else None
         }
@@ -228,15 +455,36 @@ class StressModelService:
 
     _scaler = None
     _model = None
+    _batcher = None
+    # PredictionCache in front of the model; None when caching is disabled
+    _cache = None
+    # ModelRegistry that loaded the artifacts at startup; None means lazy loading
+    _registry = None
+    # ModelVersion swapped in by the registry; explicitly set _scaler/_model take precedence
+    _active = None
 
     @classmethod
     def _model_dir(cls) -> Path:
         # project root is parent of the `app` package
         return Path(__file__).resolve().parents[1] / 'models'
 
+    @classmethod
+    def ready(cls) -> bool:
+        """Whether predictions can be served: models loaded, or loaded lazily on first use."""
+        if cls._active is not None or (cls._scaler is not None and cls._model is not None):
+            return True
+        return cls._registry is None or cls._registry.ready
+
+    @classmethod
+    def _ensure_registry_ready(cls) -> None:
+        # With eager loading, a failed startup load is reported instead of retried per request
+        if cls._registry is not None and not cls._registry.ready:
+            raise RuntimeError(f"Model not ready: {cls._registry.error or cls._registry.state}")
+
     @classmethod
     def _load_scaler(cls):
         if cls._scaler is None:
+            cls._ensure_registry_ready()
             scaler_path = cls._model_dir() / 'scaler_model.pkl'
             if not scaler_path.exists():
                 raise RuntimeError(f"Scaler not found at {scaler_path}")
@@ -246,38 +494,183 @@ class StressModelService:
     @classmethod
     def _load_model(cls):
         if cls._model is None:
+            cls._ensure_registry_ready()
             model_path = cls._model_dir() / 'classification_rf_model.pkl'
             if not model_path.exists():
                 raise RuntimeError(f"Model not found at {model_path}")
             cls._model = joblib.load(str(model_path))
         return cls._model
 
+    # Column order the scaler and model were trained on
+    FEATURE_COLUMNS = ['HR', 'EDA', 'TEMP']
+    # Position of each FEATURE_COLUMNS entry in an input [hr, temp, eda] row
+    INPUT_ORDER = [0, 2, 1]
+    LABELS = {0: 'Normal', 1: 'Medium', 2: 'High Stress'}
+
+    @staticmethod
+    def _as_feature_matrix(samples) -> np.ndarray:
+        """Convert an (N, 3) ``[hr, temp, eda]`` array or a list of dicts into a float matrix."""
+        if isinstance(samples, np.ndarray):
+            X = samples.astype(float, copy=False)
+        elif len(samples) > 0 and isinstance(samples[0], dict):
+            X = np.array([[s['hr'], s['temp'], s['eda']] for s in samples], dtype=float)
+        else:
+            X = np.asarray(samples, dtype=float)
+
+        if X.size == 0:
+            X = X.reshape(0, 3)
+        if X.ndim != 2 or X.shape[1] != 3:
+            raise ValueError(f"Expected samples of shape (N, 3), got {X.shape}")
+        return X
+
     @classmethod
-    def predict(cls, hr: float, temp: float, eda: float) -> Dict[str, Any]:
-        scaler = cls._load_scaler()
-        model = cls._load_model()
+    def model_version(cls) -> Optional[str]:
+        """Version of the registry-loaded model serving predictions, if any."""
+        if cls._scaler is None and cls._model is None and cls._active is not None:
+            return cls._active.version
+        return None
 
-        # prepare dataframe consistent with training columns
-        df = pd.DataFrame([[hr, eda, temp]], columns=['HR', 'EDA', 'TEMP'])
-        X = scaler.transform(df)
+    @classmethod
+    def _resolve(cls) -> tuple:
+        """(scaler, model, version, fast) to serve one call with, read once so a reload cannot mix versions."""
+        active = cls._active
+        if cls._scaler is None and cls._model is None and active is not None:
+            return active.scaler, active.model, active.version, active.fast
+        return cls._load_scaler(), cls._load_model(), None, None
 
-        pred = model.predict(X)[0]
-        # probability for predicted class (max probability)
-        try:
-            proba = float(model.predict_proba(X).max())
-        except Exception:
-            # some models may not support predict_proba
-            proba = 1.0
+    @classmethod
+    def predict_batch(cls, samples) -> Dict[str, Any]:
+        """Predict stress labels for many samples with one scaler and one model pass.
+
+        `samples` is an (N, 3) array of ``[hr, temp, eda]`` rows or a list of
+        dicts with ``hr``, ``temp`` and ``eda`` keys. Returns ``labels`` (str)
+        and ``confidences`` (float) arrays aligned with the input rows, and the
+        ``version`` of the model that produced them.
+        """
+        X = cls._as_feature_matrix(samples)
+        if len(X) == 0:
+            return {'labels': np.array([], dtype=object), 'confidences': np.array([], dtype=float),
+                    'version': cls.model_version()}
+
+        # Off the event loop when a CPU pool is configured (see app/offload.py)
+        pool = offload.get_pool()
+        if pool is not None and pool.kind == 'process':
+            return cls._predict_in_pool(pool, X)
+        return offload.run(cls._predict_local, X)
+
+    @classmethod
+    def _predict_in_pool(cls, pool, X: np.ndarray) -> Dict[str, Any]:
+        """predict_batch() on a process pool; the cache stays in this process and only its misses are sent."""
+        from .model_registry import predict_in_worker
+
+        version = cls.model_version()
+        cache = cls._cache
+        if cache is None:
+            return pool.run(predict_in_worker, X, version)
+
+        def compute(rows):
+            result = pool.run(predict_in_worker, rows, version)
+            return result['labels'], result['confidences']
+
+        labels, confidences = cache.predict(X, version, compute)
+        return {'labels': labels, 'confidences': confidences, 'version': version}
+
+    @classmethod
+    def _predict_local(cls, X: np.ndarray) -> Dict[str, Any]:
+        scaler, model, version, fast = cls._resolve()
+        cache = cls._cache
+        if cache is not None:
+            # models set directly (lazy loading, tests) have no version; their identity stands in
+            token = version if version is not None else id(model)
+            labels, confidences = cache.predict(X, token, lambda rows: cls._predict_with(scaler, model, rows, fast=fast))
+        else:
+            labels, confidences = cls._predict_with(scaler, model, X, fast=fast)
+        return {'labels': labels, 'confidences': confidences, 'version': version}
+
+    @classmethod
+    def _predict_with(cls, scaler, model, X: np.ndarray, fast=None) -> tuple:
+        """Labels and confidences of `model` for an (N, 3) ``[hr, temp, eda]`` matrix.
+
+        `fast` is a FlatForest with the scaler folded in (see ModelRegistry);
+        it takes the raw rows and skips the DataFrame and transform.
+        """
+        if fast is not None:
+            proba = fast.predict_proba(X)
+            preds = fast.classes_[proba.argmax(axis=1)]
+            confidences = proba.max(axis=1)
+        else:
+            # reorder [hr, temp, eda] into the training column order
+            df = pd.DataFrame(X[:, cls.INPUT_ORDER], columns=cls.FEATURE_COLUMNS)
+            X_scaled = scaler.transform(df)
+
+            try:
+                # predict() is argmax over predict_proba for forests, so one pass gives both
+                proba = model.predict_proba(X_scaled)
+                preds = model.classes_[proba.argmax(axis=1)]
+                confidences = proba.max(axis=1).astype(float)
+            except Exception:
+                # some models may not support predict_proba
+                preds = model.predict(X_scaled)
+                confidences = np.ones(len(X), dtype=float)
+
+        labels = np.array([cls.LABELS.get(int(p), str(p)) for p in preds], dtype=object)
+        return labels, confidences
+
+    @classmethod
+    def configure_batching(cls, window_ms: float, max_batch_size: int = 64, create_event=None) -> None:
+        """Route single predict() calls through a micro-batcher; a window of 0 disables it."""
+        if window_ms <= 0:
+            cls._batcher = None
+            return
+
+        kwargs = {'create_event': create_event} if create_event else {}
+        cls._batcher = MicroBatcher(cls._predict_rows, window_ms=window_ms, max_batch_size=max_batch_size, **kwargs)
+
+    @classmethod
+    def batching_metrics(cls) -> Optional[Dict[str, Any]]:
+        """Metrics of the micro-batcher, or None when batching is disabled."""
+        if cls._batcher is None:
+            return None
+        metrics = cls._batcher.metrics.snapshot()
+        metrics['window_ms'] = cls._batcher.window * 1000.0
+        metrics['max_batch_size'] = cls._batcher.max_batch_size
+        return metrics
 
-        label_dict = {0: 'Normal', 1: 'Medium', 2: 'High Stress'}
-        label = label_dict.get(int(pred), str(pred))
+    @classmethod
+    def configure_cache(cls, max_entries: int, ttl: float = 300.0, steps=(0.5, 0.05, 0.01)) -> None:
+        """Cache predictions of [hr, temp, eda] rows snapped to `steps`; max_entries of 0 disables it."""
+        if max_entries <= 0:
+            cls._cache = None
+            return
+        cls._cache = PredictionCache(steps, max_entries=max_entries, ttl=ttl)
+
+    @classmethod
+    def cache_metrics(cls) -> Optional[Dict[str, Any]]:
+        """Hit rate and size of the prediction cache, or None when caching is disabled."""
+        if cls._cache is None:
+            return None
+        return cls._cache.snapshot()
+
+    @classmethod
+    def _predict_rows(cls, rows: List[tuple]) -> List[tuple]:
+        result = cls.predict_batch(np.array(rows, dtype=float))
+        return [(label, confidence, result['version']) for label, confidence in zip(result['labels'], result['confidences'])]
+
+    @classmethod
+    def predict(cls, hr: float, temp: float, eda: float) -> Dict[str, Any]:
+        if cls._batcher is not None:
+            label, confidence, version = cls._batcher.submit((hr, temp, eda))
+        else:
+            result = cls.predict_batch(np.array([[hr, temp, eda]], dtype=float))
+            label, confidence, version = result['labels'][0], result['confidences'][0], result['version']
 
         return {
             'hr': hr,
             'temp': temp,
             'eda': eda,
             'label': label,
-            'confidence_level': proba
+            'confidence_level': float(confidence),
+            'model_version': version
         }
 
 class MeasurementSessionService:
@@ -290,18 +683,63 @@ class MeasurementSessionService:
             id=str(uuid.uuid4()),
             name=data.get('name') if data else None,
             created_at=datetime.now(JAKARTA_TZ),
-            notes=data.get('notes', '') if data else ''
+            notes=data.get('notes', '') if data else '',
+            device_id=data.get('device_id') if data else None
         )
-        db.session.add(session)
-        db.session.commit()
+        try:
+            db.session.add(session)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
         return MeasurementSessionService._to_dict(session)
 
+    @staticmethod
+    def ensure_exists(session_ids: List[str], notes: str = '',
+                      device_ids: Optional[Dict[str, str]] = None) -> List[str]:
+        """Create sessions for any of `session_ids` that do not exist yet; returns the created ids.
+
+        Readings reference their session by foreign key, so writers that take a
+        session id from a device create it before inserting the readings.
+        `device_ids` maps session ids to the device they are created for.
+        """
+        ids = list(dict.fromkeys(i for i in session_ids if i))
+        if not ids:
+            return []
+        existing = set(db.session.scalars(select(MeasurementSession.id).where(MeasurementSession.id.in_(ids))))
+        missing = [i for i in ids if i not in existing]
+        if missing:
+            now = datetime.now(JAKARTA_TZ)
+            try:
+                db.session.add_all([
+                    MeasurementSession(id=i, created_at=now, notes=notes, device_id=(device_ids or {}).get(i))
+                    for i in missing
+                ])
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        return missing
+
     @staticmethod
     def get_all() -> List[Dict[str, Any]]:
         """Get all measurement sessions."""
         sessions = MeasurementSession.query.order_by(MeasurementSession.created_at.desc()).all()
         return [MeasurementSessionService._to_dict(s) for s in sessions]
 
+    @staticmethod
+    def get_page(limit: int = 100, after: Optional[str] = None, before: Optional[str] = None,
+                 start: Optional[str] = None, end: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Get one keyset page of measurement sessions, newest first, with an optional time range."""
+        query = MeasurementSession.query
+        if start:
+            query = query.filter(MeasurementSession.created_at >= _parse_jakarta_timestamp(start))
+        if end:
+            query = query.filter(MeasurementSession.created_at < _parse_jakarta_timestamp(end))
+
+        rows, page = _keyset_page(query, MeasurementSession.created_at, MeasurementSession.id, limit, after, before)
+        return [MeasurementSessionService._to_dict(s) for s in rows], page
+
     @staticmethod
     def get_by_id(session_id: str) -> Optional[Dict[str, Any]]:
         """Get a measurement session by ID."""
@@ -324,24 +762,57 @@ class MeasurementSessionService:
         db.session.commit()
         return MeasurementSessionService._to_dict(session)
 
+    # Session ids per DELETE ... IN (...), below SQLite's bound-parameter limit
+    DELETE_CHUNK_SIZE = 500
+
     @staticmethod
     def delete(session_id: str) -> bool:
         """Delete a measurement session and all related data (cascade delete)."""
-        session = MeasurementSession.query.get(session_id)
-        if not session:
-            return False
-        
-        # Manually delete related records if CASCADE is not at database level
-        # Delete all sensor readings for this session
-        SensorReading.query.filter_by(session_id=session_id).delete()
-        
-        # Delete all stress history for this session
-        HistoryStress.query.filter_by(session_id=session_id).delete()
-        
-        # Delete the session itself
-        db.session.delete(session)
-        db.session.commit()
-        return True
+        return MeasurementSessionService.delete_many([session_id])['sessions'] > 0
+
+    @staticmethod
+    def delete_many(session_ids: List[str]) -> Dict[str, Any]:
+        """Delete sessions and all their readings and stress history in one transaction.
+
+        Each table gets set-based DELETE ... WHERE session_id IN (...) statements,
+        children first, so nothing is loaded into the ORM and the counts are exact
+        whether or not the database enforces ON DELETE CASCADE itself. The
+        sessions' rollups go too, and their devices' rollups are rebuilt for
+        the hours the deleted rows covered.
+        """
+        ids = list(dict.fromkeys(session_ids))
+        counts = {'sessions': 0, 'stress_history': 0, 'sensor_readings': 0}
+        found = set()
+        devices = {}
+        try:
+            for start in range(0, len(ids), MeasurementSessionService.DELETE_CHUNK_SIZE):
+                chunk = ids[start:start + MeasurementSessionService.DELETE_CHUNK_SIZE]
+                found.update(db.session.scalars(select(MeasurementSession.id).where(MeasurementSession.id.in_(chunk))))
+                for device_id, (first, last) in rollups.affected_devices(chunk).items():
+                    if device_id in devices:
+                        first, last = min(first, devices[device_id][0]), max(last, devices[device_id][1])
+                    devices[device_id] = (first, last)
+                for key, model in (('sensor_readings', SensorReading), ('stress_history', HistoryStress)):
+                    result = db.session.execute(
+                        delete(model).where(model.session_id.in_(chunk)).execution_options(synchronize_session=False)
+                    )
+                    counts[key] += result.rowcount
+                result = db.session.execute(
+                    delete(MeasurementSession).where(MeasurementSession.id.in_(chunk))
+                    .execution_options(synchronize_session=False)
+                )
+                counts['sessions'] += result.rowcount
+                rollups.forget_sessions(chunk)
+            for device_id, (first, last) in devices.items():
+                rollups.rebuild('device', device_id, first, last)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        if counts['stress_history']:
+            StressHistoryStats.invalidate()
+        counts['not_found'] = [session_id for session_id in ids if session_id not in found]
+        return counts
 
     @staticmethod
     def _to_dict(session: MeasurementSession) -> Dict[str, Any]:
@@ -350,7 +821,8 @@ class MeasurementSessionService:
             'id': session.id,
             'name': session.name,
             'created_at': session.created_at.isoformat() if session.created_at else None,
-            'notes': session.notes or ''
+            'notes': session.notes or '',
+            'device_id': session.device_id
         }
 
 
@@ -359,7 +831,10 @@ class SensorReadingService:
 
     @staticmethod
     def create(data: dict) -> Dict[str, Any]:
-        """Create a new sensor reading."""
+        """Create a new sensor reading. Returns None when its session does not exist."""
+        if not _session_exists(data['session_id']):
+            return None
+
         reading = SensorReading(
             session_id=data['session_id'],
             timestamp=datetime.now(JAKARTA_TZ),
@@ -367,16 +842,107 @@ class SensorReadingService:
             temp=data['temp'],
             eda=data['eda']
         )
-        db.session.add(reading)
-        db.session.commit()
+        try:
+            db.session.add(reading)
+            rollups.record_readings([{'session_id': reading.session_id, 'timestamp': reading.timestamp,
+                                      'hr': reading.hr, 'temp': reading.temp, 'eda': reading.eda}])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
         return SensorReadingService._to_dict(reading)
 
+    REQUIRED_FIELDS = ('hr', 'temp', 'eda')
+
+    @staticmethod
+    def create_many(session_id: str,
+                    readings: List[Dict[str, Any]]) -> Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+        """Validate a whole array of readings, then insert the valid ones in one transaction.
+
+        Returns ``(created, errors)``: the created readings with their new ids,
+        and one ``{'index', 'error'}`` entry per rejected element. Returns None
+        when there are valid readings but the session does not exist.
+        """
+        rows = []
+        errors = []
+        now = datetime.now(JAKARTA_TZ)
+
+        for idx, reading in enumerate(readings):
+            if not isinstance(reading, dict):
+                errors.append({'index': idx, 'error': 'Reading must be an object'})
+                continue
+
+            missing = [f for f in SensorReadingService.REQUIRED_FIELDS if f not in reading]
+            if missing:
+                errors.append({'index': idx, 'error': f"Missing fields: {', '.join(missing)}"})
+                continue
+
+            try:
+                rows.append({
+                    'session_id': session_id,
+                    'timestamp': now,
+                    'hr': float(reading['hr']),
+                    'temp': float(reading['temp']),
+                    'eda': float(reading['eda']),
+                    'created_at': now
+                })
+            except (TypeError, ValueError) as e:
+                errors.append({'index': idx, 'error': str(e)})
+
+        if not rows:
+            return [], errors
+        if not _session_exists(session_id):
+            return None
+
+        ids = SensorReadingService.insert_many(rows)
+
+        created = []
+        for row, reading_id in zip(rows, ids):
+            created.append({
+                'id': reading_id,
+                'session_id': row['session_id'],
+                'timestamp': row['timestamp'].isoformat(),
+                'hr': row['hr'],
+                'temp': row['temp'],
+                'eda': row['eda'],
+                'created_at': row['created_at'].isoformat()
+            })
+        return created, errors
+
+    @staticmethod
+    def insert_many(rows: List[Dict[str, Any]]) -> List[int]:
+        """Insert already-validated reading rows in one transaction and return their ids."""
+        try:
+            ids = _bulk_insert(SensorReading, rows)
+            rollups.record_readings(rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return ids
+
     @staticmethod
     def get_all() -> List[Dict[str, Any]]:
         """Get all sensor readings."""
         readings = SensorReading.query.order_by(SensorReading.timestamp.desc()).all()
         return [SensorReadingService._to_dict(r) for r in readings]
 
+    @staticmethod
+    def get_page(limit: int = 100, after: Optional[str] = None, before: Optional[str] = None,
+                 session_id: Optional[str] = None, start: Optional[str] = None,
+                 end: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Get one keyset page of sensor readings, newest first, with optional filters."""
+        query = SensorReading.query
+        if session_id:
+            query = query.filter(SensorReading.session_id == session_id)
+        if start:
+            query = query.filter(SensorReading.timestamp >= _parse_jakarta_timestamp(start))
+        if end:
+            query = query.filter(SensorReading.timestamp < _parse_jakarta_timestamp(end))
+
+        rows, page = _keyset_page(query, SensorReading.timestamp, SensorReading.id, limit, after, before)
+        return [SensorReadingService._to_dict(r) for r in rows], page
+
     @staticmethod
     def get_by_id(reading_id: int) -> Optional[Dict[str, Any]]:
         """Get a sensor reading by ID."""
@@ -389,12 +955,105 @@ class SensorReadingService:
         readings = SensorReading.query.filter_by(session_id=session_id).order_by(SensorReading.timestamp.asc()).all()
         return [SensorReadingService._to_dict(r) for r in readings]
 
+    EXPORT_COLUMNS = ('id', 'session_id', 'timestamp', 'hr', 'temp', 'eda', 'created_at')
+
+    @staticmethod
+    def iter_by_session(session_id: str, batch_size: int = 1000) -> Iterator[tuple]:
+        """Yield a session's readings as plain tuples (EXPORT_COLUMNS order), oldest first.
+
+        Rows are streamed from the cursor `batch_size` at a time instead of being
+        loaded as ORM objects, so memory stays flat for very long sessions.
+        """
+        stmt = (
+            select(*[getattr(SensorReading, c) for c in SensorReadingService.EXPORT_COLUMNS])
+            .where(SensorReading.session_id == session_id)
+            .order_by(SensorReading.timestamp.asc(), SensorReading.id.asc())
+            .execution_options(yield_per=batch_size)
+        )
+        for row in db.session.execute(stmt):
+            yield tuple(row)
+
+    SERIES_COLUMNS = ('hr', 'temp', 'eda')
+    AGGREGATE_MODES = ('buckets', 'lttb')
+
+    @staticmethod
+    def fetch_columns(session_id: str, fields: Sequence[str], start: Optional[str] = None,
+                      end: Optional[str] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """A session's readings as columns, oldest first: epoch seconds plus one float array per field.
+
+        Timestamps are stored as Jakarta wall-clock time; the epoch is taken from
+        that wall clock (as if it were UTC), so buckets align to local minutes and hours.
+        """
+        epoch = (func.julianday(SensorReading.timestamp) - 2440587.5) * 86400.0
+        stmt = (
+            select(epoch, *[getattr(SensorReading, f) for f in fields])
+            .where(SensorReading.session_id == session_id)
+            .order_by(SensorReading.timestamp.asc())
+        )
+        if start:
+            stmt = stmt.where(SensorReading.timestamp >= _parse_jakarta_timestamp(start))
+        if end:
+            stmt = stmt.where(SensorReading.timestamp < _parse_jakarta_timestamp(end))
+
+        table = rollups.fetch_float_columns(stmt, len(fields) + 1)
+        # julianday carries ~0.1 ms of float error; round so bucket edges stay exact
+        return np.round(table[:, 0], 3), {f: table[:, i + 1] for i, f in enumerate(fields)}
+
+    @staticmethod
+    def aggregate(session_id: str, mode: str = 'buckets', resolution: Optional[str] = None,
+                  points: int = 2000, max_points: int = 10000, start: Optional[str] = None,
+                  end: Optional[str] = None, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Downsampled HR/TEMP/EDA of a session for charts.
+
+        mode='buckets' returns min/max/mean/count per `resolution` bucket ('auto'
+        or None picks one giving at most `points` buckets). mode='lttb' returns
+        `points` points per series chosen by LTTB, averaged into `resolution`
+        buckets first when one is given.
+        """
+        if mode not in SensorReadingService.AGGREGATE_MODES:
+            raise ValueError(f"mode must be one of {', '.join(SensorReadingService.AGGREGATE_MODES)}")
+        fields = list(fields or SensorReadingService.SERIES_COLUMNS)
+        unknown = [f for f in fields if f not in SensorReadingService.SERIES_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        if not 3 <= points <= max_points:
+            raise ValueError(f'points must be between 3 and {max_points}')
+
+        epoch, columns = SensorReadingService.fetch_columns(session_id, fields, start, end)
+        if resolution in (None, '', 'auto'):
+            span = float(epoch[-1] - epoch[0]) if len(epoch) else 0.0
+            seconds = auto_resolution(span, points) if mode == 'buckets' else None
+        else:
+            seconds = parse_resolution(resolution)
+
+        result = {'session_id': session_id, 'mode': mode, 'resolution_seconds': seconds, 'fields': fields,
+                  'readings': len(epoch)}
+        if mode == 'lttb':
+            series = downsample(epoch, columns, points, seconds)
+            result['series'] = {
+                name: {'timestamp': _epoch_to_iso(s['time'], 'ms'), 'value': s['value'].tolist()}
+                for name, s in series.items()
+            }
+            return result
+
+        buckets = aggregate(epoch, columns, seconds)
+        if len(buckets['count']) > max_points:
+            raise ValueError(f"{len(buckets['count'])} buckets exceed the limit of {max_points}; "
+                             f"choose a coarser resolution or a shorter range")
+        result['buckets'] = {
+            'timestamp': _epoch_to_iso(buckets['start'], 's'),
+            'count': buckets['count'].tolist(),
+            **{name: {stat: buckets[name][stat].tolist() for stat in ('min', 'max', 'mean')} for name in fields}
+        }
+        return result
+
     @staticmethod
     def update(reading_id: int, data: dict) -> Optional[Dict[str, Any]]:
         """Update a sensor reading."""
         reading = SensorReading.query.get(reading_id)
         if not reading:
             return None
+        old_ts = reading.timestamp
 
         if 'hr' in data:
             reading.hr = data['hr']
@@ -414,6 +1073,8 @@ class SensorReadingService:
             except Exception:
                 pass
 
+        if any(key in data for key in ('hr', 'temp', 'eda', 'timestamp')):
+            rollups.refresh(reading.session_id, [old_ts, reading.timestamp])
         db.session.commit()
         return SensorReadingService._to_dict(reading)
 
@@ -424,6 +1085,7 @@ class SensorReadingService:
         if not reading:
             return False
         db.session.delete(reading)
+        rollups.refresh(reading.session_id, [reading.timestamp])
         db.session.commit()
         return True
 
@@ -441,6 +1103,247 @@ class SensorReadingService:
         }
 
 
+class RollupService:
+    """Chart data served from the pre-aggregated rollup tables (see app/rollups.py)."""
+
+    @staticmethod
+    def summary(scope: str, scope_id: str, resolution: Optional[str] = '1h', start: Optional[str] = None,
+                end: Optional[str] = None, max_buckets: int = 10000) -> Dict[str, Any]:
+        """Sensor min/max/mean and stress label counts per bucket for a session or a device.
+
+        `resolution` must be a whole number of minutes; multiples of an hour
+        are merged from the hourly rollups, anything else from the 1-minute ones.
+        """
+        if scope not in rollups.SCOPES:
+            raise ValueError(f"scope must be one of {', '.join(rollups.SCOPES)}")
+        seconds = parse_resolution(resolution or '1h')
+        lo = _parse_jakarta_timestamp(start) if start else None
+        hi = _parse_jakarta_timestamp(end) if end else None
+
+        sensor = rollups.reading_buckets(scope, scope_id, seconds, lo, hi)
+        stress_starts, labels = rollups.label_buckets(scope, scope_id, seconds, lo, hi)
+        buckets = max(len(sensor['count']), len(stress_starts))
+        if buckets > max_buckets:
+            raise ValueError(f'{buckets} buckets exceed the limit of {max_buckets}; '
+                             f'choose a coarser resolution or a shorter range')
+
+        totals = [sum(counts) for counts in zip(*labels.values())] if labels else []
+        return {
+            'scope': scope,
+            'id': scope_id,
+            'resolution_seconds': seconds,
+            'readings': int(sensor['count'].sum()),
+            'sensor': {
+                'timestamp': _epoch_to_iso(sensor['start'], 's'),
+                'count': sensor['count'].tolist(),
+                **{name: {stat: sensor[name][stat].tolist() for stat in ('min', 'max', 'mean')}
+                   for name in rollups.COLUMNS}
+            },
+            'stress': {
+                'timestamp': _epoch_to_iso(np.array(stress_starts, dtype=np.float64), 's'),
+                'total': totals,
+                'labels': labels
+            },
+            'label_totals': {label: sum(counts) for label, counts in labels.items()}
+        }
+
+
+class OfflineSyncService:
+    """Staged, bulk-write pipeline behind /api/offline-sync.
+
+    Records are parsed and validated first, unlabeled ones are scored in one
+    model call, then sessions, readings and histories are written with a few
+    executemany statements per chunk, one transaction per chunk. If a chunk
+    fails, it is rolled back and retried record by record so only the
+    offending records are reported as errors.
+    """
+
+    @staticmethod
+    def _normalize_label(raw_label: Any) -> str:
+        raw_label = str(raw_label or '').strip().lower()
+        if raw_label == 'normal':
+            return 'Normal'
+        if raw_label in ['medium', 'medium stress', 'medium stres']:
+            return 'Medium Stress'
+        if raw_label in ['high', 'high stress']:
+            return 'High Stress'
+        return 'Normal'
+
+    @staticmethod
+    def sync(device_id: str, records: List[Dict[str, Any]], chunk_size: int = 500) -> Dict[str, Any]:
+        """Persist a batch of offline records. Returns ``{'data': [...], 'errors': [...]}``."""
+        errors = []
+        prepared = OfflineSyncService._prepare(device_id, records, errors)
+        OfflineSyncService._predict_unlabeled(prepared, errors)
+        prepared = [p for p in prepared if p['label'] is not None]
+
+        created_items = []
+        chunk_size = max(int(chunk_size), 1)
+        for start in range(0, len(prepared), chunk_size):
+            chunk = prepared[start:start + chunk_size]
+            try:
+                written = OfflineSyncService._write(chunk)
+                db.session.commit()
+                created_items.extend(written)
+                StressHistoryStats.record_insert([(item['timestamp'], item['label']) for item in chunk])
+            except Exception:
+                db.session.rollback()
+                # Isolate the failing record(s): one transaction per record
+                for item in chunk:
+                    try:
+                        written = OfflineSyncService._write([item])
+                        db.session.commit()
+                        created_items.extend(written)
+                        StressHistoryStats.record_insert([(item['timestamp'], item['label'])])
+                    except Exception as item_error:
+                        db.session.rollback()
+                        errors.append({'index': item['index'], 'error': str(item_error)})
+
+        errors.sort(key=lambda e: e['index'])
+        return {'data': created_items, 'errors': errors}
+
+    @staticmethod
+    def _prepare(device_id: str, records: List[Dict[str, Any]], errors: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Parse and validate every record into rows ready for bulk insert."""
+        prepared = []
+        now = datetime.now(JAKARTA_TZ)
+
+        for idx, record in enumerate(records):
+            try:
+                missing = [key for key in ('hr', 'temp', 'eda') if key not in record]
+                if missing:
+                    errors.append({'index': idx, 'error': f"Missing fields: {', '.join(missing)}"})
+                    continue
+
+                hr = float(record['hr'])
+                temp = float(record['temp'])
+                eda = float(record['eda'])
+
+                duration = record.get('duration', 60)
+                average_window = record.get('average_window', 10)
+                local_millis = record.get('local_millis')
+                prediction_source = record.get(
+                    'prediction_source',
+                    'esp32_offline' if 'label' in record else 'server_model'
+                )
+                session_id = str(uuid.uuid4())
+
+                # Keep every reading from the ESP32 readings array;
+                # without one, store the final averaged reading.
+                reading_rows = []
+                readings = record.get('readings', [])
+                if isinstance(readings, list) and len(readings) > 0:
+                    for reading_idx, reading in enumerate(readings):
+                        try:
+                            reading_rows.append({
+                                'session_id': session_id,
+                                'timestamp': now,
+                                'hr': float(reading.get('hr', hr)),
+                                'temp': float(reading.get('temp', temp)),
+                                'eda': float(reading.get('eda', eda)),
+                                'created_at': now
+                            })
+                        except Exception as reading_error:
+                            errors.append({'index': idx, 'reading_index': reading_idx, 'error': str(reading_error)})
+                else:
+                    reading_rows.append({
+                        'session_id': session_id, 'timestamp': now,
+                        'hr': hr, 'temp': temp, 'eda': eda, 'created_at': now
+                    })
+
+                prepared.append({
+                    'index': idx,
+                    'features': (hr, temp, eda),
+                    'label': OfflineSyncService._normalize_label(record['label']) if 'label' in record else None,
+                    'confidence': 1.0,
+                    'notes': (
+                        f'prediction_source={prediction_source}; '
+                        f'device_id={device_id}; '
+                        f'offline_sync=true; '
+                        f'duration={duration}s; '
+                        f'average_window={average_window}s; '
+                        f'local_millis={local_millis}'
+                    ),
+                    'session': {
+                        'id': session_id,
+                        'name': f'Offline ESP32 Session - {device_id}',
+                        'created_at': now,
+                        'device_id': device_id,
+                        'notes': (
+                            f'Offline synced data from {device_id}; '
+                            f'duration={duration}s; '
+                            f'average_window={average_window}s; '
+                            f'local_millis={local_millis}'
+                        )
+                    },
+                    'readings': reading_rows,
+                    'timestamp': now
+                })
+            except Exception as item_error:
+                errors.append({'index': idx, 'error': str(item_error)})
+
+        return prepared
+
+    @staticmethod
+    def _predict_unlabeled(prepared: List[Dict[str, Any]], errors: List[Dict[str, Any]]) -> None:
+        """Score records sent without an on-device label, all in a single model call."""
+        unlabeled = [p for p in prepared if p['label'] is None]
+        if not unlabeled:
+            return
+
+        try:
+            result = StressModelService.predict_batch(np.array([p['features'] for p in unlabeled], dtype=float))
+        except Exception as predict_error:
+            for item in unlabeled:
+                errors.append({'index': item['index'], 'error': str(predict_error)})
+            return
+
+        for pos, item in enumerate(unlabeled):
+            item['label'] = result['labels'][pos]
+            item['confidence'] = float(result['confidences'][pos])
+            item['model_version'] = result['version']
+
+    @staticmethod
+    def _write(chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Bulk insert sessions, readings and histories for a chunk. Does not commit."""
+        _bulk_insert(MeasurementSession, [item['session'] for item in chunk])
+
+        reading_rows = [row for item in chunk for row in item['readings']]
+        reading_ids = iter(_bulk_insert(SensorReading, reading_rows))
+        rollups.record_readings(reading_rows)
+
+        history_rows = []
+        for item in chunk:
+            hr, temp, eda = item['features']
+            history_rows.append({
+                'session_id': item['session']['id'],
+                'timestamp': item['timestamp'],
+                'hr': hr,
+                'temp': temp,
+                'eda': eda,
+                'label': item['label'],
+                'confidence_level': item['confidence'],
+                'model_version': item.get('model_version'),
+                'notes': item['notes'],
+                'created_at': item['timestamp']
+            })
+        history_ids = _bulk_insert(HistoryStress, history_rows)
+        rollups.record_history(history_rows)
+
+        created = []
+        for item, history_id in zip(chunk, history_ids):
+            ids = [next(reading_ids) for _ in item['readings']]
+            created.append({
+                'index': item['index'],
+                'session_id': item['session']['id'],
+                'sensor_reading_id': ids[0] if ids else None,
+                'sensor_reading_count': len(ids),
+                'history_id': history_id,
+                'label': item['label']
+            })
+        return created
+
+
 class UserService:
     """Service class for handling user authentication and CRUD operations."""
 
@@ -0,0 +1,113 @@
+"""
+SQLite storage profile applied when the engine is created.
+
+Every new DBAPI connection gets the PRAGMAs below, and a file database gets a
+sized connection pool. The defaults favour the app's workload, many small
+commits plus concurrent readers:
+
+- journal_mode=WAL: readers no longer block on the writer and vice versa
+- synchronous=NORMAL: with WAL, durable against crashes of the app (not the OS)
+  and no fsync per commit
+- busy_timeout: wait for a lock instead of failing with "database is locked"
+- foreign_keys=ON: enforce the schema's foreign keys, including ON DELETE CASCADE
+- cache_size / mmap_size: keep hot pages in memory, read through the page cache
+
+Set SQLITE_JOURNAL_MODE=DELETE and SQLITE_SYNCHRONOUS=FULL for SQLite's stock
+behaviour. scripts/bench_sqlite.py compares the two.
+"""
+
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+# PRAGMA name -> config key, in the order they are applied
+SQLITE_PRAGMAS = {
+    'journal_mode': 'SQLITE_JOURNAL_MODE',
+    'synchronous': 'SQLITE_SYNCHRONOUS',
+    'busy_timeout': 'SQLITE_BUSY_TIMEOUT_MS',
+    'foreign_keys': 'SQLITE_FOREIGN_KEYS',
+    'cache_size': 'SQLITE_CACHE_SIZE',
+    'mmap_size': 'SQLITE_MMAP_SIZE',
+}
+
+JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+SWITCHES = {'ON': 'ON', 'OFF': 'OFF', 'TRUE': 'ON', 'FALSE': 'OFF', '1': 'ON', '0': 'OFF'}
+
+
+def is_sqlite_file(uri: str) -> bool:
+    """Whether `uri` points at an on-disk SQLite database (not an in-memory one)."""
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite':
+        return False
+    return bool(url.database) and url.database != ':memory:' and url.query.get('mode') != 'memory'
+
+
+def sqlite_pragmas(config) -> Dict[str, Any]:
+    """PRAGMA values from the app config, validated."""
+    pragmas = {name: config.get(key) for name, key in SQLITE_PRAGMAS.items() if config.get(key) is not None}
+    for name, allowed in (('journal_mode', JOURNAL_MODES), ('synchronous', SYNCHRONOUS_MODES)):
+        if name in pragmas:
+            pragmas[name] = str(pragmas[name]).upper()
+            if pragmas[name] not in allowed:
+                raise ValueError(f"Invalid SQLite {name} {pragmas[name]!r}, expected one of {allowed}")
+    if 'foreign_keys' in pragmas:
+        value = str(pragmas['foreign_keys']).upper()
+        if value not in SWITCHES:
+            raise ValueError(f"Invalid SQLite foreign_keys {pragmas['foreign_keys']!r}, expected ON or OFF")
+        pragmas['foreign_keys'] = SWITCHES[value]
+    for name in ('busy_timeout', 'cache_size', 'mmap_size'):
+        if name in pragmas:
+            pragmas[name] = int(pragmas[name])
+    return pragmas
+
+
+def sqlite_engine_options(config) -> Dict[str, Any]:
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database: a sized pool for SQLite files, else nothing.
+
+    In-memory databases keep Flask-SQLAlchemy's single shared connection.
+    """
+    if not is_sqlite_file(config['SQLALCHEMY_DATABASE_URI']):
+        return {}
+    return {
+        'pool_size': int(config['SQLITE_POOL_SIZE']),
+        'max_overflow': int(config['SQLITE_MAX_OVERFLOW']),
+        'pool_timeout': float(config['SQLITE_POOL_TIMEOUT']),
+        # pysqlite's own lock wait, in seconds; busy_timeout below sets the same in SQLite
+        'connect_args': {'timeout': int(config['SQLITE_BUSY_TIMEOUT_MS']) / 1000.0},
+    }
+
+
+def apply_sqlite_profile(engine: Engine, pragmas: Dict[str, Any]) -> None:
+    """Run `pragmas` on every new connection of `engine`."""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+def sqlite_profile(engine: Engine) -> Dict[str, Any]:
+    """PRAGMA values and pool status as the database reports them, for /api/system/status."""
+    if engine.dialect.name != 'sqlite':
+        return {'dialect': engine.dialect.name}
+    with engine.connect() as conn:
+        pragmas = {name: conn.exec_driver_sql(f'PRAGMA {name}').scalar() for name in SQLITE_PRAGMAS}
+    return {'dialect': 'sqlite', 'pragmas': pragmas, 'pool': engine.pool.status()}
+
+
+def init_storage(app, db) -> None:
+    """Apply the SQLite profile to the engine db.init_app() created for `app`."""
+    with app.app_context():
+        apply_sqlite_profile(db.engine, sqlite_pragmas(app.config))
+
+
+__all__ = ['apply_sqlite_profile', 'init_storage', 'is_sqlite_file', 'sqlite_engine_options', 'sqlite_pragmas',
+           'sqlite_profile']
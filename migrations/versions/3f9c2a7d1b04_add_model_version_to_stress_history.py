@@ -0,0 +1,97 @@
+"""baseline schema, and model_version on stress_history
+
+Revision ID: 3f9c2a7d1b04
+Revises: 
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d1b04'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_baseline(existing):
+    """Tables as create_tables() made them before migrations existed; ones already there are kept."""
+    if 'app_info' not in existing:
+        op.create_table(
+            'app_info',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('app_name', sa.String(length=255), nullable=False),
+            sa.Column('app_version', sa.String(length=64), nullable=True),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('owner', sa.String(length=128), nullable=True),
+            sa.Column('contact', sa.String(length=256), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'measurement_sessions' not in existing:
+        op.create_table(
+            'measurement_sessions',
+            sa.Column('id', sa.String(length=36), nullable=False),
+            sa.Column('name', sa.String(length=255), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'stress_history' not in existing:
+        op.create_table(
+            'stress_history',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('session_id', sa.String(length=36), nullable=True),
+            sa.Column('timestamp', sa.DateTime(), nullable=False),
+            sa.Column('hr', sa.Float(), nullable=True),
+            sa.Column('temp', sa.Float(), nullable=True),
+            sa.Column('eda', sa.Float(), nullable=True),
+            sa.Column('label', sa.String(length=128), nullable=True),
+            sa.Column('confidence_level', sa.Float(), nullable=True),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['session_id'], ['measurement_sessions.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'sensor_readings' not in existing:
+        op.create_table(
+            'sensor_readings',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('session_id', sa.String(length=36), nullable=False),
+            sa.Column('timestamp', sa.DateTime(), nullable=False),
+            sa.Column('hr', sa.Float(), nullable=False),
+            sa.Column('temp', sa.Float(), nullable=False),
+            sa.Column('eda', sa.Float(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['session_id'], ['measurement_sessions.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'users' not in existing:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.String(length=36), nullable=False),
+            sa.Column('username', sa.String(length=80), nullable=False),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('password_hash', sa.String(length=255), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_users_username', 'users', ['username'], unique=True)
+        op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+
+def upgrade():
+    # An empty database gets the baseline schema; one made by the old create_tables() keeps its tables
+    _create_baseline(set(sa.inspect(op.get_bind()).get_table_names()))
+
+    with op.batch_alter_table('stress_history', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('model_version', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('stress_history', schema=None) as batch_op:
+        batch_op.drop_column('model_version')
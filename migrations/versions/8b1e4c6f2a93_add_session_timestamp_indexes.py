@@ -0,0 +1,35 @@
+"""add session/timestamp indexes to stress_history and sensor_readings
+
+Revision ID: 8b1e4c6f2a93
+Revises: 3f9c2a7d1b04
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1e4c6f2a93'
+down_revision = '3f9c2a7d1b04'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_stress_history_session_id_timestamp', 'stress_history', ['session_id', 'timestamp']),
+    ('ix_stress_history_timestamp', 'stress_history', ['timestamp']),
+    ('ix_sensor_readings_session_id_timestamp', 'sensor_readings', ['session_id', 'timestamp']),
+    ('ix_sensor_readings_timestamp', 'sensor_readings', ['timestamp']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+    # refresh planner statistics so the new indexes are picked up right away
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('ANALYZE')
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,58 @@
+"""add measurement_sessions.device_id and the sensor/stress rollup tables
+
+Revision ID: c4d7e2a9f610
+Revises: 8b1e4c6f2a93
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d7e2a9f610'
+down_revision = '8b1e4c6f2a93'
+branch_labels = None
+depends_on = None
+
+KEY = ['scope', 'scope_id', 'resolution', 'bucket_start']
+
+
+def _key_columns():
+    return [
+        sa.Column('scope', sa.String(length=16), nullable=False),
+        sa.Column('scope_id', sa.String(length=64), nullable=False),
+        sa.Column('resolution', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    ]
+
+
+def upgrade():
+    with op.batch_alter_table('measurement_sessions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('device_id', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_measurement_sessions_device_id'), ['device_id'], unique=False)
+
+    op.create_table(
+        'sensor_reading_rollups',
+        *_key_columns(),
+        sa.Column('count', sa.Integer(), nullable=False),
+        *[sa.Column(f'{name}_{stat}', sa.Float(), nullable=False)
+          for name in ('hr', 'temp', 'eda') for stat in ('sum', 'min', 'max')],
+        sa.PrimaryKeyConstraint(*KEY)
+    )
+    op.create_table(
+        'stress_history_rollups',
+        *_key_columns(),
+        sa.Column('label', sa.String(length=128), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint(*KEY, 'label')
+    )
+    # existing rows are rolled up with `flask rollups backfill`
+
+
+def downgrade():
+    op.drop_table('stress_history_rollups')
+    op.drop_table('sensor_reading_rollups')
+    with op.batch_alter_table('measurement_sessions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_measurement_sessions_device_id'))
+        batch_op.drop_column('device_id')
@@ -0,0 +1,165 @@
+"""
+Insert and read throughput of the SQLite storage profile versus SQLite's stock settings.
+
+    python scripts/bench_sqlite.py [--rows 2000] [--readers 4] [--seconds 3] [--purge-rows 200000]
+
+Each profile runs against a fresh database file through the app's own
+services:
+
+- insert: StressHistoryService.create, one commit per row (the live write path)
+- mixed: one writer doing the same while `--readers` threads read the newest page of a session
+- purge: MeasurementSessionService.delete_many over 10 sessions holding `--purge-rows` readings
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import MeasurementSession, SensorReading  # noqa: E402
+from app.service import MeasurementSessionService, StressHistoryService  # noqa: E402
+from app.storage import sqlite_profile  # noqa: E402
+
+PROFILES = {
+    # SQLite defaults: rollback journal, fsync on every commit, 2 MB cache, no mmap
+    'stock': {
+        'SQLITE_JOURNAL_MODE': 'DELETE',
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_CACHE_SIZE': -2000,
+        'SQLITE_MMAP_SIZE': 0,
+    },
+    # create_app() defaults
+    'tuned': {},
+}
+
+
+def make_app(path, overrides):
+    config = dict(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI='sqlite:///' + path,
+        MODEL_EAGER_LOAD=False,
+        CPU_POOL='inline',
+        **overrides
+    )
+    app = create_app(type('BenchConfig', (), config))
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def history_row(session_id, i):
+    return {'session_id': session_id, 'hr': 60.0 + i % 60, 'temp': 36.5, 'eda': 2.0, 'label': 'Normal',
+            'confidence_level': 0.9}
+
+
+def bench_insert(app, rows):
+    with app.app_context():
+        session_id = MeasurementSessionService.create({'notes': 'bench insert'})['id']
+        started = time.perf_counter()
+        for i in range(rows):
+            StressHistoryService.create(history_row(session_id, i))
+        return rows / (time.perf_counter() - started), session_id
+
+
+def bench_mixed(app, session_id, readers, seconds):
+    stop = threading.Event()
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def reader():
+        with app.app_context():
+            while not stop.is_set():
+                try:
+                    StressHistoryService.get_page(limit=100, session_id=session_id)
+                    key = 'reads'
+                except Exception:
+                    key = 'errors'
+                with lock:
+                    counts[key] += 1
+            db.session.remove()
+
+    def writer():
+        with app.app_context():
+            i = 0
+            while not stop.is_set():
+                try:
+                    StressHistoryService.create(history_row(session_id, i))
+                    key = 'writes'
+                except Exception:
+                    db.session.rollback()
+                    key = 'errors'
+                with lock:
+                    counts[key] += 1
+                i += 1
+            db.session.remove()
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)] + [threading.Thread(target=writer)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return {key: value / seconds for key, value in counts.items()}
+
+
+def bench_purge(app, rows, sessions=10):
+    base = datetime(2025, 1, 1)
+    with app.app_context():
+        ids = [f'purge-{n}' for n in range(sessions)]
+        db.session.execute(insert(MeasurementSession), [{'id': i, 'created_at': base} for i in ids])
+        for session_id in ids:
+            db.session.execute(insert(SensorReading), [
+                {'session_id': session_id, 'timestamp': base + timedelta(seconds=i), 'hr': 70.0, 'temp': 36.5,
+                 'eda': 2.0} for i in range(rows // sessions)
+            ])
+        db.session.commit()
+        started = time.perf_counter()
+        deleted = MeasurementSessionService.delete_many(ids)['sensor_readings']
+        return deleted / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000, help='rows inserted in the insert benchmark')
+    parser.add_argument('--readers', type=int, default=4, help='reader threads in the mixed benchmark')
+    parser.add_argument('--seconds', type=float, default=3.0, help='duration of the mixed benchmark')
+    parser.add_argument('--purge-rows', type=int, default=200000, help='readings deleted in the purge benchmark')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, overrides in PROFILES.items():
+            app = make_app(os.path.join(tmp, f'{name}.sqlite'), overrides)
+            with app.app_context():
+                pragmas = sqlite_profile(db.engine)['pragmas']
+            inserts, session_id = bench_insert(app, args.rows)
+            mixed = bench_mixed(app, session_id, args.readers, args.seconds)
+            purged = bench_purge(app, args.purge_rows)
+            results[name] = (inserts, mixed, purged)
+            print(f"{name}: journal_mode={pragmas['journal_mode']} synchronous={pragmas['synchronous']} "
+                  f"cache_size={pragmas['cache_size']} mmap_size={pragmas['mmap_size']}")
+            with app.app_context():
+                db.session.remove()
+                db.engine.dispose()
+
+    print()
+    print(f"{'profile':<8} {'insert rows/s':>14} {'mixed writes/s':>15} {'mixed reads/s':>14} {'errors/s':>9} "
+          f"{'purge rows/s':>13}")
+    for name, (inserts, mixed, purged) in results.items():
+        print(f"{name:<8} {inserts:>14.0f} {mixed['writes']:>15.0f} {mixed['reads']:>14.0f} {mixed['errors']:>9.1f} "
+              f"{purged:>13.0f}")
+    if 'stock' in results and 'tuned' in results:
+        print(f"\ninsert speed-up: {results['tuned'][0] / results['stock'][0]:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app, db
+from app import service
+from app.models import HistoryStress, MeasurementSession, SensorReading
+from app.service import MeasurementSessionService, OfflineSyncService, SensorReadingService
+
+
+class TestConfig:
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_create_many_returns_ids_and_reports_bad_indexes(app):
+    session_id = MeasurementSessionService.create({'notes': 'bulk'})['id']
+    readings = [
+        {'hr': 70, 'temp': 36.5, 'eda': 0.4},
+        {'hr': 71, 'temp': 36.6},
+        {'hr': 'abc', 'temp': 36.6, 'eda': 0.4},
+        {'hr': 72, 'temp': 36.7, 'eda': 0.5},
+    ]
+
+    created, errors = SensorReadingService.create_many(session_id, readings)
+
+    assert [e['index'] for e in errors] == [1, 2]
+    assert errors[0]['error'] == 'Missing fields: eda'
+    assert [r['hr'] for r in created] == [70.0, 72.0]
+
+    stored = SensorReading.query.filter_by(session_id=session_id).order_by(SensorReading.id).all()
+    assert [r.id for r in stored] == [r['id'] for r in created]
+
+
+def test_bulk_endpoint_handles_large_uploads(client):
+    session_id = client.post('/api/sessions', json={'notes': 'bulk'}).get_json()['data']['id']
+    readings = [{'hr': 60 + i % 40, 'temp': 36.0, 'eda': 0.3} for i in range(5000)]
+
+    resp = client.post(f'/api/sessions/{session_id}/sensor-readings/bulk', json={'readings': readings})
+    body = resp.get_json()
+
+    assert resp.status_code == 201
+    assert body['created_count'] == 5000
+    assert body['error_count'] == 0
+    assert SensorReading.query.filter_by(session_id=session_id).count() == 5000
+
+
+def test_bulk_endpoint_rejects_all_invalid(client):
+    resp = client.post('/api/sessions/abc/sensor-readings/bulk', json={'readings': [{'hr': 1}]})
+    body = resp.get_json()
+
+    assert resp.status_code == 400
+    assert body['created_count'] == 0
+    assert body['errors'][0]['index'] == 0
+
+
+def test_offline_sync_writes_records_in_chunks(client, app):
+    app.config['OFFLINE_SYNC_CHUNK_SIZE'] = 2
+    records = [
+        {'hr': 80, 'temp': 36.5, 'eda': 0.4, 'label': 'high', 'readings': [
+            {'hr': 81, 'temp': 36.5, 'eda': 0.4},
+            {'hr': 'x'},
+            {'hr': 83, 'temp': 36.6, 'eda': 0.5},
+        ]},
+        {'hr': 70, 'temp': 36.2, 'label': 'normal'},
+        {'hr': 75, 'temp': 36.3, 'eda': 0.3, 'label': 'medium'},
+        {'hr': 72, 'temp': 36.1, 'eda': 0.2, 'label': 'normal'},
+    ]
+
+    resp = client.post('/api/offline-sync', json={'device_id': 'ESP32_T', 'records': records})
+    body = resp.get_json()
+
+    assert resp.status_code == 201
+    assert [item['index'] for item in body['data']] == [0, 2, 3]
+    assert body['data'][0]['sensor_reading_count'] == 2
+    assert body['data'][0]['label'] == 'High Stress'
+    assert body['data'][1]['label'] == 'Medium Stress'
+    assert [(e['index'], e.get('reading_index')) for e in body['errors']] == [(0, 1), (1, None)]
+
+    assert MeasurementSession.query.count() == 3
+    assert HistoryStress.query.count() == 3
+    assert SensorReading.query.count() == 4
+
+
+def test_offline_sync_isolates_failing_record(app, monkeypatch):
+    real_insert = service._bulk_insert
+
+    def flaky_insert(model, rows):
+        if model is HistoryStress and any(row['hr'] == 999 for row in rows):
+            raise RuntimeError('constraint failed')
+        return real_insert(model, rows)
+
+    monkeypatch.setattr(service, '_bulk_insert', flaky_insert)
+    records = [
+        {'hr': 70, 'temp': 36.2, 'eda': 0.2, 'label': 'normal'},
+        {'hr': 999, 'temp': 36.2, 'eda': 0.2, 'label': 'normal'},
+        {'hr': 71, 'temp': 36.2, 'eda': 0.2, 'label': 'normal'},
+    ]
+
+    result = OfflineSyncService.sync('ESP32_T', records, chunk_size=10)
+
+    assert [item['index'] for item in result['data']] == [0, 2]
+    assert result['errors'] == [{'index': 1, 'error': 'constraint failed'}]
+    # The failed record's session and readings were rolled back with it
+    assert MeasurementSession.query.count() == 2
+    assert SensorReading.query.count() == 2
+
+
+def test_offline_sync_reports_commit_failures_once(app, monkeypatch):
+    in_transaction = []
+    real_write = OfflineSyncService._write
+    real_commit = db.session.commit
+
+    def tracking_write(chunk):
+        in_transaction.extend(item['index'] for item in chunk)
+        return real_write(chunk)
+
+    def flaky_commit():
+        failing = 1 in in_transaction
+        in_transaction.clear()
+        if failing:
+            raise RuntimeError('commit failed')
+        real_commit()
+
+    monkeypatch.setattr(OfflineSyncService, '_write', staticmethod(tracking_write))
+    monkeypatch.setattr(db.session, 'commit', flaky_commit)
+    records = [{'hr': 70 + i, 'temp': 36.2, 'eda': 0.2, 'label': 'normal'} for i in range(3)]
+
+    result = OfflineSyncService.sync('ESP32_T', records, chunk_size=10)
+
+    assert [item['index'] for item in result['data']] == [0, 2]
+    assert result['errors'] == [{'index': 1, 'error': 'commit failed'}]
+    assert MeasurementSession.query.count() == 2
@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.registry import ConnectionRegistry, Debouncer
+
+
+def test_registry_counts_and_device_index():
+    registry = ConnectionRegistry()
+    registry.add('f1', 'frontend')
+    registry.add('f2', 'frontend')
+    registry.add('e1', 'esp32', device_id='ESP32_A')
+    registry.add('e2', 'esp32')
+    registry.bind_device('e2', 'ESP32_A')
+
+    assert registry.stats() == {'frontend_clients': 2, 'esp32_clients': 2, 'total_clients': 4, 'devices': 1}
+    assert sorted(registry.by_device('ESP32_A')) == ['e1', 'e2']
+    assert 'f1' in registry and registry['e1']['device_id'] == 'ESP32_A'
+
+    # re-binding moves the connection to its new device
+    registry.bind_device('e2', 'ESP32_B')
+    assert registry.by_device('ESP32_A') == ['e1']
+    assert registry.by_device('ESP32_B') == ['e2']
+
+    assert registry.remove('e1')['type'] == 'esp32'
+    assert registry.remove('e1') is None
+    registry.remove('f1')
+    assert registry.stats() == {'frontend_clients': 1, 'esp32_clients': 1, 'total_clients': 2, 'devices': 1}
+    assert registry.by_device('ESP32_A') == []
+
+
+def test_registry_readd_replaces_connection():
+    registry = ConnectionRegistry()
+    registry.add('c1', 'esp32', device_id='ESP32_A')
+    registry.add('c1', 'frontend')
+
+    assert registry.count('esp32') == 0
+    assert registry.count('frontend') == 1
+    assert registry.by_device('ESP32_A') == []
+
+
+def test_debouncer_folds_burst_into_one_call():
+    tasks = []
+    calls = []
+    debouncer = Debouncer(lambda: calls.append(1), start_task=lambda fn, *args: tasks.append((fn, args)),
+                          sleep=lambda delay: None)
+
+    for _ in range(1000):
+        debouncer.trigger(0.25)
+    assert len(tasks) == 1
+
+    fn, args = tasks.pop()
+    fn(*args)
+    assert calls == [1]
+
+    # the next change after the emit schedules a new one
+    debouncer.trigger(0.25)
+    assert len(tasks) == 1
+    assert debouncer.stats == {'triggers': 1001, 'calls': 1}
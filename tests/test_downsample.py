@@ -0,0 +1,150 @@
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app, db
+from app.downsample import aggregate, auto_resolution, lttb, parse_resolution
+from app.models import MeasurementSession, SensorReading
+
+
+class TestConfig:
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    MODEL_EAGER_LOAD = False
+
+
+def _reference_lttb(x, y, threshold):
+    """Straightforward per-bucket LTTB, as in Steinarsson's thesis."""
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    keep, a = [0], 0
+    for i in range(threshold - 2):
+        avg_start = int(np.floor((i + 1) * every)) + 1
+        avg_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x, avg_y = x[avg_start:avg_end].mean(), y[avg_start:avg_end].mean()
+        lo, hi = int(np.floor(i * every)) + 1, int(np.floor((i + 1) * every)) + 1
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        keep.append(best)
+        a = best
+    keep.append(n - 1)
+    return np.array(keep)
+
+
+def test_parse_resolution():
+    assert parse_resolution('1s') == 1
+    assert parse_resolution('10s') == 10
+    assert parse_resolution('1m') == 60
+    assert parse_resolution('2h') == 7200
+    assert parse_resolution('45') == 45
+    for bad in ('0s', 'fast', '1w', '-5'):
+        with pytest.raises(ValueError):
+            parse_resolution(bad)
+    assert auto_resolution(36000, 2000) == 30
+    assert auto_resolution(10, 2000) == 1
+
+
+def test_aggregate_matches_pandas_resample():
+    rng = np.random.default_rng(1)
+    epoch = np.sort(rng.uniform(1_700_000_000, 1_700_003_600, 5000)).round(3)
+    hr = rng.normal(80, 8, 5000)
+
+    result = aggregate(epoch, {'hr': hr}, 60)
+
+    frame = pd.Series(hr, index=pd.to_datetime(epoch, unit='s'))
+    expected = frame.resample('60s').agg(['min', 'max', 'mean', 'count'])
+    expected = expected[expected['count'] > 0]
+    np.testing.assert_array_equal(result['start'], expected.index.astype('int64') // 10 ** 9)
+    np.testing.assert_array_equal(result['count'], expected['count'])
+    np.testing.assert_allclose(result['hr']['min'], expected['min'])
+    np.testing.assert_allclose(result['hr']['max'], expected['max'])
+    np.testing.assert_allclose(result['hr']['mean'], expected['mean'])
+
+    empty = aggregate(np.empty(0), {'hr': np.empty(0)}, 60)
+    assert len(empty['start']) == 0 and len(empty['hr']['mean']) == 0
+
+
+def test_lttb_matches_reference_and_keeps_peaks():
+    rng = np.random.default_rng(2)
+    x = np.arange(10000, dtype=float)
+    y = np.sin(x / 500) + rng.normal(0, 0.05, len(x))
+    y[4321] = 25.0
+
+    keep = lttb(x, y, 500)
+    assert len(keep) == 500 and keep[0] == 0 and keep[-1] == len(x) - 1
+    assert (np.diff(keep) > 0).all()
+    assert 4321 in keep
+    np.testing.assert_array_equal(keep, _reference_lttb(x, y, 500))
+
+    np.testing.assert_array_equal(lttb(x[:10], y[:10], 500), np.arange(10))
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def readings(app):
+    """10 minutes of readings at 2 Hz; HR counts up by one per reading."""
+    base = datetime(2025, 1, 1, 8, 0, 0)
+    db.session.add(MeasurementSession(id='s1', created_at=base))
+    for i in range(1200):
+        db.session.add(SensorReading(session_id='s1', timestamp=base + timedelta(milliseconds=500 * i),
+                                     hr=float(i), temp=36.0 + (i % 2), eda=2.0))
+    db.session.commit()
+
+
+def test_bucket_endpoint(app, readings):
+    client = app.test_client()
+    body = client.get('/api/sessions/s1/sensor-readings/aggregate?resolution=1m').get_json()
+    assert body['success']
+    data = body['data']
+    assert data['mode'] == 'buckets' and data['resolution_seconds'] == 60 and data['readings'] == 1200
+    buckets = data['buckets']
+    assert buckets['timestamp'][:2] == ['2025-01-01T08:00:00+07:00', '2025-01-01T08:01:00+07:00']
+    assert buckets['count'] == [120] * 10
+    assert buckets['hr']['min'][1] == 120 and buckets['hr']['max'][1] == 239
+    assert buckets['hr']['mean'][0] == pytest.approx(59.5)
+    assert buckets['temp']['min'][0] == 36.0 and buckets['temp']['max'][0] == 37.0
+
+    ranged = client.get('/api/sessions/s1/sensor-readings/aggregate?resolution=10s&fields=hr'
+                        '&start=2025-01-01T08:02:00&end=2025-01-01T08:03:00').get_json()['data']
+    assert ranged['readings'] == 120 and ranged['fields'] == ['hr']
+    assert ranged['buckets']['count'] == [20] * 6 and 'temp' not in ranged['buckets']
+
+    auto = client.get('/api/sessions/s1/sensor-readings/aggregate?points=100').get_json()['data']
+    assert auto['resolution_seconds'] == 10 and len(auto['buckets']['count']) == 60
+
+
+def test_lttb_endpoint_and_errors(app, readings):
+    client = app.test_client()
+    data = client.get('/api/sessions/s1/sensor-readings/aggregate?mode=lttb&points=50').get_json()['data']
+    assert data['mode'] == 'lttb'
+    hr = data['series']['hr']
+    assert len(hr['timestamp']) == len(hr['value']) == 50
+    assert hr['value'][0] == 0 and hr['value'][-1] == 1199
+    assert hr['timestamp'][-1] == '2025-01-01T08:09:59.500+07:00'
+
+    app.config['AGGREGATE_MAX_POINTS'] = 500
+    for query in ('resolution=1s', 'points=501', 'points=2', 'mode=fancy', 'fields=hr,spo2', 'points=abc',
+                  'resolution=soon', 'start=yesterday'):
+        resp = client.get('/api/sessions/s1/sensor-readings/aggregate?' + query)
+        assert resp.status_code == 400, query
+
+    empty = client.get('/api/sessions/missing/sensor-readings/aggregate?mode=lttb&points=50').get_json()['data']
+    assert empty['readings'] == 0 and empty['series']['hr']['value'] == []
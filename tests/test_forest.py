@@ -0,0 +1,95 @@
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.forest import FlatForest, load_or_build, verify_folded
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 3))
+    y = np.digitize(X[:, 0] + 0.5 * X[:, 2], [-0.5, 0.7])
+    return X, y
+
+
+@pytest.mark.parametrize('model_class', [RandomForestClassifier, ExtraTreesClassifier])
+def test_flat_forest_matches_sklearn(data, model_class):
+    X, y = data
+    model = model_class(n_estimators=20, random_state=0).fit(X, y)
+    forest = FlatForest.from_sklearn(model)
+
+    probe = np.vstack([X, np.random.default_rng(1).normal(scale=3, size=(200, 3))])
+    np.testing.assert_allclose(forest.predict_proba(probe), model.predict_proba(probe), atol=1e-12)
+    np.testing.assert_array_equal(forest.predict(probe), model.predict(probe))
+    assert forest.predict_proba(np.zeros((0, 3))).shape == (0, 3)
+
+
+def test_rejects_non_forest(data):
+    X, y = data
+    with pytest.raises(TypeError):
+        FlatForest.from_sklearn(LogisticRegression().fit(X, y))
+
+
+def test_load_or_build_maps_and_tracks_source(data, tmp_path):
+    X, y = data
+    path = tmp_path / 'classification_rf_model.pkl'
+    joblib.dump(RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y), path)
+
+    forest = load_or_build(path)
+    assert forest.is_mapped
+    assert isinstance(forest.threshold, np.memmap)
+    assert (tmp_path / 'classification_rf_model.forest' / 'meta.json').exists()
+
+    # a second worker reuses the flat copy without unpickling
+    reused = load_or_build(path, loader=lambda p: pytest.fail('pickle loaded again'))
+    np.testing.assert_array_equal(reused.predict_proba(X), forest.predict_proba(X))
+
+    # replacing the pickle rebuilds the flat copy
+    joblib.dump(RandomForestClassifier(n_estimators=3, random_state=1).fit(X, y), path)
+    assert load_or_build(path).meta['n_trees'] == 3
+
+
+def test_folded_scaler_matches_pipeline_on_raw_rows(data):
+    X, y = data
+    raw = X * [12.0, 0.4, 3.0] + [85.0, 36.5, 6.0]
+    scaler = StandardScaler().fit(raw)
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(scaler.transform(raw), y)
+
+    # input rows carry the model's columns in a different order
+    order = [0, 2, 1]
+    rows = np.empty_like(raw)
+    rows[:, order] = raw
+    fast = FlatForest.from_sklearn(model).fold_scaler(scaler, input_order=order)
+
+    np.testing.assert_allclose(fast.predict_proba(rows), model.predict_proba(scaler.transform(raw)), atol=1e-12)
+    np.testing.assert_allclose(fast.predict_proba(rows[:1]), model.predict_proba(scaler.transform(raw[:1])), atol=1e-12)
+    assert verify_folded(fast, scaler, model) == 512
+
+    # each raw threshold is the last value taking the same branch as the scaled comparison
+    internal = fast.children_left != -1
+    node = np.flatnonzero(internal)[0]
+    col = int(fast.feature[node])
+    feature = order.index(col)
+    for value, goes_left in ((fast.threshold[node], True), (np.nextafter(fast.threshold[node], np.inf), False)):
+        scaled = np.float32((value - scaler.mean_[feature]) / scaler.scale_[feature])
+        assert (scaled <= model.estimators_[0].tree_.threshold[0]) == goes_left
+
+
+def test_fold_rejects_other_scalers_and_saving(data, tmp_path):
+    X, y = data
+    forest = FlatForest.from_sklearn(RandomForestClassifier(n_estimators=3, random_state=0).fit(X, y))
+    with pytest.raises(TypeError):
+        forest.fold_scaler(MinMaxScaler().fit(X))
+
+    fast = forest.fold_scaler(StandardScaler().fit(X))
+    with pytest.raises(ValueError):
+        fast.save(tmp_path / 'folded.forest')
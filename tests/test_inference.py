@@ -0,0 +1,124 @@
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.batching import MicroBatcher
+from app.service import StressModelService
+
+
+@pytest.fixture
+def model_service():
+    """Swap a small trained scaler/forest into StressModelService for the test."""
+    rng = np.random.default_rng(0)
+    X = np.column_stack([
+        rng.uniform(55, 130, 300),   # HR
+        rng.uniform(0.1, 15, 300),   # EDA
+        rng.uniform(31, 38, 300),    # TEMP
+    ])
+    y = np.digitize(X[:, 0], [80, 100])
+    df = pd.DataFrame(X, columns=StressModelService.FEATURE_COLUMNS)
+
+    scaler = StandardScaler().fit(df)
+    model = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0)
+    model.fit(scaler.transform(df), y)
+
+    old = (StressModelService._scaler, StressModelService._model)
+    StressModelService._scaler, StressModelService._model = scaler, model
+    yield StressModelService
+    StressModelService._scaler, StressModelService._model = old
+
+
+def test_predict_batch_matches_single_predictions(model_service):
+    rows = np.array([
+        [70.0, 36.1, 2.0],
+        [92.0, 36.8, 6.5],
+        [120.0, 37.4, 11.0],
+    ])
+
+    batch = model_service.predict_batch(rows)
+    assert batch['labels'].shape == (3,)
+    assert batch['confidences'].shape == (3,)
+
+    for i, (hr, temp, eda) in enumerate(rows):
+        single = model_service.predict(hr, temp, eda)
+        assert single['label'] == batch['labels'][i]
+        assert single['confidence_level'] == pytest.approx(batch['confidences'][i])
+
+
+def test_predict_batch_accepts_list_of_dicts(model_service):
+    samples = [
+        {'hr': 70.0, 'temp': 36.1, 'eda': 2.0},
+        {'hr': 120.0, 'temp': 37.4, 'eda': 11.0},
+    ]
+
+    from_dicts = model_service.predict_batch(samples)
+    from_array = model_service.predict_batch(np.array([[70.0, 36.1, 2.0], [120.0, 37.4, 11.0]]))
+
+    assert list(from_dicts['labels']) == list(from_array['labels'])
+    assert set(from_dicts['labels']) <= {'Normal', 'Medium', 'High Stress'}
+
+
+def test_predict_batch_rejects_wrong_shape(model_service):
+    with pytest.raises(ValueError):
+        model_service.predict_batch(np.zeros((2, 4)))
+
+    empty = model_service.predict_batch(np.zeros((0, 3)))
+    assert len(empty['labels']) == 0
+
+
+def test_micro_batcher_groups_concurrent_submissions():
+    calls = []
+
+    def handler(items):
+        calls.append(len(items))
+        return [x * 2 for x in items]
+
+    batcher = MicroBatcher(handler, window_ms=50, max_batch_size=8)
+    results = {}
+
+    def worker(i):
+        results[i] = batcher.submit(i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {i: i * 2 for i in range(8)}
+    assert sum(calls) == 8
+    assert len(calls) < 8
+
+    metrics = batcher.metrics.snapshot()
+    assert metrics['items'] == 8
+    assert metrics['batches'] == len(calls)
+    assert sum(metrics['batch_size_histogram'].values()) == len(calls)
+
+
+def test_micro_batcher_propagates_handler_errors():
+    def handler(items):
+        raise ValueError('boom')
+
+    batcher = MicroBatcher(handler, window_ms=0)
+    with pytest.raises(ValueError):
+        batcher.submit(1)
+
+
+def test_predict_uses_batcher_when_configured(model_service):
+    model_service.configure_batching(window_ms=1, max_batch_size=4)
+    try:
+        direct = model_service.predict_batch(np.array([[92.0, 36.8, 6.5]]))
+        result = model_service.predict(92.0, 36.8, 6.5)
+        assert result['label'] == direct['labels'][0]
+        assert model_service.batching_metrics()['items'] == 1
+    finally:
+        model_service.configure_batching(window_ms=0)
+    assert model_service.batching_metrics() is None
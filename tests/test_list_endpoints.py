@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app, db
+from app.models import HistoryStress, MeasurementSession, SensorReading
+
+
+class TestConfig:
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def history(app):
+    """25 history rows over two sessions; rows 10 and 11 share a timestamp."""
+    base = datetime(2025, 1, 1, 8, 0, 0)
+    db.session.add_all([
+        MeasurementSession(id='s1', created_at=base),
+        MeasurementSession(id='s2', created_at=base + timedelta(hours=1)),
+    ])
+    for i in range(25):
+        ts = base + timedelta(minutes=i if i != 11 else 10)
+        db.session.add(HistoryStress(session_id='s1' if i % 2 else 's2', timestamp=ts,
+                                     hr=70 + i, temp=36.5, eda=0.4, label='Normal'))
+    db.session.commit()
+
+
+def test_stress_history_pages_cover_table_once(client, history):
+    seen = []
+    cursor = None
+    while True:
+        url = '/api/stress-history?limit=7' + (f'&after={cursor}' if cursor else '')
+        body = client.get(url).get_json()
+        seen.extend(item['id'] for item in body['data'])
+        cursor = body['pagination']['next_cursor']
+        if not cursor:
+            break
+
+    assert sorted(seen) == list(range(1, 26))
+    assert len(seen) == len(set(seen))
+    # newest first, ties broken by id
+    assert seen[0] == 25
+    assert seen.index(12) < seen.index(11)
+
+
+def test_before_cursor_walks_back(client, history):
+    first = client.get('/api/stress-history?limit=5').get_json()
+    second = client.get(f"/api/stress-history?limit=5&after={first['pagination']['next_cursor']}").get_json()
+    back = client.get(f"/api/stress-history?limit=5&before={second['pagination']['prev_cursor']}").get_json()
+
+    assert [i['id'] for i in back['data']] == [i['id'] for i in first['data']]
+    assert back['pagination']['prev_cursor'] is None
+
+
+def test_filters_are_applied(client, history):
+    body = client.get('/api/stress-history?session_id=s1&start=2025-01-01T08:10:00&end=2025-01-01T08:20:00&limit=100').get_json()
+    ids = [i['id'] for i in body['data']]
+
+    assert ids
+    assert all(i['session_id'] == 's1' for i in body['data'])
+    assert all('08:10' <= i['timestamp'][11:16] < '08:20' for i in body['data'])
+
+
+def test_invalid_cursor_is_rejected(client, history):
+    resp = client.get('/api/sensor-readings?after=not-a-cursor')
+    assert resp.status_code == 400
+
+    resp = client.get('/api/sessions?limit=0')
+    assert resp.status_code == 400
+
+
+def test_sessions_are_paginated(client, history):
+    body = client.get('/api/sessions?limit=1').get_json()
+    assert [s['id'] for s in body['data']] == ['s2']
+    assert body['pagination']['has_more'] is True
+
+    body = client.get(f"/api/sessions?limit=1&after={body['pagination']['next_cursor']}").get_json()
+    assert [s['id'] for s in body['data']] == ['s1']
+    assert body['pagination']['next_cursor'] is None
+
+
+@pytest.fixture
+def readings(app):
+    base = datetime(2025, 1, 1, 8, 0, 0)
+    db.session.add(MeasurementSession(id='s1', created_at=base))
+    for i in range(1200):
+        db.session.add(SensorReading(session_id='s1', timestamp=base + timedelta(seconds=i),
+                                     hr=60 + i % 30, temp=36.5, eda=0.4))
+    db.session.commit()
+
+
+def test_export_ndjson_streams_all_rows(client, readings):
+    resp = client.get('/api/sessions/s1/sensor-readings?format=ndjson')
+
+    assert resp.mimetype == 'application/x-ndjson'
+    assert resp.is_streamed
+    lines = resp.get_data(as_text=True).splitlines()
+    assert len(lines) == 1200
+    first = json.loads(lines[0])
+    assert first['hr'] == 60 and first['session_id'] == 's1'
+
+
+def test_export_csv_via_accept_header(client, readings):
+    resp = client.get('/api/sessions/s1/sensor-readings', headers={'Accept': 'text/csv'})
+
+    assert resp.mimetype == 'text/csv'
+    rows = list(csv.reader(io.StringIO(resp.get_data(as_text=True))))
+    assert rows[0] == ['id', 'session_id', 'timestamp', 'hr', 'temp', 'eda', 'created_at']
+    assert len(rows) == 1201
+
+
+def test_export_defaults_to_json(client, readings):
+    body = client.get('/api/sessions/s1/sensor-readings', headers={'Accept': '*/*'}).get_json()
+    assert len(body['data']) == 1200
+
+    assert client.get('/api/sessions/s1/sensor-readings?format=xml').status_code == 400
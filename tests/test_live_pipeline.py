@@ -0,0 +1,351 @@
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app, db, socketio
+from app.live import (
+    PACKED_SAMPLE_DTYPE, LiveBroadcastCoalescer, LiveInferenceStage, LiveReadingBuffer, decode_packed_samples
+)
+from app.models import MeasurementSession, SensorReading
+
+JAKARTA_TZ = timezone(timedelta(hours=7))
+
+
+class TestConfig:
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _sample(i=0):
+    return datetime.now(JAKARTA_TZ), 70.0 + i, 36.5, 0.4
+
+
+def test_buffer_flushes_in_bulk_and_creates_device_session(app):
+    started = []
+    buffer = LiveReadingBuffer(app, batch_size=100, start_task=lambda fn: started.append(fn))
+
+    for i in range(250):
+        assert buffer.add('ESP32_A', None, *_sample(i))
+    assert buffer.pending == 250
+    assert len(started) == 1
+    assert SensorReading.query.count() == 0
+
+    assert buffer.flush() == 250
+    assert buffer.pending == 0
+    session = MeasurementSession.query.one()
+    assert session.name == 'Live ESP32 Session - ESP32_A'
+    assert SensorReading.query.filter_by(session_id=session.id).count() == 250
+
+    # later readings from the same device reuse its session
+    buffer.add('ESP32_A', None, *_sample())
+    buffer.close()
+    assert MeasurementSession.query.count() == 1
+    assert SensorReading.query.count() == 251
+
+
+def test_buffer_applies_backpressure(app):
+    buffer = LiveReadingBuffer(app, max_pending=3, start_task=lambda fn: None)
+
+    assert all(buffer.add('ESP32_A', None, *_sample()) for _ in range(3))
+    assert buffer.add('ESP32_A', None, *_sample()) is False
+    assert buffer.snapshot()['rejected'] == 1
+
+    buffer.flush()
+    assert buffer.add('ESP32_A', None, *_sample()) is True
+
+
+def test_buffer_keeps_other_devices_when_a_session_cannot_be_created(app, monkeypatch):
+    from app.service import MeasurementSessionService, SensorReadingService
+
+    buffer = LiveReadingBuffer(app, start_task=lambda fn: None)
+    real_create = MeasurementSessionService.create
+    real_insert = SensorReadingService.insert_many
+
+    def flaky_create(data=None):
+        if data and data.get('device_id') == 'ESP32_BAD':
+            raise RuntimeError('disk full')
+        return real_create(data)
+
+    in_flight = []
+
+    def observed_insert(rows):
+        in_flight.append(buffer.pending)
+        return real_insert(rows)
+
+    monkeypatch.setattr(MeasurementSessionService, 'create', staticmethod(flaky_create))
+    monkeypatch.setattr(SensorReadingService, 'insert_many', staticmethod(observed_insert))
+    for i in range(3):
+        buffer.add('ESP32_A', None, *_sample(i))
+        buffer.add('ESP32_BAD', None, *_sample(i))
+        buffer.add('ESP32_C', 's1', *_sample(i))
+
+    assert buffer.flush() == 6
+    # readings being written still count against max_pending
+    assert in_flight == [9]
+    assert buffer.pending == 0
+    assert buffer.snapshot()['failed'] == 3
+    assert SensorReading.query.count() == 6
+
+
+def test_buffer_recreates_a_deleted_device_session(app):
+    from app.service import MeasurementSessionService
+
+    buffer = LiveReadingBuffer(app, start_task=lambda fn: None)
+    buffer.add('ESP32_A', None, *_sample())
+    assert buffer.flush() == 1
+    old_session = SensorReading.query.one().session_id
+
+    # the cached live session is deleted through the API while the device keeps streaming
+    MeasurementSessionService.delete_many([old_session])
+    for i in range(3):
+        buffer.add('ESP32_A', None, *_sample(i))
+    assert buffer.flush() == 3
+
+    assert buffer.snapshot()['failed'] == 0
+    new_session = db.session.get(MeasurementSession, SensorReading.query.first().session_id)
+    assert new_session.id != old_session and new_session.device_id == 'ESP32_A'
+    assert SensorReading.query.count() == 3
+
+
+def test_background_flush_writes_off_the_hub(tmp_path, monkeypatch):
+    import eventlet
+    from app.service import SensorReadingService
+
+    class FileConfig(TestConfig):
+        # tpool threads need a database they can share; an in-memory one is per thread
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'live.db'}"
+
+    app = create_app(FileConfig)
+    with app.app_context():
+        db.create_all()
+    buffer = LiveReadingBuffer(app, start_task=lambda fn: None)
+    for i in range(3):
+        buffer.add('ESP32_A', 's1', *_sample(i))
+
+    insert_many = SensorReadingService.insert_many
+
+    def slow_insert(rows):
+        time.sleep(0.2)
+        return insert_many(rows)
+
+    monkeypatch.setattr(SensorReadingService, 'insert_many', staticmethod(slow_insert))
+    ticks = []
+
+    def ticker():
+        for _ in range(5):
+            ticks.append(None)
+            eventlet.sleep(0.01)
+
+    greenthread = eventlet.spawn(ticker)
+    buffer._work()
+    # other greenthreads kept running while the flush was writing
+    assert len(ticks) == 5
+    greenthread.wait()
+    assert buffer.snapshot()['persisted'] == 3 and buffer.pending == 0
+
+
+def test_live_event_is_buffered_when_enabled(app):
+    buffer = LiveReadingBuffer(app, start_task=lambda fn: None)
+    app.extensions['live_buffer'] = buffer
+    client = socketio.test_client(app, query_string='type=esp32')
+
+    client.emit('esp32_live_data', {'hr': 75, 'temp': 36.4, 'eda': 0.5, 'device_id': 'ESP32_B', 'session_id': 's1'})
+
+    acks = [m for m in client.get_received() if m['name'] == 'live_data_received']
+    assert acks[-1]['args'][0]['status'] == 'success'
+    assert buffer.pending == 1
+    client.disconnect()
+
+
+def test_inference_stage_scores_dirty_windows_in_one_batch():
+    calls = []
+    emitted = []
+
+    def predict_batch(features):
+        calls.append(features.copy())
+        return {'labels': ['Normal'] * len(features), 'confidences': [0.9] * len(features)}
+
+    stage = LiveInferenceStage(predict_batch, lambda d, s, p: emitted.append(p),
+                               window_size=3, start_task=lambda fn: None)
+
+    for i in range(5):
+        stage.add('ESP32_A', 's1', *_sample(i))
+        stage.add('ESP32_B', None, *_sample(10))
+    payloads = stage.tick()
+
+    assert len(calls) == 1
+    assert calls[0].shape == (2, 3)
+    by_device = {p['device_id']: p for p in payloads}
+    # window keeps the last 3 samples: hr 72, 73, 74
+    assert by_device['ESP32_A']['hr'] == pytest.approx(73.0)
+    assert by_device['ESP32_A']['window_size'] == 3
+    assert by_device['ESP32_A']['label'] == 'Normal'
+    assert emitted == payloads
+
+    # nothing new since the last tick -> no model call
+    assert stage.tick() == []
+    assert len(calls) == 1
+
+    stage.add('ESP32_B', None, *_sample())
+    assert [p['device_id'] for p in stage.tick()] == ['ESP32_B']
+
+
+def _live_data(client):
+    return [m['args'][0]['device_id'] for m in client.get_received() if m['name'] == 'live_sensor_data']
+
+
+def test_live_data_only_reaches_subscribed_frontends(app):
+    esp32 = socketio.test_client(app, query_string='type=esp32')
+    watcher = socketio.test_client(app, query_string='type=frontend')
+    firehose = socketio.test_client(app, query_string='type=frontend&firehose=1')
+    idle = socketio.test_client(app, query_string='type=frontend')
+
+    watcher.emit('subscribe', {'device_id': 'ESP32_A', 'session_id': 's1'})
+    acks = [m for m in watcher.get_received() if m['name'] == 'subscribed']
+    assert acks[-1]['args'][0]['subscriptions'] == ['device:ESP32_A', 'session:s1']
+    for client in (firehose, idle):
+        client.get_received()
+
+    esp32.emit('esp32_live_data', {'hr': 75, 'temp': 36.4, 'eda': 0.5, 'device_id': 'ESP32_A', 'session_id': 's1'})
+    esp32.emit('esp32_live_data', {'hr': 75, 'temp': 36.4, 'eda': 0.5, 'device_id': 'ESP32_B'})
+
+    # device and session rooms overlap, but the watcher gets the message once
+    assert _live_data(watcher) == ['ESP32_A']
+    assert _live_data(firehose) == ['ESP32_A', 'ESP32_B']
+    assert _live_data(idle) == []
+
+    watcher.emit('unsubscribe', {'device_id': 'ESP32_A', 'session_id': 's1'})
+    esp32.emit('esp32_live_data', {'hr': 75, 'temp': 36.4, 'eda': 0.5, 'device_id': 'ESP32_A', 'session_id': 's1'})
+    assert _live_data(watcher) == []
+
+    esp32.emit('subscribe', {'device_id': 'ESP32_A'})
+    assert [m['name'] for m in esp32.get_received()][-1] == 'error'
+
+    for client in (esp32, watcher, firehose, idle):
+        client.disconnect()
+
+
+def test_coalescer_packs_samples_into_one_frame_per_stream(app):
+    emitted = []
+    coalescer = LiveBroadcastCoalescer(lambda d, s, p: emitted.append((d, s, p)), start_task=lambda fn: None)
+    app.extensions['live_broadcast'] = coalescer
+    esp32 = socketio.test_client(app, query_string='type=esp32')
+    frontend = socketio.test_client(app, query_string='type=frontend&firehose=1')
+
+    for i in range(50):
+        esp32.emit('esp32_live_data', {'hr': 60 + i, 'temp': 36.4, 'eda': 0.5, 'device_id': 'ESP32_A'})
+    esp32.emit('esp32_live_data', {'hr': 90, 'temp': 36.4, 'eda': 0.5, 'device_id': 'ESP32_B', 'session_id': 's1'})
+
+    # nothing is relayed per reading while coalescing
+    assert _live_data(frontend) == []
+    frames = coalescer.flush()
+
+    assert len(frames) == 2
+    assert [(d, s) for d, s, _ in emitted] == [('ESP32_A', None), ('ESP32_B', 's1')]
+    frame = frames[0]
+    assert frame['count'] == 50
+    assert frame['hr'] == [60.0 + i for i in range(50)]
+    assert len(frame['timestamp']) == len(frame['temp']) == len(frame['eda']) == 50
+    assert coalescer.flush() == []
+    assert coalescer.snapshot()['samples'] == 51
+
+    esp32.disconnect()
+    frontend.disconnect()
+
+
+def _packed(n, start=1733800000.0):
+    frame = np.zeros(n, dtype=PACKED_SAMPLE_DTYPE)
+    frame['ts'] = start + np.arange(n)
+    frame['hr'] = 70 + np.arange(n)
+    frame['temp'] = 36.2
+    frame['eda'] = 0.45
+    return frame.tobytes()
+
+
+def test_decode_packed_samples_is_a_view():
+    raw = bytearray(_packed(3))
+    samples = decode_packed_samples(raw)
+
+    assert PACKED_SAMPLE_DTYPE.itemsize == 20
+    assert samples['hr'].tolist() == [70.0, 71.0, 72.0]
+    raw[8:12] = np.float32(99).tobytes()
+    assert samples['hr'][0] == 99.0
+
+    with pytest.raises(ValueError):
+        decode_packed_samples(raw[:-1])
+    with pytest.raises(ValueError):
+        decode_packed_samples(b'')
+
+
+def test_packed_frame_takes_the_live_path(app):
+    buffer = LiveReadingBuffer(app, start_task=lambda fn: None)
+    app.extensions['live_buffer'] = buffer
+    esp32 = socketio.test_client(app, query_string='type=esp32&device_id=ESP32_P')
+    frontend = socketio.test_client(app, query_string='type=frontend')
+    frontend.emit('subscribe', {'device_id': 'ESP32_P'})
+    frontend.get_received()
+
+    frame = bytearray(_packed(100))
+    frame[20 + 8:20 + 12] = np.float32('nan').tobytes()  # second sample has no HR
+    frame[40:48] = np.float64(1e300).tobytes()            # third sample has a garbage timestamp
+    esp32.emit('esp32_live_packed', {'session_id': 's1', 'samples': bytes(frame)})
+
+    ack = [m for m in esp32.get_received() if m['name'] == 'live_data_received'][-1]['args'][0]
+    assert ack == {'status': 'success', 'received': 100, 'rejected': 2, 'persisted': 98}
+    assert buffer.pending == 98
+
+    batch = [m for m in frontend.get_received() if m['name'] == 'live_sensor_batch'][-1]['args'][0]
+    assert batch['device_id'] == 'ESP32_P' and batch['session_id'] == 's1'
+    assert batch['count'] == 98
+    assert batch['hr'][:2] == [70.0, 73.0]
+    assert batch['temp'][0] == 36.2
+    assert batch['timestamp'][:2] == ['2024-12-10T10:06:40.000+07:00', '2024-12-10T10:06:43.000+07:00']
+
+    esp32.emit('esp32_live_packed', b'\x00' * 19)
+    assert [m['name'] for m in esp32.get_received()] == ['error']
+
+    assert buffer.flush() == 98
+    assert SensorReading.query.filter_by(session_id='s1').count() == 98
+    first = SensorReading.query.filter_by(session_id='s1').order_by(SensorReading.timestamp).first()
+    assert first.timestamp.replace(tzinfo=None) == datetime(2024, 12, 10, 10, 6, 40) and first.hr == 70.0
+    esp32.disconnect()
+    frontend.disconnect()
+
+
+def test_background_loop_counts_failures_and_keeps_running():
+    def emit(device_id, session_id, payload):
+        raise RuntimeError('socket closed')
+
+    started = []
+    passes = []
+    coalescer = LiveBroadcastCoalescer(emit, start_task=started.append)
+
+    def sleep(_):
+        passes.append(None)
+        coalescer.add('ESP32_A', None, 1733800000.0, 70.0, 36.5, 0.4)
+        if len(passes) == 3:
+            coalescer.stop()
+
+    coalescer._sleep = sleep
+    coalescer.add('ESP32_A', None, 1733800000.0, 70.0, 36.5, 0.4)
+    assert len(started) == 1
+    started[0]()
+
+    # every pass failed, was counted, and the loop went on until stopped
+    assert coalescer.snapshot()['errors'] == 3
@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sa
+from flask_migrate import upgrade
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app, db
+
+MIGRATIONS = str(Path(__file__).parent.parent / 'migrations')
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig:
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'migrated.db'}"
+        MODEL_EAGER_LOAD = False
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+def test_upgrade_builds_the_model_schema_from_an_empty_database(app):
+    upgrade(directory=MIGRATIONS)
+
+    inspector = sa.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        migrated = {c['name'] for c in inspector.get_columns(table.name)}
+        assert migrated == set(table.columns.keys()), table.name
+        assert {i['name'] for i in inspector.get_indexes(table.name)} == {i.name for i in table.indexes}, table.name
@@ -0,0 +1,232 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from flask_jwt_extended import create_access_token
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app, db
+from app.model_registry import ModelRegistry
+from app.service import StressModelService
+
+
+@pytest.fixture(autouse=True)
+def restore_service():
+    old = (StressModelService._scaler, StressModelService._model, StressModelService._registry, StressModelService._active)
+    yield
+    (StressModelService._scaler, StressModelService._model,
+     StressModelService._registry, StressModelService._active) = old
+
+
+def _write_models(directory, n_estimators=5, seed=0):
+    """Write a small trained scaler/forest pair the way the training notebook saves them."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(np.column_stack([
+        rng.uniform(55, 130, 200),
+        rng.uniform(0.1, 15, 200),
+        rng.uniform(31, 38, 200),
+    ]), columns=StressModelService.FEATURE_COLUMNS)
+    y = np.digitize(df['HR'], [80, 100])
+
+    scaler = StandardScaler().fit(df)
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=4, random_state=seed).fit(scaler.transform(df), y)
+    joblib.dump(scaler, directory / ModelRegistry.SCALER_FILE)
+    joblib.dump(model, directory / ModelRegistry.MODEL_FILE)
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    _write_models(tmp_path)
+    return tmp_path
+
+
+def test_load_validates_and_warms_up(model_dir):
+    registry = ModelRegistry(model_dir, warmup_batch_size=10)
+
+    assert registry.load() is True
+    health = registry.health()
+    assert health['ready'] and health['state'] == 'ready'
+    assert health['artifacts']['model']['size_bytes'] > 0
+    assert health['warmup_ms'] is not None
+    assert len(health['version']) == 12
+    fast_path = health['artifacts']['fast_path']
+    assert fast_path['enabled'] and fast_path['verified_rows'] > 0
+    assert fast_path['single_row_us']['fast'] > 0
+    assert StressModelService._active is registry.active
+
+    result = StressModelService.predict(90.0, 36.8, 6.0)
+    assert result['label'] in StressModelService.LABELS.values()
+    assert result['model_version'] == health['version']
+
+
+def test_failed_load_marks_instance_unready(model_dir, monkeypatch):
+    (model_dir / ModelRegistry.MODEL_FILE).unlink()
+    registry = ModelRegistry(model_dir)
+    StressModelService._registry = registry
+
+    assert registry.load() is False
+    assert registry.state == 'failed'
+    assert 'Model not found' in registry.error
+    assert StressModelService.ready() is False
+
+    # predictions report the startup failure instead of retrying the load per request
+    monkeypatch.setattr(joblib, 'load', lambda path: pytest.fail('lazy load attempted'))
+    with pytest.raises(RuntimeError, match='Model not ready'):
+        StressModelService.predict(90.0, 36.8, 6.0)
+
+
+def test_validation_rejects_mismatched_artifacts(model_dir):
+    scaler = StandardScaler().fit(pd.DataFrame(np.ones((4, 2)), columns=['HR', 'EDA']))
+    joblib.dump(scaler, model_dir / ModelRegistry.SCALER_FILE)
+
+    registry = ModelRegistry(model_dir)
+    assert registry.load() is False
+    assert 'fitted on' in registry.error
+
+
+def _app(model_dir):
+    class TestConfig:
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        MODEL_DIR = str(model_dir)
+
+    return create_app(TestConfig)
+
+
+def test_readiness_endpoint(model_dir):
+    client = _app(model_dir).test_client()
+    resp = client.get('/api/health/ready')
+    assert resp.status_code == 200
+    assert resp.get_json()['model']['artifacts']['scaler']['load_ms'] >= 0
+
+    (model_dir / ModelRegistry.MODEL_FILE).unlink()
+    app = _app(model_dir)
+    client = app.test_client()
+    resp = client.get('/api/health/ready')
+    assert resp.status_code == 503
+    assert resp.get_json()['status'] == 'unready'
+    assert client.get('/api/health/live').status_code == 200
+
+    with app.app_context():
+        db.create_all()
+        resp = client.post('/api/predict-stress', json={'hr': 90, 'temp': 36.8, 'eda': 6.0})
+        assert resp.status_code == 503
+
+
+def test_forest_is_served_memory_mapped(model_dir):
+    registry = ModelRegistry(model_dir, mmap=True)
+    assert registry.load() is True
+
+    info = registry.health()['artifacts']['model']
+    assert info['format'] == 'flat_forest' and info['mapped'] is True
+    assert info['mapped_bytes'] > 0
+    assert registry.health()['memory']
+
+    sklearn_model = joblib.load(model_dir / ModelRegistry.MODEL_FILE)
+    rows = np.array([[70.0, 36.1, 2.0], [92.0, 36.8, 6.5], [120.0, 37.4, 11.0]])
+    mapped = StressModelService.predict_batch(rows)
+    StressModelService._scaler, StressModelService._model = registry.active.scaler, sklearn_model
+    expected = StressModelService.predict_batch(rows)
+    assert list(mapped['labels']) == list(expected['labels'])
+    np.testing.assert_allclose(mapped['confidences'], expected['confidences'])
+
+
+def test_fast_path_can_be_disabled(model_dir):
+    registry = ModelRegistry(model_dir, mmap=False, fast_path=False)
+    assert registry.load() is True
+    assert registry.active.fast is None
+    assert 'fast_path' not in registry.health()['artifacts']
+
+    # without the memory-mapped copy the pickled forest is flattened in memory
+    fast = ModelRegistry(model_dir, mmap=False)
+    assert fast.load() is True
+    assert fast.active.fast is not None
+    rows = np.array([[70.0, 36.1, 2.0], [92.0, 36.8, 6.5], [120.0, 37.4, 11.0]])
+    labels, confidences = StressModelService._predict_with(fast.active.scaler, fast.active.model, rows)
+    result = StressModelService.predict_batch(rows)
+    assert list(result['labels']) == list(labels)
+    np.testing.assert_allclose(result['confidences'], confidences)
+
+
+def test_reload_swaps_to_new_version(model_dir):
+    registry = ModelRegistry(model_dir)
+    assert registry.load() is True
+    first = registry.version
+
+    # unchanged files keep the active version object
+    active = registry.active
+    assert registry.load() is True
+    assert registry.active is active
+
+    _write_models(model_dir, n_estimators=7, seed=1)
+    assert registry.load() is True
+    assert registry.version != first
+    assert StressModelService._active.model.meta['n_trees'] == 7
+    assert StressModelService.predict(90.0, 36.8, 6.0)['model_version'] == registry.version
+    assert [h['status'] for h in registry.health()['history']] == ['active', 'active']
+
+
+def test_failed_reload_keeps_serving_previous_version(model_dir):
+    registry = ModelRegistry(model_dir)
+    registry.load()
+    first = registry.version
+
+    (model_dir / ModelRegistry.MODEL_FILE).write_bytes(b'not a pickle')
+    assert registry.load() is True
+    assert registry.state == 'ready' and registry.version == first
+    assert registry.error is not None
+    assert registry.health()['history'][0]['status'] == 'failed'
+    assert StressModelService.predict(90.0, 36.8, 6.0)['model_version'] == first
+
+
+def test_watcher_reloads_changed_artifacts(model_dir):
+    registry = ModelRegistry(model_dir)
+    registry.load()
+    first = registry.version
+
+    registry.watch(0.02, lambda fn: threading.Thread(target=fn, daemon=True).start())
+    try:
+        _write_models(model_dir, n_estimators=7, seed=1)
+        deadline = time.monotonic() + 10
+        while registry.version == first and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        registry.stop_watching()
+    assert registry.version != first
+
+
+def test_reload_endpoint_and_history_record_version(model_dir):
+    app = _app(model_dir)
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        token = create_access_token(identity='1')
+    headers = {'Authorization': f'Bearer {token}'}
+    registry = app.extensions['model_registry']
+    first = registry.version
+
+    assert client.post('/api/admin/model/reload').status_code == 401
+
+    _write_models(model_dir, n_estimators=7, seed=1)
+    resp = client.post('/api/admin/model/reload?wait=1', headers=headers)
+    body = resp.get_json()
+    assert resp.status_code == 200 and body['reloaded'] is True
+    assert body['model']['version'] == registry.version != first
+
+    resp = client.post('/api/predict-stress', json={'hr': 90, 'temp': 36.8, 'eda': 6.0})
+    assert resp.get_json()['data']['model_version'] == registry.version
+    history = client.get(f"/api/stress-history/{resp.get_json()['history_id']}").get_json()
+    assert history['data']['model_version'] == registry.version
+
+    (model_dir / ModelRegistry.MODEL_FILE).write_bytes(b'not a pickle')
+    resp = client.post('/api/admin/model/reload?wait=1', headers=headers)
+    assert resp.status_code == 500
+    assert resp.get_json()['model']['version'] == registry.version
@@ -0,0 +1,170 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+from werkzeug.security import check_password_hash
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app, offload
+from app.model_registry import ModelRegistry, init_worker
+from app.models import User
+from app.offload import WorkerPool, eventlet_wait
+from app.service import StressModelService
+
+
+def _thread_name():
+    return threading.current_thread().name
+
+
+def _fail():
+    raise ValueError('boom')
+
+
+@pytest.fixture(autouse=True)
+def restore_state(monkeypatch):
+    # start without the pool an earlier create_app() installed, and put it back untouched
+    monkeypatch.setattr(offload, '_pool', None)
+    old = (StressModelService._scaler, StressModelService._model, StressModelService._registry, StressModelService._active)
+    yield
+    (StressModelService._scaler, StressModelService._model,
+     StressModelService._registry, StressModelService._active) = old
+
+
+def test_thread_pool_runs_off_the_caller_and_records_metrics():
+    pool = WorkerPool('thread', size=2)
+    try:
+        assert pool.run(_thread_name).startswith('cpu-pool')
+        with pytest.raises(ValueError, match='boom'):
+            pool.run(_fail)
+        stats = pool.snapshot()
+        assert stats['kind'] == 'thread' and stats['size'] == 2
+        assert stats['submitted'] == 2 and stats['completed'] == 1 and stats['failed'] == 1
+        assert stats['in_flight'] == 0
+        assert stats['queue_ms']['mean'] >= 0 and stats['run_ms']['max'] >= 0
+    finally:
+        pool.shutdown()
+
+
+def test_inline_pool_and_unknown_kind():
+    assert WorkerPool('inline').run(_thread_name) == threading.current_thread().name
+    assert WorkerPool('inline').snapshot()['size'] == 0
+    with pytest.raises(ValueError):
+        WorkerPool('fiber')
+
+
+def test_eventlet_wait_keeps_the_hub_running():
+    import eventlet
+
+    ticks = []
+
+    def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            eventlet.sleep(0.01)
+
+    pool = WorkerPool('thread', size=1, wait=eventlet_wait)
+    try:
+        greenthread = eventlet.spawn(ticker)
+        pool.run(time.sleep, 0.2)
+        # the greenthread kept ticking while the main greenthread waited on the pool
+        assert len(ticks) == 5
+        greenthread.wait()
+    finally:
+        pool.shutdown()
+
+
+def test_password_hashing_goes_through_the_pool():
+    pool = WorkerPool('process', size=1)
+    offload.configure_pool(pool)
+    try:
+        user = User(username='alice', email='alice@example.com')
+        user.set_password('s3cret')
+        assert check_password_hash(user.password_hash, 's3cret')
+        assert user.check_password('s3cret') and not user.check_password('wrong')
+        assert pool.snapshot()['completed'] == 3
+    finally:
+        offload.configure_pool(None)
+
+
+def _write_models(directory, n_estimators):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(np.column_stack([
+        rng.uniform(55, 130, 200),
+        rng.uniform(0.1, 15, 200),
+        rng.uniform(31, 38, 200),
+    ]), columns=StressModelService.FEATURE_COLUMNS)
+    scaler = StandardScaler().fit(df)
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=4, random_state=0)
+    model.fit(scaler.transform(df), np.digitize(df['HR'], [80, 100]))
+    joblib.dump(scaler, directory / ModelRegistry.SCALER_FILE)
+    joblib.dump(model, directory / ModelRegistry.MODEL_FILE)
+
+
+def test_process_pool_predicts_with_the_parent_model_version(tmp_path):
+    _write_models(tmp_path, n_estimators=5)
+    registry = ModelRegistry(tmp_path, warmup_batch_size=4)
+    assert registry.load()
+    rows = np.array([[70.0, 36.1, 2.0], [92.0, 36.8, 6.5], [120.0, 37.4, 11.0]])
+    local = StressModelService.predict_batch(rows)
+
+    pool = WorkerPool('process', size=1, initializer=init_worker, initargs=(str(tmp_path), 4, True, True))
+    offload.configure_pool(pool)
+    try:
+        remote = StressModelService.predict_batch(rows)
+        assert remote['version'] == local['version'] == registry.version
+        assert list(remote['labels']) == list(local['labels'])
+        np.testing.assert_allclose(remote['confidences'], local['confidences'])
+
+        # after a reload in the parent the worker catches up on its next call
+        _write_models(tmp_path, n_estimators=9)
+        assert registry.load()
+        assert StressModelService.predict_batch(rows)['version'] == registry.version != local['version']
+    finally:
+        offload.configure_pool(None)
+
+
+def test_process_pool_uses_the_parent_cache(tmp_path, monkeypatch):
+    _write_models(tmp_path, n_estimators=5)
+    registry = ModelRegistry(tmp_path, warmup_batch_size=4)
+    assert registry.load()
+    monkeypatch.setattr(StressModelService, '_cache', None)
+    StressModelService.configure_cache(64)
+    rows = np.array([[70.0, 36.1, 2.0], [92.0, 36.8, 6.5], [120.0, 37.4, 11.0]])
+
+    pool = WorkerPool('process', size=1, initializer=init_worker, initargs=(str(tmp_path), 4, True, True))
+    offload.configure_pool(pool)
+    try:
+        first = StressModelService.predict_batch(rows)
+        again = StressModelService.predict_batch(rows)
+        assert list(again['labels']) == list(first['labels']) and again['version'] == registry.version
+        # the repeat was served from the cache without a trip to the worker
+        assert pool.snapshot()['completed'] == 1
+        assert StressModelService.cache_metrics()['hits'] == 3
+        assert StressModelService.cache_metrics()['misses'] == 3
+
+        # only the new row is sent to the worker
+        StressModelService.predict_batch(np.vstack([rows, [[100.0, 36.9, 8.0]]]))
+        assert pool.snapshot()['completed'] == 2
+        assert StressModelService.cache_metrics()['misses'] == 4
+    finally:
+        offload.configure_pool(None)
+
+
+def test_cpu_pool_is_opt_in(monkeypatch):
+    class TestConfig:
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        MODEL_EAGER_LOAD = False
+
+    monkeypatch.delenv('CPU_POOL', raising=False)
+    app = create_app(TestConfig)
+    assert app.config['CPU_POOL'] == 'inline'
+    assert offload.get_pool() is None and app.extensions['cpu_pool'] is None
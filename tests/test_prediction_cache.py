@@ -0,0 +1,143 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.prediction_cache import PredictionCache
+from app.service import StressModelService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingModel:
+    """compute() stand-in labelling each row with its HR and recording every call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, rows):
+        self.calls.append(np.array(rows))
+        return np.array([f'hr={r[0]}' for r in rows], dtype=object), np.full(len(rows), 0.9)
+
+
+def test_snapped_rows_share_one_entry():
+    cache, compute = PredictionCache((0.5, 0.05, 0.01)), CountingModel()
+
+    labels, confidences = cache.predict(np.array([[80.1, 36.52, 4.003]]), 'v1', compute)
+    assert labels[0] == 'hr=80.0'
+    np.testing.assert_allclose(compute.calls[0], [[80.0, 36.5, 4.0]])
+
+    # same grid cell: served from the cache, with the same result whichever reading came first
+    labels, _ = cache.predict(np.array([[79.9, 36.48, 3.998], [80.2, 36.51, 4.004]]), 'v1', compute)
+    assert list(labels) == ['hr=80.0', 'hr=80.0']
+    assert len(compute.calls) == 1
+
+    stats = cache.snapshot()
+    assert stats['hits'] == 2 and stats['misses'] == 1
+    assert stats['hit_rate'] == pytest.approx(2 / 3)
+    assert stats['quantization'] == {'hr': 0.5, 'temp': 0.05, 'eda': 0.01}
+
+
+def test_batch_computes_each_missing_cell_once():
+    cache, compute = PredictionCache((1.0, 0.1, 0.1)), CountingModel()
+    X = np.array([[70.0, 36.0, 2.0], [90.0, 36.0, 2.0], [70.2, 36.01, 2.01], [np.nan, 36.0, 2.0]])
+
+    labels, _ = cache.predict(X, 'v1', compute)
+    assert list(labels[:3]) == ['hr=70.0', 'hr=90.0', 'hr=70.0']
+    assert labels[3] == 'hr=nan'
+    # two distinct cells plus the uncacheable row, in one call
+    assert len(compute.calls) == 1 and len(compute.calls[0]) == 3
+    assert cache.snapshot()['bypassed'] == 1
+    assert cache.snapshot()['entries'] == 2
+
+
+def test_lru_eviction_and_ttl():
+    clock = FakeClock()
+    cache, compute = PredictionCache((1.0, 0.1, 0.1), max_entries=2, ttl=10, clock=clock), CountingModel()
+    for hr in (60.0, 70.0):
+        cache.predict(np.array([[hr, 36.0, 2.0]]), 'v1', compute)
+    cache.predict(np.array([[60.0, 36.0, 2.0]]), 'v1', compute)   # 60 is now most recently used
+    cache.predict(np.array([[80.0, 36.0, 2.0]]), 'v1', compute)   # evicts 70
+    assert cache.snapshot()['evictions'] == 1
+
+    calls = len(compute.calls)
+    cache.predict(np.array([[60.0, 36.0, 2.0]]), 'v1', compute)
+    assert len(compute.calls) == calls
+    cache.predict(np.array([[70.0, 36.0, 2.0]]), 'v1', compute)
+    assert len(compute.calls) == calls + 1
+
+    clock.now = 11.0
+    cache.predict(np.array([[60.0, 36.0, 2.0]]), 'v1', compute)
+    assert len(compute.calls) == calls + 2
+    assert cache.snapshot()['expirations'] == 1
+
+
+def test_new_model_version_drops_entries():
+    cache, compute = PredictionCache((0.5, 0.05, 0.01)), CountingModel()
+    row = np.array([[80.0, 36.5, 4.0]])
+    cache.predict(row, 'v1', compute)
+    cache.predict(row, 'v2', compute)
+
+    assert len(compute.calls) == 2
+    stats = cache.snapshot()
+    assert stats['invalidations'] == 1 and stats['entries'] == 1
+
+
+def test_rejects_bad_configuration():
+    with pytest.raises(ValueError):
+        PredictionCache((0.5, 0.05))
+    with pytest.raises(ValueError):
+        PredictionCache((0.5, -0.05, 0.01))
+    with pytest.raises(ValueError):
+        PredictionCache((0.5, 0.05, 0.01), max_entries=0)
+
+
+@pytest.fixture
+def cached_service():
+    """Small trained scaler/forest in StressModelService with the cache enabled."""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(np.column_stack([
+        rng.uniform(55, 130, 300),
+        rng.uniform(0.1, 15, 300),
+        rng.uniform(31, 38, 300),
+    ]), columns=StressModelService.FEATURE_COLUMNS)
+    scaler = StandardScaler().fit(df)
+    model = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0)
+    model.fit(scaler.transform(df), np.digitize(df['HR'], [80, 100]))
+
+    old = (StressModelService._scaler, StressModelService._model, StressModelService._cache)
+    StressModelService._scaler, StressModelService._model = scaler, model
+    StressModelService.configure_cache(128, ttl=60, steps=(0.5, 0.05, 0.01))
+    yield StressModelService
+    StressModelService._scaler, StressModelService._model, StressModelService._cache = old
+
+
+def test_service_serves_repeated_rows_from_cache(cached_service):
+    first = cached_service.predict(92.1, 36.81, 6.502)
+    again = cached_service.predict(92.2, 36.79, 6.498)
+    assert again['label'] == first['label']
+    assert again['confidence_level'] == first['confidence_level']
+    # the response still echoes the raw readings
+    assert again['hr'] == 92.2
+
+    # cached results match the model on the snapped row
+    uncached = cached_service._predict_with(cached_service._scaler, cached_service._model, np.array([[92.0, 36.8, 6.5]]))
+    assert first['label'] == uncached[0][0]
+
+    metrics = cached_service.cache_metrics()
+    assert metrics['hits'] == 1 and metrics['misses'] == 1
+
+    cached_service.configure_cache(0)
+    assert cached_service.cache_metrics() is None
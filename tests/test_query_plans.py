@@ -0,0 +1,115 @@
+"""
+Query-plan regression tests: the session/timestamp reads must keep using the
+indexes on stress_history and sensor_readings instead of scanning the table.
+"""
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app, db
+from app.models import HistoryStress, MeasurementSession, SensorReading
+from app.service import SensorReadingService, StressHistoryService
+
+JAKARTA_TZ = timezone(timedelta(hours=7))
+
+
+class TestConfig:
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    MODEL_EAGER_LOAD = False
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _populate(sessions, rows_per_session):
+    start = datetime(2026, 1, 1, tzinfo=JAKARTA_TZ)
+    session_ids = []
+    for s in range(sessions):
+        session = MeasurementSession(id=f'session-{s:04d}', created_at=start)
+        db.session.add(session)
+        session_ids.append(session.id)
+        for i in range(rows_per_session):
+            ts = start + timedelta(seconds=s * rows_per_session + i)
+            db.session.add(HistoryStress(session_id=session.id, timestamp=ts, hr=80.0, temp=36.5, eda=2.0,
+                                         label='Normal', confidence_level=0.9))
+            db.session.add(SensorReading(session_id=session.id, timestamp=ts, hr=80.0, temp=36.5, eda=2.0))
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    return session_ids
+
+
+@contextmanager
+def _captured_selects():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+
+def _plans(call):
+    """EXPLAIN QUERY PLAN detail lines of every SELECT `call` runs."""
+    with _captured_selects() as statements:
+        call()
+    assert statements
+    plans = []
+    for statement, parameters in statements:
+        rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+        plans.append([row[-1] for row in rows])
+    return plans
+
+
+def _assert_uses(plans, table, index):
+    details = [line for plan in plans for line in plan if f' {table}' in line]
+    assert details, plans
+    for line in details:
+        assert 'USING' in line and 'INDEX' in line, f'{table} is scanned without an index: {plans}'
+    assert any(index in line for line in details), plans
+    # ordering comes from the index, not from a temporary sort
+    assert not any('TEMP B-TREE FOR ORDER BY' in line for plan in plans for line in plan), plans
+
+
+@pytest.mark.parametrize('sessions,rows_per_session', [(2, 5), (40, 50)])
+def test_session_and_time_queries_use_indexes(app, sessions, rows_per_session):
+    session_ids = _populate(sessions, rows_per_session)
+    session_id = session_ids[-1]
+
+    _assert_uses(_plans(lambda: StressHistoryService.get_by_session(session_id)),
+                 'stress_history', 'ix_stress_history_session_id_timestamp')
+    _assert_uses(_plans(lambda: SensorReadingService.get_by_session(session_id)),
+                 'sensor_readings', 'ix_sensor_readings_session_id_timestamp')
+    _assert_uses(_plans(lambda: StressHistoryService.get_recent_count(24)),
+                 'stress_history', 'ix_stress_history_timestamp')
+    _assert_uses(_plans(StressHistoryService.get_all), 'stress_history', 'ix_stress_history_timestamp')
+    _assert_uses(_plans(SensorReadingService.get_all), 'sensor_readings', 'ix_sensor_readings_timestamp')
+    _assert_uses(_plans(lambda: StressHistoryService.get_page(limit=10, session_id=session_id)),
+                 'stress_history', 'ix_stress_history_session_id_timestamp')
+
+
+def test_indexes_are_declared_on_the_models():
+    history = {ix.name: [c.name for c in ix.columns] for ix in HistoryStress.__table__.indexes}
+    readings = {ix.name: [c.name for c in ix.columns] for ix in SensorReading.__table__.indexes}
+    assert history['ix_stress_history_session_id_timestamp'] == ['session_id', 'timestamp']
+    assert history['ix_stress_history_timestamp'] == ['timestamp']
+    assert readings['ix_sensor_readings_session_id_timestamp'] == ['session_id', 'timestamp']
+    assert readings['ix_sensor_readings_timestamp'] == ['timestamp']
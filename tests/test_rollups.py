@@ -0,0 +1,191 @@
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app, db
+from app import rollups
+from app.models import HistoryStress, MeasurementSession, ReadingRollup, StressRollup
+from app.service import (
+    MeasurementSessionService,
+    OfflineSyncService,
+    RollupService,
+    SensorReadingService,
+    StressHistoryService,
+    _bulk_insert,
+)
+
+
+class TestConfig:
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    MODEL_EAGER_LOAD = False
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+BASE = datetime(2025, 1, 1, 7, 30, 0)
+
+
+def _readings(session_id, rng, n, hours=3):
+    """n readings at random times over `hours` hours from BASE, unsorted."""
+    offsets = rng.uniform(0, hours * 3600, n)
+    # one reading right at an hour edge, where millisecond rounding decides the bucket
+    offsets[0] = 1799.9996
+    return [{'session_id': session_id, 'timestamp': BASE + timedelta(seconds=float(s)),
+             'hr': float(rng.normal(80, 8)), 'temp': float(rng.normal(36.5, 0.3)),
+             'eda': float(rng.uniform(1, 5)), 'created_at': BASE} for s in offsets]
+
+
+def _history(session_id, rng, n, labels=('Normal', 'High Stress', None)):
+    rows = [{'session_id': session_id, 'timestamp': BASE + timedelta(seconds=float(s)),
+             'label': labels[i % len(labels)], 'created_at': BASE}
+            for i, s in enumerate(rng.uniform(0, 3 * 3600, n))]
+    _bulk_insert(HistoryStress, rows)
+    rollups.record_history(rows)
+    db.session.commit()
+
+
+def _snapshot():
+    readings = [tuple(round(v, 6) if isinstance(v, float) else v for v in row)
+                for row in db.session.execute(select(ReadingRollup.__table__)).all()]
+    stress = [tuple(row) for row in db.session.execute(select(StressRollup.__table__)).all()]
+    return sorted(readings), sorted(stress)
+
+
+@pytest.fixture
+def data(app):
+    """Two sessions of device ESP32_A, one session without a device."""
+    rng = np.random.default_rng(7)
+    sessions = {
+        'a1': MeasurementSessionService.create({'device_id': 'ESP32_A'})['id'],
+        'a2': MeasurementSessionService.create({'device_id': 'ESP32_A'})['id'],
+        'b': MeasurementSessionService.create({})['id'],
+    }
+    for session_id in sessions.values():
+        rows = _readings(session_id, rng, 600)
+        # several write batches hitting the same buckets
+        for start in range(0, len(rows), 250):
+            SensorReadingService.insert_many(rows[start:start + 250])
+        _history(session_id, rng, 40)
+    return sessions
+
+
+def test_incremental_rollups_match_backfill(app, data):
+    SensorReadingService.create({'session_id': data['a1'], 'hr': 70.0, 'temp': 36.0, 'eda': 2.0})
+    StressHistoryService.create({'session_id': data['a2'], 'label': 'High Stress'})
+    OfflineSyncService.sync('ESP32_A', [{'hr': 90, 'temp': 37, 'eda': 3, 'label': 'high'},
+                                        {'hr': 70, 'temp': 36, 'eda': 2, 'label': 'normal',
+                                         'readings': [{'hr': 71}, {'hr': 72}]}])
+    incremental = _snapshot()
+    assert incremental[0] and incremental[1]
+
+    result = rollups.backfill()
+    assert result['sessions'] == 5 and result['devices'] == 1
+    assert _snapshot() == incremental
+
+
+def test_rollups_match_raw_aggregate(app, data):
+    raw = SensorReadingService.aggregate(data['a1'], resolution='1m', max_points=10000)['buckets']
+    rolled = RollupService.summary('session', data['a1'], '1m')['sensor']
+    assert rolled['timestamp'] == raw['timestamp']
+    assert rolled['count'] == raw['count']
+    for name in ('hr', 'temp', 'eda'):
+        assert rolled[name]['min'] == raw[name]['min']
+        assert rolled[name]['max'] == raw[name]['max']
+        np.testing.assert_allclose(rolled[name]['mean'], raw[name]['mean'])
+
+    # 15-minute buckets are merged from the 1-minute rollups, 2-hour buckets from the hourly ones
+    for resolution in ('15m', '2h'):
+        raw = SensorReadingService.aggregate(data['a1'], resolution=resolution)['buckets']
+        rolled = RollupService.summary('session', data['a1'], resolution)['sensor']
+        assert rolled['count'] == raw['count'] and rolled['hr']['max'] == raw['hr']['max']
+        np.testing.assert_allclose(rolled['hr']['mean'], raw['hr']['mean'])
+
+
+def test_device_rollups_cover_all_sessions(app, data):
+    device = RollupService.summary('device', 'ESP32_A', '1h')
+    a1 = RollupService.summary('session', data['a1'], '1h')
+    a2 = RollupService.summary('session', data['a2'], '1h')
+    assert device['readings'] == a1['readings'] + a2['readings'] == 1200
+    assert sum(device['stress']['total']) == 80
+    assert device['label_totals'] == {'Normal': 28, 'High Stress': 26, 'Unknown': 26}
+    assert device['sensor']['hr']['max'] == [max(x, y) for x, y in zip(a1['sensor']['hr']['max'],
+                                                                       a2['sensor']['hr']['max'])]
+
+
+def test_updates_and_deletes_recompute(app, data):
+    reading = SensorReadingService.insert_many(_readings(data['a1'], np.random.default_rng(1), 1))[0]
+    SensorReadingService.update(reading, {'hr': 250.0, 'timestamp': '2025-01-01T10:05:00+07:00'})
+    assert max(RollupService.summary('device', 'ESP32_A', '1h')['sensor']['hr']['max']) == 250.0
+    SensorReadingService.delete(reading)
+    assert max(RollupService.summary('device', 'ESP32_A', '1h')['sensor']['hr']['max']) < 250.0
+
+    rec = db.session.scalars(select(HistoryStress).where(HistoryStress.session_id == data['a2'])).first()
+    StressHistoryService.update(rec.id, {'label': 'Relabeled'})
+    assert RollupService.summary('session', data['a2'])['label_totals']['Relabeled'] == 1
+
+    MeasurementSessionService.delete_many([data['a1']])
+    assert RollupService.summary('session', data['a1'])['readings'] == 0
+    device = RollupService.summary('device', 'ESP32_A')
+    assert device['readings'] == 600 and sum(device['label_totals'].values()) == 40
+
+    live = _snapshot()
+    rollups.backfill()
+    assert _snapshot() == live
+
+
+def test_rollup_endpoints(app, data):
+    client = app.test_client()
+    body = client.get('/api/devices/ESP32_A/rollups').get_json()
+    assert body['success']
+    rolled = body['data']
+    assert rolled['scope'] == 'device' and rolled['resolution_seconds'] == 3600
+    assert rolled['sensor']['timestamp'] == ['2025-01-01T07:00:00+07:00', '2025-01-01T08:00:00+07:00',
+                                             '2025-01-01T09:00:00+07:00', '2025-01-01T10:00:00+07:00']
+
+    ranged = client.get(f"/api/sessions/{data['b']}/rollups?resolution=1m"
+                        '&start=2025-01-01T08:00:30&end=2025-01-01T08:10:00').get_json()['data']
+    assert ranged['sensor']['timestamp'][0] >= '2025-01-01T08:00:00+07:00'
+    assert ranged['sensor']['timestamp'][-1] < '2025-01-01T08:10:00+07:00'
+    assert all('08:00:00' <= ts[11:19] < '08:10:00' for ts in ranged['stress']['timestamp'])
+    assert sum(ranged['sensor']['count']) < 600
+
+    app.config['AGGREGATE_MAX_POINTS'] = 100
+    for query in ('resolution=10s', 'resolution=90s', 'resolution=1m', 'start=yesterday'):
+        resp = client.get('/api/devices/ESP32_A/rollups?' + query)
+        assert resp.status_code == 400, query
+
+    empty = client.get('/api/devices/unknown/rollups').get_json()['data']
+    assert empty['readings'] == 0 and empty['stress']['labels'] == {}
+
+
+def test_backfill_command(app, data):
+    db.session.execute(ReadingRollup.__table__.delete())
+    db.session.execute(StressRollup.__table__.delete())
+    db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['rollups', 'backfill', '--session', data['b']])
+    assert result.exit_code == 0, result.output
+    assert 'of 1 sessions and 0 devices' in result.output
+    assert RollupService.summary('session', data['b'])['readings'] == 600
+    assert RollupService.summary('device', 'ESP32_A')['readings'] == 0
+
+    result = runner.invoke(args=['rollups', 'backfill'])
+    assert result.exit_code == 0, result.output
+    assert RollupService.summary('device', 'ESP32_A')['readings'] == 1200
+    assert db.session.get(MeasurementSession, data['a1']).device_id == 'ESP32_A'
@@ -0,0 +1,92 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import socketio
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.broker import UnixSocketBroker, UnixSocketManager, create_client_manager
+from app.registry import ConnectionRegistry, SharedConnectionStats
+
+
+@pytest.fixture
+def broker(tmp_path):
+    broker = UnixSocketBroker(str(tmp_path / 'broker.sock')).start()
+    yield broker
+    broker.stop()
+
+
+def _worker(broker):
+    server = socketio.Server(async_mode='threading', client_manager=UnixSocketManager(f'unix://{broker.path}'))
+    server.manager_initialized = True
+    server.manager.initialize()
+    return server
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_room_emit_reaches_clients_of_another_worker(broker):
+    worker_a, worker_b = _worker(broker), _worker(broker)
+    sent = []
+    worker_b._send_eio_packet = lambda eio_sid, pkt: sent.append((eio_sid, pkt.data))
+
+    # a frontend connected to worker B watches ESP32_A
+    sid = worker_b.manager.connect('eio-1', '/')
+    worker_b.manager.enter_room(sid, '/', 'device:ESP32_A')
+    time.sleep(0.2)  # let both listeners subscribe to the broker
+
+    worker_a.emit('live_sensor_data', {'device_id': 'ESP32_A', 'hr': 75.0}, to=['firehose', 'device:ESP32_A'])
+    worker_a.emit('live_sensor_data', {'device_id': 'ESP32_B', 'hr': 80.0}, to='device:ESP32_B')
+
+    assert _wait_for(lambda: sent)
+    time.sleep(0.1)
+    assert sent == [('eio-1', '2["live_sensor_data",{"device_id":"ESP32_A","hr":75.0}]')]
+
+
+def test_create_client_manager_picks_backend():
+    assert create_client_manager(None) is None
+    assert isinstance(create_client_manager('unix:///tmp/x.sock'), UnixSocketManager)
+    assert isinstance(create_client_manager('redis://localhost:6379/0'), socketio.RedisManager)
+
+
+def test_shared_stats_sum_live_workers(tmp_path, monkeypatch):
+    path = str(tmp_path / 'stats.sqlite')
+    worker_a, worker_b = ConnectionRegistry(), ConnectionRegistry()
+    worker_a.shared = SharedConnectionStats(path, worker_id='a')
+    worker_b.shared = SharedConnectionStats(path, worker_id='b')
+
+    worker_a.add('f1', 'frontend')
+    worker_a.add('e1', 'esp32', device_id='ESP32_A')
+    worker_b.add('f2', 'frontend')
+    # heartbeats
+    worker_a.shared.sync(worker_a.stats())
+    worker_b.shared.sync(worker_b.stats())
+
+    assert worker_b.global_stats() == {'frontend_clients': 2, 'esp32_clients': 1, 'total_clients': 3,
+                                       'devices': 1, 'workers': 2}
+
+    # between heartbeats the totals come from memory, with this worker's own counts current
+    def no_file(self):
+        raise AssertionError('stats file opened outside the heartbeat')
+
+    monkeypatch.setattr(SharedConnectionStats, '_connect', no_file)
+    worker_b.add('f3', 'frontend')
+    assert worker_b.global_stats()['total_clients'] == 4
+    monkeypatch.undo()
+
+    # a worker that stopped refreshing its row drops out of the totals
+    worker_a.shared.stale_after = worker_b.shared.stale_after = 0.05
+    time.sleep(0.1)
+    worker_b.shared.sync(worker_b.stats())
+    assert worker_b.global_stats() == {'frontend_clients': 2, 'esp32_clients': 0, 'total_clients': 2,
+                                       'devices': 0, 'workers': 1}
+
+    worker_b.shared.remove()
+    assert worker_a.shared.totals()['workers'] == 0
@@ -0,0 +1,123 @@
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app, db
+from app.models import HistoryStress, MeasurementSession, SensorReading
+from app.service import MeasurementSessionService, StressHistoryService
+
+
+class TestConfig:
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    MODEL_EAGER_LOAD = False
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def sessions(app):
+    """Three sessions, each with 4 readings and 2 stress history rows."""
+    base = datetime(2025, 1, 1, 8, 0, 0)
+    ids = ['s1', 's2', 's3']
+    for n, session_id in enumerate(ids):
+        db.session.add(MeasurementSession(id=session_id, created_at=base + timedelta(hours=n)))
+        for i in range(4):
+            db.session.add(SensorReading(session_id=session_id, timestamp=base + timedelta(seconds=i),
+                                         hr=70.0, temp=36.5, eda=2.0))
+        for i in range(2):
+            db.session.add(HistoryStress(session_id=session_id, timestamp=base + timedelta(seconds=i),
+                                         hr=70.0, temp=36.5, eda=2.0, label='Normal', confidence_level=0.9))
+    db.session.commit()
+    return ids
+
+
+def _counts(session_id):
+    return (MeasurementSession.query.filter_by(id=session_id).count(),
+            SensorReading.query.filter_by(session_id=session_id).count(),
+            HistoryStress.query.filter_by(session_id=session_id).count())
+
+
+def test_delete_many_is_set_based_and_reports_counts(sessions):
+    result = MeasurementSessionService.delete_many(['s1', 's2', 'missing', 's1'])
+    assert result == {'sessions': 2, 'stress_history': 4, 'sensor_readings': 8, 'not_found': ['missing']}
+    assert _counts('s1') == _counts('s2') == (0, 0, 0)
+    assert _counts('s3') == (1, 4, 2)
+
+
+def test_deleting_stress_history_cascades_to_its_session(sessions):
+    rec_id = HistoryStress.query.filter_by(session_id='s2').first().id
+    assert StressHistoryService.delete(rec_id)
+    assert _counts('s2') == (0, 0, 0)
+    assert _counts('s1') == (1, 4, 2)
+    assert not StressHistoryService.delete(rec_id)
+
+
+def test_database_cascade_without_loading_children(sessions):
+    assert db.session.execute(db.text('PRAGMA foreign_keys')).scalar() == 1
+    # passive_deletes: the ORM deletes only the session row, ON DELETE CASCADE removes the rest
+    db.session.delete(db.session.get(MeasurementSession, 's3'))
+    db.session.commit()
+    assert _counts('s3') == (0, 0, 0)
+
+
+def test_bulk_delete_endpoint(app, sessions):
+    client = app.test_client()
+    assert client.post('/api/sessions/bulk-delete', json={'session_ids': ['s1']}).status_code == 401
+
+    headers = {'Authorization': f'Bearer {create_access_token(identity="1")}'}
+    resp = client.post('/api/sessions/bulk-delete', json={'session_ids': []}, headers=headers)
+    assert resp.status_code == 400
+    resp = client.post('/api/sessions/bulk-delete', json={'session_ids': ['s1', 3]}, headers=headers)
+    assert resp.status_code == 400
+
+    resp = client.post('/api/sessions/bulk-delete', json={'session_ids': ['s1', 's3', 'nope']}, headers=headers)
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body['deleted'] == {'sessions': 2, 'stress_history': 4, 'sensor_readings': 8}
+    assert body['not_found'] == ['nope']
+    assert _counts('s2') == (1, 4, 2)
+
+
+def test_writes_for_an_unknown_session_are_not_found(app, sessions):
+    client = app.test_client()
+    reading = {'hr': 70.0, 'temp': 36.5, 'eda': 2.0}
+
+    resp = client.post('/api/sensor-readings', json=dict(reading, session_id='nope'))
+    assert resp.status_code == 404 and resp.get_json()['error'] == 'Session not found'
+    resp = client.post('/api/sessions/nope/sensor-readings/bulk', json={'readings': [reading, reading]})
+    assert resp.status_code == 404 and resp.get_json()['error'] == 'Session not found'
+    resp = client.post('/api/stress-history', json=dict(reading, session_id='nope', label='Normal'))
+    assert resp.status_code == 404 and resp.get_json()['error'] == 'Session not found'
+    assert _counts('nope') == (0, 0, 0)
+
+    # the session is still usable afterwards, and history without a session is still accepted
+    assert client.post('/api/sensor-readings', json=dict(reading, session_id='s1')).status_code == 201
+    assert client.post('/api/sessions/s1/sensor-readings/bulk', json={'readings': [reading]}).status_code == 201
+    assert client.post('/api/stress-history', json=dict(reading, label='Normal')).status_code == 201
+    assert _counts('s1') == (1, 6, 2)
+
+
+def test_failed_write_is_rolled_back(app, sessions, monkeypatch):
+    def fail(rows):
+        raise RuntimeError('disk full')
+
+    monkeypatch.setattr('app.service.rollups.record_readings', fail)
+    resp = app.test_client().post('/api/sensor-readings', json={'session_id': 's1', 'hr': 70, 'temp': 36.5, 'eda': 2})
+    assert resp.status_code == 500
+    # the failed insert is not left pending in the session
+    db.session.commit()
+    assert _counts('s1') == (1, 4, 2)
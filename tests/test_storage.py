@@ -0,0 +1,61 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app, db
+from app.storage import is_sqlite_file, sqlite_profile
+
+
+def _app(uri, **overrides):
+    config = dict(TESTING=True, SQLALCHEMY_DATABASE_URI=uri, MODEL_EAGER_LOAD=False, **overrides)
+    return create_app(type('TestConfig', (), config))
+
+
+def test_file_database_gets_profile_and_pool(tmp_path):
+    app = _app(f"sqlite:///{tmp_path / 'app.sqlite'}", SQLITE_POOL_SIZE=3, SQLITE_SYNCHRONOUS='normal')
+    with app.app_context():
+        profile = sqlite_profile(db.engine)
+        assert profile['pragmas']['journal_mode'] == 'wal'
+        assert profile['pragmas']['synchronous'] == 1
+        assert profile['pragmas']['busy_timeout'] == 5000
+        assert profile['pragmas']['cache_size'] == -20000
+        assert db.engine.pool.size() == 3
+        db.engine.dispose()
+
+
+def test_stock_profile_and_explicit_engine_options(tmp_path):
+    app = _app(
+        f"sqlite:///{tmp_path / 'app.sqlite'}",
+        SQLITE_JOURNAL_MODE='DELETE',
+        SQLITE_SYNCHRONOUS='FULL',
+        SQLALCHEMY_ENGINE_OPTIONS={'pool_size': 2},
+    )
+    with app.app_context():
+        pragmas = sqlite_profile(db.engine)['pragmas']
+        assert pragmas['journal_mode'] == 'delete'
+        assert pragmas['synchronous'] == 2
+        # explicit engine options win over the profile's pool size
+        assert db.engine.pool.size() == 2
+        db.engine.dispose()
+
+
+def test_in_memory_database_keeps_single_connection():
+    assert not is_sqlite_file('sqlite://')
+    assert not is_sqlite_file('sqlite:///:memory:')
+    assert is_sqlite_file('sqlite:////tmp/app.sqlite')
+
+    app = _app('sqlite://')
+    assert 'pool_size' not in app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    with app.app_context():
+        db.create_all()
+        assert sqlite_profile(db.engine)['pragmas']['busy_timeout'] == 5000
+        resp = app.test_client().get('/api/system/status')
+        assert resp.get_json()['storage']['dialect'] == 'sqlite'
+
+
+def test_rejects_unknown_modes():
+    with pytest.raises(ValueError, match='journal_mode'):
+        _app('sqlite://', SQLITE_JOURNAL_MODE='FAST')
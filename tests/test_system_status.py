@@ -0,0 +1,61 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app, db
+from app.service import MeasurementSessionService, StressHistoryService, StressHistoryStats
+
+
+class TestConfig:
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_status_counts_are_maintained_without_recount(client, app, monkeypatch):
+    StressHistoryService.create({'hr': 70, 'temp': 36.5, 'eda': 0.4, 'label': 'Normal'})
+    stats = client.get('/api/system/status').get_json()['statistics']
+    assert stats['total_records'] == 1
+
+    loads = []
+    real_load = StressHistoryStats._load.__func__
+    monkeypatch.setattr(StressHistoryStats, '_load', classmethod(lambda cls: loads.append(1) or real_load(cls)))
+
+    rec = StressHistoryService.create({'hr': 90, 'temp': 37.0, 'eda': 0.7, 'label': 'High Stress'})
+    StressHistoryService.create({'hr': 91, 'temp': 37.0, 'eda': 0.7, 'label': 'High Stress'})
+    StressHistoryService.delete(rec['id'])
+
+    stats = client.get('/api/system/status').get_json()['statistics']
+    assert loads == []
+    assert stats['total_records'] == 2
+    assert stats['recent_24h_records'] == 2
+    assert stats['records_by_label'] == {'Normal': 1, 'High Stress': 1}
+    assert len(stats['hourly_records']) == 24
+    assert stats['hourly_records'][-1]['count'] == 2
+
+
+def test_bulk_delete_invalidates_counts(client, app):
+    session_id = MeasurementSessionService.create({'notes': 'x'})['id']
+    for _ in range(3):
+        StressHistoryService.create({'session_id': session_id, 'hr': 70, 'temp': 36.5, 'eda': 0.4, 'label': 'Normal'})
+    assert client.get('/api/system/status').get_json()['statistics']['total_records'] == 3
+
+    MeasurementSessionService.delete(session_id)
+    assert client.get('/api/system/status').get_json()['statistics']['total_records'] == 0